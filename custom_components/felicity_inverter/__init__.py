@@ -1,28 +1,61 @@
 from __future__ import annotations
 # -*- coding: utf-8 -*-
 
-from datetime import timedelta
 import logging
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.typing import ConfigType
-from homeassistant.helpers.update_coordinator import (
-    DataUpdateCoordinator,
-    UpdateFailed,
-)
 
-from .api import FelicityApiError, FelicityClient
+from .api import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_READ_CHUNKS,
+    DEFAULT_READ_CHUNK_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    SHARED_QUEUES_KEY,
+    FelicityClient,
+    get_host_queue,
+)
 from .const import (
+    CONF_CAPTURE_SETTINGS_PACKS,
+    CONF_CONNECT_TIMEOUT,
+    CONF_ENABLE_WRITES,
+    CONF_EXPORT_TOKEN,
+    CONF_EXPORT_URL,
+    CONF_LOOP_BUDGET,
+    CONF_MAX_READ_CHUNKS,
+    CONF_POLL_DEADLINE,
+    CONF_READ_CHUNK_SIZE,
+    CONF_READ_TIMEOUT,
+    CONF_SCAN_INTERVAL,
+    CONF_STALE_GRACE,
+    CONF_TRANSPORT,
+    CONF_UNIT_ID,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE,
+    DEFAULT_UNIT_ID,
     DOMAIN,
+    EVENT_SETTINGS_CHANGED,
     PLATFORMS,
+    TRANSPORT_MODBUS,
 )
+from .config_flow import endpoint_id
+from .coordinator import FelicityCoordinator
+from .exporter import SnapshotExporter, create_sink
+from .metrics import FelicityMetricsView, discard_labels
+from .modbus import ModbusTransport
+from .services import async_setup_services
+from .statistics import EnergyStatistics
+from .websocket import async_register_websocket
+
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
-    """Set up via YAML (not used)."""
+    """Set up via YAML (not used); registers services, metrics view and websocket API."""
+    async_setup_services(hass)
+    hass.http.register_view(FelicityMetricsView(hass))
+    async_register_websocket(hass)
     return True
 
 
@@ -31,37 +64,180 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     host: str = entry.data["host"]
     port: int = entry.data["port"]
-    client = FelicityClient(host, port)
-
-    async def _async_update_data():
-        try:
-            return await client.async_get_data()
-        except FelicityApiError as err:
-            raise UpdateFailed(str(err)) from err
+    options = entry.options
+    transport = None
+    if entry.data.get(CONF_TRANSPORT) == TRANSPORT_MODBUS:
+        transport = ModbusTransport(
+            host,
+            port,
+            unit_id=entry.data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID),
+            connect_timeout=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+        )
+    client = FelicityClient(
+        host,
+        port,
+        connect_timeout=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT),
+        read_chunk_size=options.get(CONF_READ_CHUNK_SIZE, DEFAULT_READ_CHUNK_SIZE),
+        max_read_chunks=options.get(CONF_MAX_READ_CHUNKS, DEFAULT_MAX_READ_CHUNKS),
+        queue=get_host_queue(
+            host, port, hass.data.setdefault(SHARED_QUEUES_KEY, {})
+        ),
+        capture_settings_packs=options.get(CONF_CAPTURE_SETTINGS_PACKS, False),
+        transport=transport,
+    )
 
-    coordinator = DataUpdateCoordinator(
+    coordinator = FelicityCoordinator(
         hass,
-        _LOGGER,
-        name=f"{DOMAIN}_{host}",
-        update_method=_async_update_data,
-        update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+        entry,
+        client,
+        options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
     )
+    coordinator.stale_grace = options.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE)
+    coordinator.poll_deadline = options.get(CONF_POLL_DEADLINE, 0)
+    coordinator.writes_enabled = options.get(CONF_ENABLE_WRITES, False)
+
+    @callback
+    def _settings_changed(diff: dict) -> None:
+        hass.bus.async_fire(
+            EVENT_SETTINGS_CHANGED,
+            {
+                "entry_id": entry.entry_id,
+                "host": host,
+                "changes": {
+                    key: {"old": old, "new": new} for key, (old, new) in diff.items()
+                },
+            },
+        )
 
-    await coordinator.async_config_entry_first_refresh()
+    entry.async_on_unload(client.add_settings_listener(_settings_changed))
+
+    await coordinator.energy.async_load()
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        # Not ready: a retry builds a new client and coordinator, so release
+        # this one (energy save, open connection) now.
+        await coordinator.async_shutdown()
+        raise
+    # Installed only once setup succeeds; removed by async_shutdown on unload.
+    coordinator.set_loop_budget(options.get(CONF_LOOP_BUDGET, 0))
+    _async_adopt_serial_unique_id(hass, entry, coordinator.data)
+
+    statistics: EnergyStatistics | None = None
+    if "recorder" in hass.config.components:
+        statistics = EnergyStatistics(hass, coordinator)
+        await statistics.async_start()
+        entry.async_on_unload(statistics.async_stop)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "client": client,
         "coordinator": coordinator,
-            }
+        "exporter": _async_start_exporter(hass, coordinator, options),
+        "statistics": statistics,
+        # Options last applied; the update listener also fires for entry.data
+        # changes (PV layout lock, serial unique_id), which need no action.
+        "options": dict(options),
+    }
+
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+@callback
+def _async_start_exporter(
+    hass: HomeAssistant, coordinator: FelicityCoordinator, options
+) -> SnapshotExporter | None:
+    """Start the time-series exporter if an export URL is configured."""
+    url = (options.get(CONF_EXPORT_URL) or "").strip()
+    if not url:
+        return None
+    try:
+        sink = create_sink(hass, url, options.get(CONF_EXPORT_TOKEN))
+    except ValueError as err:
+        _LOGGER.error("%s: export disabled: %s", coordinator.name, err)
+        return None
+    exporter = SnapshotExporter(hass, coordinator, sink)
+    exporter.async_start()
+    return exporter
+
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running client/coordinator (no reload)."""
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is None:
+        return
+
+    options = entry.options
+    previous = data["options"]
+    if dict(options) == previous:
+        return
+    data["options"] = dict(options)
+    client: FelicityClient = data["client"]
+    coordinator: FelicityCoordinator = data["coordinator"]
+
+    client.configure(
+        connect_timeout=options.get(CONF_CONNECT_TIMEOUT),
+        read_timeout=options.get(CONF_READ_TIMEOUT),
+        read_chunk_size=options.get(CONF_READ_CHUNK_SIZE),
+        max_read_chunks=options.get(CONF_MAX_READ_CHUNKS),
+        capture_settings_packs=options.get(CONF_CAPTURE_SETTINGS_PACKS, False),
+    )
+
+    coordinator.set_loop_budget(options.get(CONF_LOOP_BUDGET, 0))
+    coordinator.stale_grace = options.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE)
+    coordinator.poll_deadline = options.get(CONF_POLL_DEADLINE, 0)
+    if options.get(CONF_ENABLE_WRITES, False) != coordinator.writes_enabled:
+        # Write entities are only created at setup.
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+        return
+
+    scan_interval = options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+    if scan_interval != coordinator.base_interval:
+        coordinator.set_base_interval(scan_interval)
+        # Refreshing reschedules the next poll with the new interval.
+        await coordinator.async_request_refresh()
+
+    # Rebuilt only for a new sink; queued points are spilled and replayed.
+    if any(
+        options.get(key) != previous.get(key)
+        for key in (CONF_EXPORT_URL, CONF_EXPORT_TOKEN)
+    ):
+        if data["exporter"] is not None:
+            await data["exporter"].async_stop()
+        data["exporter"] = _async_start_exporter(hass, coordinator, options)
+
+
+@callback
+def _async_adopt_serial_unique_id(
+    hass: HomeAssistant, entry: ConfigEntry, data: dict | None
+) -> None:
+    """Re-key host:port[:unit] entries by the device serial, so rediscovery matches them."""
+    basic = (data or {}).get("_basic") or {}
+    serial = basic.get("DevSN") or basic.get("wifiSN")
+    if not serial or entry.unique_id == str(serial):
+        return
+    if entry.unique_id != endpoint_id(entry.data):
+        return
+    if any(
+        other.unique_id == str(serial)
+        for other in hass.config_entries.async_entries(DOMAIN)
+    ):
+        return
+    hass.config_entries.async_update_entry(entry, unique_id=str(serial))
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok and DOMAIN in hass.data:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if data is not None:
+            if data["exporter"] is not None:
+                await data["exporter"].async_stop()
+            await data["coordinator"].async_shutdown()
+        discard_labels(entry.entry_id)
     return unload_ok
@@ -1,80 +1,261 @@
 from __future__ import annotations
 
 import asyncio
+from contextlib import asynccontextmanager
+import hashlib
+import heapq
+import ipaddress
+import itertools
 import json
 import logging
 import re
-from typing import Any, Dict, List
+import sys
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Transport defaults; all of them can be changed per client via configure().
+DEFAULT_CONNECT_TIMEOUT = 10.0  # seconds
+DEFAULT_READ_TIMEOUT = 0.5  # seconds of silence that end a response
+DEFAULT_READ_CHUNK_SIZE = 2048  # bytes per read()
+DEFAULT_MAX_READ_CHUNKS = 40
+
+# What one poll cycle reads; every transport maps these to its own requests.
+BLOCK_RUNTIME = "runtime"
+BLOCK_BASIC = "basic"
+BLOCK_SETTINGS = "settings"
+
+# Request priorities on a shared host queue (lower runs first).
+PRIORITY_RUNTIME = 0
+PRIORITY_BASIC = 1
+PRIORITY_SETTINGS = 2
+
+# Settings that may be written, with the accepted range of the *raw* device
+# value (same units/scaling as in `dev set infor`). Anything outside is refused
+# before a byte is sent. None of the ranges come from vendor documentation;
+# they are conservative bounds, derived as noted per entry.
+WRITABLE_SETTINGS: Dict[str, Tuple[int, int]] = {
+    # W; 0 .. rated output of the largest model in the series (20 kW).
+    "ZeroEP": (0, 20000),
+    # Mode code; only 0 (off), 1 and 2 have been seen in `dev set infor`.
+    "ZEMode": (0, 2),
+    # A * 10; 0 .. 200 A, the charge limit of the largest 48 V models.
+    "BMChC": (0, 2000),
+    # V * 10; 40.0 .. 64.0 V, the charge window of 48 V lead-acid and LFP
+    # packs (12 V / 24 V systems are not covered).
+    "BChgV": (400, 640),
+}
+
+# wifilocalMonitor read commands per block.
+_JSON_COMMANDS: Dict[str, bytes] = {
+    BLOCK_RUNTIME: b"wifilocalMonitor:get dev real infor",
+    BLOCK_BASIC: b"wifilocalMonitor:get dev basice infor",
+    BLOCK_SETTINGS: b"wifilocalMonitor:get dev set infor",
+}
+
+# Write command, assumed to mirror the read command; the payload is one JSON
+# object with every field of the transaction. NOT confirmed on real firmware,
+# hence writes are opt-in (enable_writes option).
+SET_SETTINGS_COMMAND = b"wifilocalMonitor:set dev set infor "
+
+# Lower-priority reads are skipped when less than this (or 1.5x their last
+# duration) is left of the poll deadline.
+MIN_READ_BUDGET = 1.0  # seconds
+
+# Per-pack bookkeeping in `set infor` responses, not settings.
+_PACK_KEYS = frozenset(("ttlPack", "index"))
+
+# hass.data key of the shared {(host, port): FelicityHostQueue} registry. It is
+# deliberately not scoped to this integration's domain so that other Felicity
+# integrations talking to the same WiFi dongle can serialize on the same queue.
+SHARED_QUEUES_KEY = "felicity_local_api_queues"
+
+# Cheap pre-parse lookup of the device timestamp in a `real infor` frame.
+_DATE_RE = re.compile(r"""["']date["']\s*:\s*["']?(\d+)""")
+
 
 class FelicityApiError(Exception):
     """Error while communicating with Felicity inverter."""
 
 
-class FelicityClient:
-    """TCP client for Felicity inverter local API."""
+def validate_setting(key: str, value: Any) -> int:
+    """Return `value` as raw int if `key` is writable and in range, else raise ValueError."""
+    if key not in WRITABLE_SETTINGS:
+        raise ValueError(f"Setting {key} is not writable")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Setting {key} needs a number, got {value!r}")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"Setting {key} needs a raw integer value, got {value!r}")
+    low, high = WRITABLE_SETTINGS[key]
+    if not low <= value <= high:
+        raise ValueError(f"Setting {key}={value} outside {low}..{high}")
+    return int(value)
 
-    def __init__(self, host: str, port: int) -> None:
-        self._host = host
-        self._port = port
 
-    async def async_get_data(self) -> dict:
-        """Send commands and combine all data into one dict.
+class FelicityHostQueue:
+    """Serialize requests to one dongle, runtime reads first.
 
-        Commands:
-          - wifilocalMonitor:get dev real infor   -> runtime telemetry (JSON)
-          - wifilocalMonitor:get dev basice infor -> versions / type (JSON)
-          - wifilocalMonitor:get dev set infor    -> settings (can be multiple JSON objects glued)
-        """
-        data: Dict[str, Any] = {}
+    The dongle answers one connection at a time; overlapping requests (from
+    several entries or integrations) come back truncated or interleaved.
+    Waiters are served by priority, FIFO within the same priority.
+    """
 
-        # 1) Runtime
-        real_raw = await self._async_read_raw(b"wifilocalMonitor:get dev real infor")
-        real = self._parse_first_json_object(real_raw)
-        if not isinstance(real, dict):
-            raise FelicityApiError(f"Unexpected runtime payload: {real_raw!r}")
-        data.update(real)
+    def __init__(self) -> None:
+        self._busy = False
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
 
-        # 2) Basic info
-        try:
-            basic_raw = await self._async_read_raw(
-                b"wifilocalMonitor:get dev basice infor"
-            )
-            basic = self._parse_first_json_object(basic_raw)
-            if isinstance(basic, dict):
-                data["_basic"] = basic
-        except Exception as err:
-            _LOGGER.debug("Failed to read basic info: %s", err)
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for the dongle."""
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
 
-        # 3) Settings (may be multiple JSON objects in one response)
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_RUNTIME) -> AsyncIterator[None]:
+        """Hold the dongle exclusively for the duration of the block."""
+        if not self._busy and not self.pending:
+            self._busy = True
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # Slot was handed over right before cancellation: pass it on.
+                    self._release()
+                raise
         try:
-            set_raw = await self._async_read_raw(b"wifilocalMonitor:get dev set infor")
-            parts = self._parse_all_json_objects(set_raw)
-
-            # Device may return multiple JSON objects back-to-back (ttlPack/index).
-            # Keep both: merged dict (easy lookup) and raw packs (debug).
-            merged: Dict[str, Any] = {}
-            packs: List[Dict[str, Any]] = []
-            for p in parts:
-                if isinstance(p, dict):
-                    packs.append(p)
-                    merged.update(p)
-
-            if merged:
-                data["_settings"] = merged
-            if packs:
-                data["_settings_packs"] = packs
-        except Exception as err:
-            _LOGGER.debug("Failed to read settings info: %s", err)
+            yield
+        finally:
+            self._release()
 
-        return data
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._busy = False
+
+
+_HOST_QUEUES: Dict[Tuple[str, int], FelicityHostQueue] = {}
+
+
+def get_host_queue(
+    host: str,
+    port: int,
+    registry: Optional[Dict[Tuple[str, int], FelicityHostQueue]] = None,
+) -> FelicityHostQueue:
+    """Return the queue for host:port, creating it in `registry` if needed."""
+    if registry is None:
+        registry = _HOST_QUEUES
+    queue = registry.get((host, port))
+    if queue is None:
+        queue = registry[(host, port)] = FelicityHostQueue()
+    return queue
+
+
+class FelicityTransport(Protocol):
+    """Wire protocol under FelicityClient.
 
-    async def _async_read_raw(self, command: bytes) -> str:
+    `async_read` returns the raw reply of one block (equal bytes/text mean an
+    unchanged block); `parse` turns it into dicts shaped like the JSON protocol.
+    """
+
+    name: str
+    # False while the transport's write path is not confirmed on hardware.
+    supports_writes: bool
+
+    def configure(self, **tuning: Any) -> None:
+        ...
+
+    async def async_read(self, block: str) -> Any:
+        ...
+
+    async def async_write(self, payload: Dict[str, int]) -> Any:
+        ...
+
+    def parse(self, block: str, raw: Any) -> List[Any]:
+        ...
+
+    async def async_close(self) -> None:
+        ...
+
+
+class JsonTransport:
+    """wifilocalMonitor text protocol of the WiFi dongle, one connection per request."""
+
+    name = "json"
+    supports_writes = True
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        max_read_chunks: int = DEFAULT_MAX_READ_CHUNKS,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._read_chunk_size = read_chunk_size
+        self._max_read_chunks = max_read_chunks
+
+    def configure(
+        self,
+        *,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        read_chunk_size: Optional[int] = None,
+        max_read_chunks: Optional[int] = None,
+    ) -> None:
+        """Change transport tuning; takes effect with the next request."""
+        if connect_timeout is not None:
+            self._connect_timeout = connect_timeout
+        if read_timeout is not None:
+            self._read_timeout = read_timeout
+        if read_chunk_size is not None:
+            self._read_chunk_size = read_chunk_size
+        if max_read_chunks is not None:
+            self._max_read_chunks = max_read_chunks
+
+    async def async_read(self, block: str) -> str:
+        return await self.async_transfer(_JSON_COMMANDS[block])
+
+    async def async_write(self, payload: Dict[str, int]) -> str:
+        return await self.async_transfer(
+            SET_SETTINGS_COMMAND + json.dumps(payload, separators=(",", ":")).encode()
+        )
+
+    def parse(self, block: str, raw: str) -> List[Any]:
+        return self._parse_all_json_objects(raw)
+
+    async def async_close(self) -> None:
+        """Nothing to close: every request uses its own connection."""
+
+    async def async_transfer(self, command: bytes) -> str:
         """Open TCP, send command, read response as text."""
         try:
-            reader, writer = await asyncio.open_connection(self._host, self._port)
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._port),
+                timeout=self._connect_timeout,
+            )
         except Exception as err:
             raise FelicityApiError(
                 f"Error connecting to {self._host}:{self._port}: {err}"
@@ -86,9 +267,11 @@ class FelicityClient:
 
             data = b""
             # Some devices send one or several JSON objects back-to-back.
-            for _ in range(40):
+            for _ in range(self._max_read_chunks):
                 try:
-                    chunk = await asyncio.wait_for(reader.read(2048), timeout=0.5)
+                    chunk = await asyncio.wait_for(
+                        reader.read(self._read_chunk_size), timeout=self._read_timeout
+                    )
                 except asyncio.TimeoutError:
                     break
                 if not chunk:
@@ -159,6 +342,444 @@ class FelicityClient:
                 _LOGGER.debug("Skip invalid JSON chunk %r: %s", obj, err)
         return parsed
 
-    def _parse_first_json_object(self, text: str) -> Any:
-        parts = self._parse_all_json_objects(text)
+
+class FelicityClient:
+    """Client for the Felicity inverter local API over a pluggable transport."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        max_read_chunks: int = DEFAULT_MAX_READ_CHUNKS,
+        queue: Optional[FelicityHostQueue] = None,
+        capture_settings_packs: bool = False,
+        transport: Optional[FelicityTransport] = None,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._queue = queue or get_host_queue(host, port)
+        self._transport: FelicityTransport = transport or JsonTransport(
+            host,
+            port,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            read_chunk_size=read_chunk_size,
+            max_read_chunks=max_read_chunks,
+        )
+
+        # Settings change maybe once a month: keep the last parsed result keyed
+        # by a hash of the raw response and hand out the same object while the
+        # device keeps returning identical bytes. The raw packs are only kept
+        # when debug capture is enabled.
+        self._settings_hash: Optional[str] = None
+        self._settings: Optional[Dict[str, Any]] = None
+        self._settings_pack_count = 0
+        self._capture_settings_packs = capture_settings_packs
+        self._settings_packs: Optional[List[Dict[str, Any]]] = None
+        self._settings_listeners: List[Callable[[Dict[str, Tuple[Any, Any]]], None]] = []
+
+        # The dongle often repeats its cached frame when polled faster than it
+        # refreshes; such frames are answered with the previous result as-is.
+        self._real_raw: Optional[str] = None
+        self._data: Optional[Dict[str, Any]] = None
+        self.frame_stale = False
+
+        # Cycles never overlap; a caller arriving mid-cycle shares its outcome.
+        self._inflight: Optional[asyncio.Future] = None
+        # Last `basice infor`, reused when a deadline defers the read.
+        self._basic: Optional[Dict[str, Any]] = None
+        self._read_seconds: Dict[str, float] = {}
+        self.deferred_reads = 0
+
+        # Health counters (exported as metrics).
+        self.requests_total = 0
+        self.errors_total = 0
+        self.last_request_seconds: Optional[float] = None
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def queue(self) -> FelicityHostQueue:
+        return self._queue
+
+    @property
+    def transport(self) -> FelicityTransport:
+        return self._transport
+
+    @property
+    def settings_pack_count(self) -> int:
+        """Number of JSON packs in the last parsed `set infor` response."""
+        return self._settings_pack_count
+
+    @property
+    def last_data(self) -> Optional[Dict[str, Any]]:
+        """Last combined result handed out (None before the first poll)."""
+        return self._data
+
+    def configure(
+        self,
+        *,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        read_chunk_size: Optional[int] = None,
+        max_read_chunks: Optional[int] = None,
+        capture_settings_packs: Optional[bool] = None,
+    ) -> None:
+        """Change transport tuning; takes effect with the next request."""
+        self._transport.configure(
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            read_chunk_size=read_chunk_size,
+            max_read_chunks=max_read_chunks,
+        )
+        if (
+            capture_settings_packs is not None
+            and capture_settings_packs != self._capture_settings_packs
+        ):
+            self._capture_settings_packs = capture_settings_packs
+            # Re-parse the next response so packs appear (or are dropped) right away.
+            self._settings_hash = None
+            if not capture_settings_packs:
+                self._settings_packs = None
+
+    def add_settings_listener(
+        self, listener: Callable[[Dict[str, Tuple[Any, Any]]], None]
+    ) -> Callable[[], None]:
+        """Register a callback fired with {key: (old, new)} when settings change.
+
+        Returns a function that removes the listener.
+        """
+        self._settings_listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._settings_listeners:
+                self._settings_listeners.remove(listener)
+
+        return _remove
+
+    async def async_get_data(self, deadline: Optional[float] = None) -> dict:
+        """Read the runtime, basic and settings blocks and combine them into one dict.
+
+        Over the JSON transport the blocks are:
+          - wifilocalMonitor:get dev real infor   -> runtime telemetry (JSON)
+          - wifilocalMonitor:get dev basice infor -> versions / type (JSON)
+          - wifilocalMonitor:get dev set infor    -> settings (can be multiple JSON objects glued)
+
+        If the runtime frame is byte-identical to the previous one, or carries
+        the same device `date`, the previous dict is returned unchanged (same
+        object) without decoding or reading basic/settings, and `frame_stale`
+        is set.
+
+        `deadline` (seconds) bounds the whole cycle. Runtime gets all of it
+        (except on cycles before basic was first read, which read basic first
+        for the serial); basic and settings are skipped (previous values kept)
+        when too little is left. Cycles never overlap: a call made while one runs waits for it
+        and gets the same outcome, its error included.
+        """
+        if self._inflight is not None:
+            # Shielded: a cancelled joiner must not cancel the shared cycle.
+            return await asyncio.shield(self._inflight)
+        inflight = self._inflight = asyncio.get_running_loop().create_future()
+        try:
+            ends = None if deadline is None else time.monotonic() + deadline
+            data = await self._async_poll(ends)
+        except asyncio.CancelledError:
+            inflight.set_exception(FelicityApiError("Poll cycle was cancelled"))
+            raise
+        except Exception as err:
+            inflight.set_exception(err)
+            raise
+        else:
+            inflight.set_result(data)
+            return data
+        finally:
+            self._inflight = None
+            if inflight.done() and not inflight.cancelled():
+                inflight.exception()  # retrieved: no "never retrieved" log
+
+    async def _async_poll(self, ends: Optional[float]) -> dict:
+        data: Dict[str, Any] = {}
+
+        # Until basic has been read once it goes first: Modbus runtime
+        # registers carry no serial, the first snapshot needs it from basic.
+        basic_first = self._basic is None
+        if basic_first:
+            await self._async_read_basic(ends)
+
+        # 1) Runtime
+        real_raw = await self._async_read_within(BLOCK_RUNTIME, PRIORITY_RUNTIME, ends)
+        if self._data is not None and self._is_repeated_frame(real_raw):
+            self._real_raw = real_raw
+            self.frame_stale = True
+            return self._data
+
+        real = self._parse_first(BLOCK_RUNTIME, real_raw)
+        if not isinstance(real, dict):
+            raise FelicityApiError(f"Unexpected runtime payload: {real_raw!r}")
+        data.update(real)
+
+        # 2) Basic info
+        if not basic_first:
+            await self._async_read_basic(ends)
+        if self._basic is not None:
+            data["_basic"] = self._basic
+
+        # 3) Settings (may be multiple JSON objects in one response)
+        if self._has_budget(BLOCK_SETTINGS, ends):
+            try:
+                set_raw = await self._async_read_within(
+                    BLOCK_SETTINGS, PRIORITY_SETTINGS, ends
+                )
+                self._update_settings(set_raw)
+            except Exception as err:
+                _LOGGER.debug("Failed to read settings info: %s", err)
+
+        if self._settings:
+            data["_settings"] = self._settings
+        if self._settings_packs is not None:
+            data["_settings_packs"] = self._settings_packs
+
+        self._real_raw = real_raw
+        self._data = data
+        self.frame_stale = False
+        return data
+
+    async def _async_read_basic(self, ends: Optional[float]) -> None:
+        if not self._has_budget(BLOCK_BASIC, ends):
+            return
+        try:
+            basic_raw = await self._async_read_within(BLOCK_BASIC, PRIORITY_BASIC, ends)
+            basic = self._parse_first(BLOCK_BASIC, basic_raw)
+            if isinstance(basic, dict):
+                self._basic = basic
+        except Exception as err:
+            _LOGGER.debug("Failed to read basic info: %s", err)
+
+    def _is_repeated_frame(self, real_raw: Any) -> bool:
+        if real_raw == self._real_raw:
+            return True
+        if not isinstance(real_raw, str):
+            return False
+        match = _DATE_RE.search(real_raw)
+        return match is not None and match.group(1) == str(self._data.get("date"))
+
+    async def async_write_settings(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Write several settings in one transaction, then verify with one read.
+
+        All values are validated first; nothing is sent if any is invalid. The
+        dongle is held for the write and the `set infor` readback together.
+        Returns the last runtime dict with the re-read settings merged in.
+        """
+        payload = {key: validate_setting(key, value) for key, value in changes.items()}
+        if not payload:
+            return self._data or {}
+        if not self._transport.supports_writes:
+            raise FelicityApiError(
+                f"Settings writes are not supported over {self._transport.name}"
+            )
+
+        async with self._queue.slot(PRIORITY_RUNTIME):
+            try:
+                reply = await self._async_exchange(self._transport.async_write(payload))
+            except FelicityApiError as err:
+                # Some firmwares apply the write and just close the socket.
+                _LOGGER.debug("No reply to settings write %s: %s", payload, err)
+            else:
+                _LOGGER.debug("Settings write %s replied %r", payload, reply)
+            set_raw = await self._async_exchange(self._transport.async_read(BLOCK_SETTINGS))
+
+        self._update_settings(set_raw)
+        settings = self._settings or {}
+        not_applied = {
+            key: settings.get(key)
+            for key, value in payload.items()
+            if settings.get(key) != value
+        }
+
+        if self._data is not None:
+            self._data = {**self._data, "_settings": self._settings}
+            if self._settings_packs is not None:
+                self._data["_settings_packs"] = self._settings_packs
+
+        if not_applied:
+            raise FelicityApiError(
+                f"Inverter did not apply {sorted(not_applied)} "
+                f"(requested {payload}, read back {not_applied})"
+            )
+        return self._data or {}
+
+    async def async_get_basic(self) -> Dict[str, Any]:
+        """Read the basic block only (versions / type / serials)."""
+        basic_raw = await self._async_read_raw(BLOCK_BASIC, PRIORITY_BASIC)
+        basic = self._parse_first(BLOCK_BASIC, basic_raw)
+        if not isinstance(basic, dict):
+            raise FelicityApiError(f"Unexpected basic payload: {basic_raw!r}")
+        return basic
+
+    async def async_close(self) -> None:
+        """Close the transport's connection, if it keeps one."""
+        await self._transport.async_close()
+
+    def _has_budget(self, block: str, ends: Optional[float]) -> bool:
+        """Whether a lower-priority read fits in what is left of the deadline."""
+        if ends is None:
+            return True
+        needed = max(MIN_READ_BUDGET, 1.5 * self._read_seconds.get(block, 0.0))
+        if ends - time.monotonic() >= needed:
+            return True
+        self.deferred_reads += 1
+        _LOGGER.debug("Deferring %s read on %s: poll deadline nearly spent", block, self._host)
+        return False
+
+    async def _async_read_within(
+        self, block: str, priority: int, ends: Optional[float]
+    ) -> Any:
+        """`_async_read_raw` bounded by the cycle deadline (queue wait included)."""
+        start = time.monotonic()
+        if ends is None:
+            raw = await self._async_read_raw(block, priority)
+        else:
+            remaining = ends - start
+            if remaining <= 0:
+                raise FelicityApiError("Poll deadline exceeded")
+            try:
+                raw = await asyncio.wait_for(
+                    self._async_read_raw(block, priority), remaining
+                )
+            except asyncio.TimeoutError as err:
+                raise FelicityApiError(
+                    f"Poll deadline exceeded waiting for {block}"
+                ) from err
+        self._read_seconds[block] = time.monotonic() - start
+        return raw
+
+    async def _async_read_raw(self, block: str, priority: int = PRIORITY_RUNTIME) -> Any:
+        """Wait for the dongle on the shared host queue, then read one block."""
+        async with self._queue.slot(priority):
+            return await self._async_exchange(self._transport.async_read(block))
+
+    async def _async_exchange(self, request: Awaitable[Any]) -> Any:
+        """Run one transport request, keeping health counters."""
+        self.requests_total += 1
+        start = time.monotonic()
+        try:
+            return await request
+        except FelicityApiError:
+            self.errors_total += 1
+            raise
+        finally:
+            self.last_request_seconds = time.monotonic() - start
+
+    # ------------------------- Settings cache -------------------------
+
+    def _update_settings(self, raw: Any) -> None:
+        """Parse a settings response unless it is byte-identical to the last one."""
+        if isinstance(raw, str):
+            raw_bytes = raw.encode("ascii", errors="ignore")
+        else:
+            raw_bytes = raw
+        digest = hashlib.sha1(raw_bytes).hexdigest()
+        if digest == self._settings_hash:
+            return
+
+        parts = self._transport.parse(BLOCK_SETTINGS, raw)
+
+        # Device may return multiple JSON objects back-to-back (ttlPack/index).
+        # Settings are held once, merged; pack bookkeeping is dropped and keys
+        # are interned (they repeat across inverters and responses).
+        merged: Dict[str, Any] = {}
+        packs = [p for p in parts if isinstance(p, dict)]
+        for p in packs:
+            for key, value in p.items():
+                if key not in _PACK_KEYS:
+                    merged[sys.intern(key)] = value
+
+        if not merged:
+            # Do not remember the hash of an unusable response.
+            return
+
+        old = self._settings
+        self._settings_hash = digest
+        self._settings = merged
+        self._settings_pack_count = len(packs)
+        self._settings_packs = packs if self._capture_settings_packs else None
+
+        if old is None:
+            return
+
+        diff = self._diff_settings(old, merged)
+        if not diff:
+            return
+
+        _LOGGER.debug("Settings changed on %s: %s", self._host, diff)
+        for listener in list(self._settings_listeners):
+            try:
+                listener(diff)
+            except Exception:
+                _LOGGER.exception("Error in settings listener")
+
+    @staticmethod
+    def _diff_settings(
+        old: Dict[str, Any], new: Dict[str, Any]
+    ) -> Dict[str, Tuple[Any, Any]]:
+        # Pack bookkeeping changes with response framing, not with the settings.
+        diff: Dict[str, Tuple[Any, Any]] = {}
+        for key in old.keys() | new.keys():
+            if key in _PACK_KEYS:
+                continue
+            before = old.get(key)
+            after = new.get(key)
+            if before != after:
+                diff[key] = (before, after)
+        return diff
+
+    def _parse_first(self, block: str, raw: Any) -> Any:
+        parts = self._transport.parse(block, raw)
         return parts[0] if parts else None
+
+
+async def async_discover(
+    network: str,
+    port: int,
+    *,
+    concurrency: int = 64,
+    timeout: float = 0.5,
+    registry: Optional[Dict[Tuple[str, int], FelicityHostQueue]] = None,
+) -> List[Dict[str, Any]]:
+    """Scan a subnet for Felicity dongles listening on `port`.
+
+    Hosts are probed concurrently (bounded by `concurrency`) with a short
+    connect timeout; every open port is confirmed with `basice infor`.
+    Returns one dict per confirmed unit: host, port, serial, basic.
+    """
+    net = ipaddress.ip_network(network, strict=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    if registry is None:
+        registry = _HOST_QUEUES
+
+    async def _probe(host: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            client = FelicityClient(
+                host,
+                port,
+                connect_timeout=timeout,
+                # Only queue behind dongles someone already talks to.
+                queue=registry.get((host, port)) or FelicityHostQueue(),
+            )
+            try:
+                basic = await client.async_get_basic()
+            except FelicityApiError:
+                return None
+        serial = basic.get("DevSN") or basic.get("wifiSN") or host
+        return {"host": host, "port": port, "serial": str(serial), "basic": basic}
+
+    results = await asyncio.gather(*(_probe(str(ip)) for ip in net.hosts()))
+    found = [r for r in results if r is not None]
+    _LOGGER.debug("Discovery on %s:%s found %s", network, port, found)
+    return found
@@ -10,13 +10,14 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntityDescription,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_DATA_STALE
+from .entity import FelicityEntity
+from .flags import FLAG_BITS, FLAG_NAMES, is_named
 
 
 @dataclass
@@ -51,6 +52,15 @@ BINARY_SENSOR_DESCRIPTIONS: tuple[FelicityBinarySensorDescription, ...] = (
     ),
 )
 
+# Top-level payload field each binary sensor is derived from; sensors are only
+# created once the device reports it.
+BINARY_SENSOR_SOURCES: dict[str, str] = {
+    "fault_active": "fault",
+    "warning_active": "warn",
+    "ac_input_present": "ACin",
+    "battery_present": "Batt",
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -61,53 +71,69 @@ async def async_setup_entry(
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator = data["coordinator"]
 
-    entities: list[FelicityBinarySensor] = [
-        FelicityBinarySensor(coordinator, entry, desc)
-        for desc in BINARY_SENSOR_DESCRIPTIONS
-    ]
-    async_add_entities(entities)
-
-
-class FelicityBinarySensor(CoordinatorEntity, BinarySensorEntity):
+    remaining = list(BINARY_SENSOR_DESCRIPTIONS)
+
+    @callback
+    def _async_add_supported() -> None:
+        if not remaining:
+            return
+        payload = coordinator.data or {}
+        entities: list[BinarySensorEntity] = []
+        for desc in list(remaining):
+            source = BINARY_SENSOR_SOURCES.get(desc.key)
+            if source is None or payload.get(source) is not None:
+                entities.append(FelicityBinarySensor(coordinator, entry, desc))
+                remaining.remove(desc)
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_supported()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_supported))
+
+    # Flag bits: an entity for every bit with a real name once its word is
+    # reported, and for a generically named bit once it has been seen set.
+    # All other bits are only listed by the Active Flags sensor.
+    created_bits: set[tuple[str, int]] = set()
+    seen_flags: list[Any] = [None, None]
+
+    @callback
+    def _async_add_flags() -> None:
+        words, active = coordinator.flag_words, coordinator.active_flags
+        if words is seen_flags[0] and active is seen_flags[1]:
+            return
+        seen_flags[:] = [words, active]
+        candidates = [
+            (word, bit)
+            for word, value in words.items()
+            if value is not None
+            for bit in range(len(FLAG_NAMES[word]))
+            if is_named(word, bit)
+        ]
+        candidates.extend(FLAG_BITS[name] for name in active)
+        entities: list[FelicityFlagBinarySensor] = []
+        for word, bit in candidates:
+            if (word, bit) not in created_bits:
+                created_bits.add((word, bit))
+                entities.append(FelicityFlagBinarySensor(coordinator, entry, word, bit))
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_flags()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_flags))
+    async_add_entities([FelicityDataStaleBinarySensor(coordinator, entry)])
+
+
+class FelicityBinarySensor(FelicityEntity, BinarySensorEntity):
     """Representation of a Felicity binary sensor."""
 
-    _attr_has_entity_name = True
-
     def __init__(
         self,
         coordinator,
         entry: ConfigEntry,
         description: FelicityBinarySensorDescription,
     ) -> None:
-        super().__init__(coordinator)
+        super().__init__(coordinator, entry, description.key)
         self.entity_description = description
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
-
-    @property
-    def device_info(self) -> dict[str, Any]:
-        """Return device info to group entities into one device."""
-        data = self.coordinator.data or {}
-        serial = data.get("DevSN") or data.get("wifiSN") or self._entry.entry_id
-        basic = data.get("_basic") or {}
-        sw_version = basic.get("version")
-        host = self._entry.data.get(CONF_HOST)
-        serial_display = f"{serial} ({host})" if host else serial
-
-        inv_type = basic.get("Type") or data.get("Type")
-        inv_subtype = basic.get("SubType") or data.get("SubType")
-        model = "Felicity Inverter"
-        if inv_type is not None and inv_subtype is not None:
-            model = f"Felicity Inverter Type {inv_type} SubType {inv_subtype}"
-
-        return {
-            "identifiers": {(DOMAIN, str(serial))},
-            "name": self._entry.data.get("name", "Felicity Inverter"),
-            "manufacturer": "Felicity",
-            "model": model,
-            "sw_version": sw_version,
-            "serial_number": serial_display,
-        }
 
     @property
     def is_on(self) -> bool | None:
@@ -150,3 +176,79 @@ class FelicityBinarySensor(CoordinatorEntity, BinarySensorEntity):
                 return None
 
         return None
+
+
+class FelicityDataStaleBinarySensor(FelicityEntity, BinarySensorEntity):
+    """On while failed polls are bridged with the last good snapshot."""
+
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_name = "Data Stale"
+
+    def __init__(self, coordinator, entry: ConfigEntry) -> None:
+        super().__init__(coordinator, entry, "data_stale")
+        self._last_available: bool | None = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DATA_STALE.format(self._entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Only availability matters here; the flag itself comes via dispatcher."""
+        available = self.coordinator.last_update_success
+        if available == self._last_available:
+            return
+        self._last_available = available
+        super()._handle_coordinator_update()
+
+    @property
+    def is_on(self) -> bool:
+        return self.coordinator.data_stale
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        age = self.coordinator.data_age
+        return {
+            "data_age": None if age is None else round(age),
+            "failed_polls": self.coordinator.failed_polls,
+        }
+
+
+class FelicityFlagBinarySensor(FelicityEntity, BinarySensorEntity):
+    """One bit of a warning/BMS flag word (disabled by default unless named)."""
+
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry: ConfigEntry, word: str, bit: int) -> None:
+        name = FLAG_NAMES[word][bit]
+        super().__init__(coordinator, entry, f"flag_{name}")
+        self._attr_entity_registry_enabled_default = is_named(word, bit)
+        self._word = word
+        self._mask = 1 << bit
+        self._attr_name = f"Flag {name}"
+        self._last: tuple[int | None, bool] | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when this flag's word changed."""
+        state = (
+            self.coordinator.flag_words.get(self._word),
+            self.coordinator.last_update_success,
+        )
+        if state == self._last:
+            return
+        self._last = state
+        super()._handle_coordinator_update()
+
+    @property
+    def is_on(self) -> bool | None:
+        value = self.coordinator.flag_words.get(self._word)
+        return None if value is None else bool(value & self._mask)
@@ -1,65 +1,351 @@
 from __future__ import annotations
 # -*- coding: utf-8 -*-
 
+from collections.abc import Mapping
+import ipaddress
 from typing import Any
+from urllib.parse import urlparse
 import logging
 
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DEFAULT_PORT, DOMAIN
+from .api import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_READ_CHUNKS,
+    DEFAULT_READ_CHUNK_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    SHARED_QUEUES_KEY,
+    async_discover,
+)
+from .const import (
+    CONF_CAPTURE_SETTINGS_PACKS,
+    CONF_CONNECT_TIMEOUT,
+    CONF_ENABLE_WRITES,
+    CONF_EXPORT_TOKEN,
+    CONF_EXPORT_URL,
+    CONF_LOOP_BUDGET,
+    CONF_MAX_READ_CHUNKS,
+    CONF_POLL_DEADLINE,
+    CONF_READ_CHUNK_SIZE,
+    CONF_READ_TIMEOUT,
+    CONF_SCAN_INTERVAL,
+    CONF_STALE_GRACE,
+    CONF_SUBNET,
+    CONF_TRANSPORT,
+    CONF_UNIT_ID,
+    DEFAULT_PORT,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE,
+    DEFAULT_SUBNET,
+    DEFAULT_UNIT_ID,
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_MAX_HOSTS,
+    DISCOVERY_TIMEOUT,
+    DOMAIN,
+    EXPORT_SCHEMES,
+    TRANSPORT_JSON,
+    TRANSPORT_MODBUS,
+)
+from .modbus import MODBUS_DEFAULT_PORT
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def endpoint_id(data: Mapping[str, Any]) -> str:
+    """`host:port` of an entry, plus `:unit_id` for Modbus.
+
+    Several Modbus units can sit behind one gateway (same host and port),
+    told apart only by their unit id.
+    """
+    endpoint = f"{data[CONF_HOST]}:{data[CONF_PORT]}"
+    if data.get(CONF_TRANSPORT) == TRANSPORT_MODBUS:
+        endpoint = f"{endpoint}:{data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID)}"
+    return endpoint
+
+
 class FelicityConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Felicity Inverter local device."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        self._port: int = DEFAULT_PORT
+        self._discovered: dict[str, dict[str, Any]] = {}
+        self._manual: dict[str, Any] = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> FelicityOptionsFlow:
+        """Return the options flow handler."""
+        return FelicityOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None,
     ) -> FlowResult:
-        """Handle the initial step where user selects host/port."""
-        errors: dict[str, str] = {}
+        """Let the user either scan a subnet or enter host/port manually."""
+        return self.async_show_menu(
+            step_id="user",
+            menu_options={
+                "scan": "Scan subnet for inverters",
+                "manual": "Enter host manually",
+            },
+        )
 
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None,
+    ) -> FlowResult:
+        """Handle the step where user enters name, host and transport."""
         if user_input is not None:
-            host = user_input[CONF_HOST]
-            port = user_input[CONF_PORT]
+            self._manual = {CONF_TRANSPORT: TRANSPORT_JSON, **user_input}
+            return await self.async_step_connection()
 
-            # Do not allow duplicates for the same host:port within this integration.
-            for existing in self._async_current_entries():
-                if (
-                    existing.data.get(CONF_HOST) == host
-                    and existing.data.get(CONF_PORT) == port
-                ):
-                    return self.async_abort(reason="already_configured")
+        fields: dict[Any, Any] = {
+            vol.Required(CONF_NAME, default="Felicity Inverter"): str,
+            vol.Required(CONF_HOST): str,
+        }
+        if self.show_advanced_options:
+            # The Modbus register map is not verified against hardware yet, so
+            # it is only offered in advanced mode and labelled as such.
+            fields[vol.Required(CONF_TRANSPORT, default=TRANSPORT_JSON)] = vol.In(
+                {
+                    TRANSPORT_JSON: "WiFi dongle (wifilocalMonitor, port 53970)",
+                    TRANSPORT_MODBUS: (
+                        "Modbus TCP via RS485 gateway (port 502) - experimental, "
+                        "unverified register map"
+                    ),
+                }
+            )
+        data_schema = vol.Schema(fields)
 
-            await self.async_set_unique_id(f"{host}:{port}")
-            self._abort_if_unique_id_configured()
+        return self.async_show_form(step_id="manual", data_schema=data_schema)
 
-            return self.async_create_entry(
-                title=user_input[CONF_NAME],
-                data={
-                    CONF_NAME: user_input[CONF_NAME],
-                    CONF_HOST: host,
-                    CONF_PORT: port,
-                },
+    async def async_step_connection(
+        self, user_input: dict[str, Any] | None = None,
+    ) -> FlowResult:
+        """Ask for the port (and Modbus unit id), defaulting per transport."""
+        transport = self._manual[CONF_TRANSPORT]
+        if user_input is not None:
+            return await self._async_create(
+                self._manual[CONF_NAME],
+                self._manual[CONF_HOST],
+                user_input[CONF_PORT],
+                transport=transport,
+                unit_id=user_input.get(CONF_UNIT_ID, DEFAULT_UNIT_ID),
             )
 
+        if transport == TRANSPORT_MODBUS:
+            data_schema = vol.Schema(
+                {
+                    vol.Required(CONF_PORT, default=MODBUS_DEFAULT_PORT): int,
+                    vol.Required(CONF_UNIT_ID, default=DEFAULT_UNIT_ID): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=247)
+                    ),
+                }
+            )
+        else:
+            data_schema = vol.Schema(
+                {vol.Required(CONF_PORT, default=DEFAULT_PORT): int}
+            )
+
+        return self.async_show_form(step_id="connection", data_schema=data_schema)
+
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None,
+    ) -> FlowResult:
+        """Scan a subnet concurrently for dongles answering on the API port."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            try:
+                network = ipaddress.ip_network(user_input[CONF_SUBNET], strict=False)
+            except ValueError:
+                errors[CONF_SUBNET] = "invalid_subnet"
+            else:
+                if network.num_addresses > DISCOVERY_MAX_HOSTS:
+                    errors[CONF_SUBNET] = "subnet_too_large"
+
+            if not errors:
+                self._port = user_input[CONF_PORT]
+                configured = {
+                    (entry.data.get(CONF_HOST), entry.data.get(CONF_PORT))
+                    for entry in self._async_current_entries()
+                }
+                found = await async_discover(
+                    str(network),
+                    self._port,
+                    concurrency=DISCOVERY_CONCURRENCY,
+                    timeout=DISCOVERY_TIMEOUT,
+                    registry=self.hass.data.get(SHARED_QUEUES_KEY),
+                )
+                self._discovered = {
+                    unit["host"]: unit
+                    for unit in found
+                    if (unit["host"], self._port) not in configured
+                }
+                if not self._discovered:
+                    return self.async_abort(reason="no_devices_found")
+                return await self.async_step_pick()
+
         data_schema = vol.Schema(
             {
-                vol.Required(CONF_NAME, default="Felicity Inverter"): str,
-                vol.Required(CONF_HOST): str,
+                vol.Required(CONF_SUBNET, default=DEFAULT_SUBNET): str,
                 vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
             }
         )
 
         return self.async_show_form(
-            step_id="user",
+            step_id="scan",
             data_schema=data_schema,
             errors=errors,
         )
+
+    async def async_step_pick(
+        self, user_input: dict[str, Any] | None = None,
+    ) -> FlowResult:
+        """Pick one of the discovered units (listed by serial)."""
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            serial = self._discovered[host]["serial"]
+            return await self._async_create(
+                user_input[CONF_NAME],
+                host,
+                self._port,
+                # Discovery falls back to the host when the unit reports no serial.
+                serial=serial if serial != host else None,
+            )
+
+        units = {
+            host: f"{unit['serial']} ({host})"
+            for host, unit in sorted(self._discovered.items())
+        }
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_HOST): vol.In(units),
+                vol.Required(CONF_NAME, default="Felicity Inverter"): str,
+            }
+        )
+
+        return self.async_show_form(step_id="pick", data_schema=data_schema)
+
+    async def _async_create(
+        self,
+        name: str,
+        host: str,
+        port: int,
+        *,
+        serial: str | None = None,
+        transport: str = TRANSPORT_JSON,
+        unit_id: int = DEFAULT_UNIT_ID,
+    ) -> FlowResult:
+        if serial:
+            # Keyed by serial: a unit that moved to a new IP (DHCP) updates the
+            # existing entry's host instead of becoming a second entry.
+            await self.async_set_unique_id(serial)
+            self._abort_if_unique_id_configured(
+                updates={CONF_HOST: host, CONF_PORT: port}
+            )
+
+        data = {
+            CONF_NAME: name,
+            CONF_HOST: host,
+            CONF_PORT: port,
+            CONF_TRANSPORT: transport,
+            CONF_UNIT_ID: unit_id,
+        }
+        endpoint = endpoint_id(data)
+
+        # Do not allow duplicates for the same endpoint within this integration.
+        for existing in self._async_current_entries():
+            if CONF_HOST in existing.data and endpoint_id(existing.data) == endpoint:
+                return self.async_abort(reason="already_configured")
+
+        if not serial:
+            # Manual entry: re-keyed by serial once the first poll reports it.
+            await self.async_set_unique_id(endpoint)
+            self._abort_if_unique_id_configured()
+
+        return self.async_create_entry(title=name, data=data)
+
+
+class FelicityOptionsFlow(config_entries.OptionsFlow):
+    """Per-entry polling/transport tuning, applied live without a reload."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None,
+    ) -> FlowResult:
+        """Show the tuning form."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            export_url = user_input.get(CONF_EXPORT_URL, "").strip()
+            if export_url and urlparse(export_url).scheme not in EXPORT_SCHEMES:
+                errors[CONF_EXPORT_URL] = "invalid_export_url"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_SCAN_INTERVAL,
+                    default=options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_CONNECT_TIMEOUT,
+                    default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+                vol.Required(
+                    CONF_READ_TIMEOUT,
+                    default=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.05, max=10)),
+                vol.Required(
+                    CONF_READ_CHUNK_SIZE,
+                    default=options.get(CONF_READ_CHUNK_SIZE, DEFAULT_READ_CHUNK_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=256, max=65536)),
+                vol.Required(
+                    CONF_MAX_READ_CHUNKS,
+                    default=options.get(CONF_MAX_READ_CHUNKS, DEFAULT_MAX_READ_CHUNKS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+                vol.Required(
+                    CONF_POLL_DEADLINE,
+                    default=options.get(CONF_POLL_DEADLINE, 0),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=600)),
+                vol.Required(
+                    CONF_STALE_GRACE,
+                    default=options.get(CONF_STALE_GRACE, DEFAULT_STALE_GRACE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Required(
+                    CONF_ENABLE_WRITES,
+                    default=options.get(CONF_ENABLE_WRITES, False),
+                ): bool,
+                vol.Required(
+                    CONF_CAPTURE_SETTINGS_PACKS,
+                    default=options.get(CONF_CAPTURE_SETTINGS_PACKS, False),
+                ): bool,
+                vol.Required(
+                    CONF_LOOP_BUDGET,
+                    default=options.get(CONF_LOOP_BUDGET, 0),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10000)),
+                vol.Optional(
+                    CONF_EXPORT_URL,
+                    description={"suggested_value": options.get(CONF_EXPORT_URL)},
+                ): str,
+                vol.Optional(
+                    CONF_EXPORT_TOKEN,
+                    description={"suggested_value": options.get(CONF_EXPORT_TOKEN)},
+                ): str,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="init", data_schema=data_schema, errors=errors
+        )
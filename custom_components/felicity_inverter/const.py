@@ -8,7 +8,105 @@ DOMAIN = "felicity_inverter"
 DEFAULT_PORT = 53970
 DEFAULT_SCAN_INTERVAL = 30  # seconds
 
+# Entry data: wire protocol. "json" is the WiFi dongle's wifilocalMonitor API,
+# "modbus" Modbus TCP through an RS485 gateway (usually port 502).
+CONF_TRANSPORT = "transport"
+CONF_UNIT_ID = "unit_id"
+TRANSPORT_JSON = "json"
+TRANSPORT_MODBUS = "modbus"
+DEFAULT_UNIT_ID = 1
+
+# Subnet discovery (config flow)
+CONF_SUBNET = "subnet"
+DEFAULT_SUBNET = "192.168.1.0/24"
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_TIMEOUT = 0.5  # seconds, per connect
+DISCOVERY_MAX_HOSTS = 1024
+
+# Entry data: PV layout locked by detection, and the firmware it was seen on.
+CONF_PV_LAYOUT = "pv_layout"
+CONF_PV_LAYOUT_FIRMWARE = "pv_layout_firmware"
+
+# Options (live-tunable per entry, see FelicityOptionsFlow)
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_READ_CHUNK_SIZE = "read_chunk_size"
+CONF_MAX_READ_CHUNKS = "max_read_chunks"
+CONF_EXPORT_URL = "export_url"
+CONF_EXPORT_TOKEN = "export_token"
+CONF_CAPTURE_SETTINGS_PACKS = "capture_settings_packs"  # keep raw `set infor` packs
+CONF_STALE_GRACE = "stale_grace"  # seconds of serving the last good data on errors
+CONF_LOOP_BUDGET = "loop_budget"  # ms of synchronous work per update cycle; 0 = off
+CONF_POLL_DEADLINE = "poll_deadline"  # seconds per poll cycle; 0 = auto
+# Settings writes (number/select entities, set_settings) are opt-in: the write
+# command and value ranges are not confirmed on real firmware yet.
+CONF_ENABLE_WRITES = "enable_writes"
+
+# Setting writes from entities are coalesced for this long into one transaction.
+SETTINGS_WRITE_DELAY = 1.5  # seconds
+
+# Local energy integration (channels without device counters)
+LOCAL_ENERGY_MAX_GAP = 300  # seconds; longer gaps are not integrated across
+LOCAL_ENERGY_SAVE_DELAY = 60  # seconds between persisted accumulator saves
+LOCAL_ENERGY_WRITE_INTERVAL = 60  # seconds between state writes of those sensors
+
+# Time-series export (see exporter.py)
+EXPORT_SCHEMES = ("http", "https", "mqtt", "file")
+EXPORT_QUEUE_SIZE = 1000  # points kept in memory before spilling to disk
+EXPORT_BATCH_SIZE = 100  # points per write
+EXPORT_FLUSH_INTERVAL = 10  # seconds between flushes of a partial batch
+EXPORT_BACKOFF_MIN = 5  # seconds; doubled per failed write
+EXPORT_BACKOFF_MAX = 300
+EXPORT_SPOOL_MAX_BYTES = 10 * 1024 * 1024  # oldest spilled points dropped beyond this
+
+# External statistics from device energy counters (see statistics.py)
+STATISTICS_RESET_THRESHOLD = 1.0  # kWh; larger counter drops are resets
+STATISTICS_MAX_GAP_HOURS = 24 * 31  # carry-forward rows written at most for this long
+
+# Stale-while-revalidate: failed polls within the grace window keep the last
+# good snapshot (entities stay available) and are retried at a short interval.
+DEFAULT_STALE_GRACE = 90  # seconds; 0 = entities go unavailable on the first failure
+STALE_RETRY_INTERVAL = 5  # seconds
+# Dispatcher signal (format with entry_id) sent when data_stale flips.
+SIGNAL_DATA_STALE = f"{DOMAIN}_data_stale_{{}}"
+
+# Poll deadline: one cycle (runtime, basic, settings) must finish within this
+# share of the update interval unless set explicitly; basic/settings are skipped
+# when too little of it is left.
+POLL_DEADLINE_FACTOR = 0.8
+
+# Event-loop watchdog (see watchdog.py)
+WATCHDOG_WORST_CYCLES = 10  # slowest cycles kept for diagnostics
+
+# Adaptive polling: every repeated ("stale") frame stretches the interval by one
+# step, up to DEFAULT/base interval * factor.
+STALE_INTERVAL_STEP = 5  # seconds
+STALE_INTERVAL_MAX_FACTOR = 4
+
+# Fired with {"entry_id", "host", "changes": {key: {"old", "new"}}} when `dev set infor` changes.
+EVENT_SETTINGS_CHANGED = f"{DOMAIN}_settings_changed"
+
+# Fired with {"entry_id", "host", "field", "old", "new", "transition", "date"} when
+# one of TRANSITION_FIELDS or a flag bit (field = flag name, old/new = bool) changes.
+# transition: "raised"/"cleared" for warnings, faults and flags, else "changed".
+EVENT_TRANSITION = f"{DOMAIN}_transition"
+TRANSITION_FIELDS = ("work_mode", "warning_code", "fault_code", "parallel_status")
+
 PLATFORMS: list[Platform] = [
     Platform.SENSOR,
     Platform.BINARY_SENSOR,
+    Platform.NUMBER,
+    Platform.SELECT,
 ]
+
+SERVICE_SET_SETTINGS = "set_settings"
+SERVICE_GET_SNAPSHOT = "get_snapshot"
+SERVICE_PROFILE = "profile"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_SETTINGS = "settings"
+ATTR_GROUPS = "groups"
+ATTR_CYCLES = "cycles"
+
+# Field groups returned by get_snapshot
+SNAPSHOT_GROUPS = ("runtime", "decoded", "energy", "settings", "basic")
@@ -0,0 +1,402 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+import logging
+import os
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .api import FelicityApiError, FelicityClient, validate_setting
+from .const import (
+    CONF_PV_LAYOUT,
+    CONF_PV_LAYOUT_FIRMWARE,
+    DEFAULT_STALE_GRACE,
+    DOMAIN,
+    EVENT_TRANSITION,
+    POLL_DEADLINE_FACTOR,
+    SETTINGS_WRITE_DELAY,
+    SIGNAL_DATA_STALE,
+    STALE_INTERVAL_MAX_FACTOR,
+    STALE_INTERVAL_STEP,
+    STALE_RETRY_INTERVAL,
+    TRANSITION_FIELDS,
+)
+from .energy import EnergyIntegrator
+from .flags import active_flags, read_flag_words
+from .profiler import CycleProfiler
+from .watchdog import LoopWatchdog
+from .profiles import (
+    PV_LAYOUT_PER_MPPT,
+    CompiledProfile,
+    PvLayoutDetector,
+    flatten_cells,
+    select_profile,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FelicityCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """Poll one inverter and fan out only frames the device actually refreshed."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        client: FelicityClient,
+        scan_interval: int,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{entry.data[CONF_HOST]}",
+            update_interval=timedelta(seconds=scan_interval),
+            # The client returns the very same dict for repeated frames;
+            # with always_update=False entities are not touched for them.
+            always_update=False,
+        )
+        self.entry = entry
+        self.client = client
+        self.base_interval = scan_interval
+        self.stale_frames = 0
+        self._last_stale = False
+
+        # Stale-while-revalidate: last good poll (monotonic) and whether the
+        # current data is served from it after failed polls.
+        self.stale_grace: float = DEFAULT_STALE_GRACE
+        self.last_good: float | None = None
+        self.data_stale = False
+        self.failed_polls = 0
+        # Seconds one poll cycle may take; 0 = POLL_DEADLINE_FACTOR * base interval.
+        self.poll_deadline: float = 0
+
+        # Decoded values of the current snapshot, keyed like the sensors.
+        self.profile: CompiledProfile | None = None
+        self.pv_layout: str = PV_LAYOUT_PER_MPPT
+        self.decoded: dict[str, Any] = {}
+        # Raw Temp/Batt/INV/Batsoc cells as one flat tuple; the tuple is only
+        # replaced when a value (or the matrix shape) changes.
+        self.cell_layout: tuple[tuple[str, int, int], ...] = ()
+        self.cell_index: dict[tuple[str, int, int], int] = {}
+        self.cell_values: tuple[Any, ...] = ()
+        # Flag words of the current snapshot; replaced (new dict) only on change.
+        self.flag_words: dict[str, int | None] = {}
+        self.active_flags: tuple[str, ...] = ()
+        # The PV layout is detected once per device/firmware and persisted.
+        self._pv_detector = PvLayoutDetector(
+            entry.data.get(CONF_PV_LAYOUT), entry.data.get(CONF_PV_LAYOUT_FIRMWARE)
+        )
+
+        # Energy for channels the device has no counters for.
+        self.energy = EnergyIntegrator(hass, entry.entry_id)
+
+        # On-demand cycle profiling (see profiler.py); summary kept for diagnostics.
+        self.profiler: CycleProfiler | None = None
+        self.last_profile: dict[str, Any] | None = None
+        # Optional event-loop budget check (see watchdog.py).
+        self.watchdog: LoopWatchdog | None = None
+
+        # Setting changes from entities are collected for a short while and
+        # written to the dongle as one transaction. Writes are opt-in.
+        self.writes_enabled = False
+        self._pending_writes: dict[str, int] = {}
+        self._write_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=SETTINGS_WRITE_DELAY,
+            immediate=False,
+            function=self._async_flush_debounced,
+        )
+
+    async def async_queue_setting(self, key: str, value: Any) -> None:
+        """Validate and queue one raw setting value for the next write transaction."""
+        self.check_writes_enabled()
+        self._pending_writes[key] = validate_setting(key, value)
+        await self._write_debouncer.async_call()
+
+    async def async_flush_settings(self) -> None:
+        """Write all queued settings now (one transaction + one readback)."""
+        self._write_debouncer.async_cancel()
+        changes, self._pending_writes = self._pending_writes, {}
+        if not changes:
+            return
+        try:
+            await self.client.async_write_settings(changes)
+        finally:
+            # Publish whatever was read back, applied or not.
+            if self.client.last_data is not None:
+                self._decode(self.client.last_data, settings_only=True)
+                self.async_set_updated_data(self.client.last_data)
+        _LOGGER.debug("%s: wrote settings %s", self.name, changes)
+
+    def check_writes_enabled(self) -> None:
+        """Raise ValueError unless settings writes are enabled for this entry."""
+        if not self.client.transport.supports_writes:
+            raise ValueError(
+                f"Settings writes are not supported over {self.client.transport.name}"
+            )
+        if not self.writes_enabled:
+            raise ValueError(
+                "Settings writes are disabled; enable them in the integration options"
+            )
+
+    async def _async_flush_debounced(self) -> None:
+        # Entity writes return before the debounced transaction runs, so a
+        # failure is surfaced as a notification, not only a log line.
+        notification_id = f"{DOMAIN}_write_failed_{self.entry.entry_id}"
+        try:
+            await self.async_flush_settings()
+        except FelicityApiError as err:
+            _LOGGER.error("%s: settings write failed: %s", self.name, err)
+            persistent_notification.async_create(
+                self.hass,
+                f"Writing settings to {self.entry.title} failed: {err}",
+                title="Felicity inverter settings write failed",
+                notification_id=notification_id,
+            )
+        else:
+            persistent_notification.async_dismiss(self.hass, notification_id)
+
+    def set_loop_budget(self, budget_ms: float) -> None:
+        """Enable (budget > 0), retune or disable the event-loop watchdog."""
+        if not budget_ms:
+            if self.watchdog is not None:
+                self.watchdog.stop()
+                self.watchdog = None
+            return
+        if self.watchdog is None:
+            self.watchdog = LoopWatchdog(self, budget_ms / 1000)
+            self.watchdog.start()
+        else:
+            self.watchdog.budget = budget_ms / 1000
+
+    def start_profile(self, cycles: int) -> None:
+        """Profile the next `cycles` update cycles; results go to a file and diagnostics."""
+        if self.profiler is not None:
+            raise RuntimeError(
+                f"Profiling already running ({self.profiler.completed}/{self.profiler.cycles})"
+            )
+        self.profiler = CycleProfiler(self, cycles, self._profile_done)
+        self.profiler.start()
+        _LOGGER.info("%s: profiling the next %s update cycles", self.name, cycles)
+
+    def _profile_done(self, profiler: CycleProfiler) -> None:
+        self.profiler = None
+        path = self.hass.config.path(
+            f"{DOMAIN}_profile_{self.entry.entry_id}_{int(profiler.started)}.collapsed"
+        )
+        self.last_profile = {**profiler.summary(), "file": path}
+        collapsed = profiler.collapsed()
+
+        def _write() -> None:
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(collapsed)
+
+        self.hass.async_add_executor_job(_write)
+        _LOGGER.info(
+            "%s: profile of %s cycles written to %s",
+            self.name,
+            profiler.completed,
+            os.path.basename(path),
+        )
+
+    async def async_shutdown(self) -> None:
+        """Cancel pending writes on unload."""
+        if self.profiler is not None:
+            self.profiler.finish()
+        self.set_loop_budget(0)
+        self._write_debouncer.async_cancel()
+        await self.energy.async_save()
+        await self.client.async_close()
+        await super().async_shutdown()
+
+    def set_base_interval(self, scan_interval: int) -> None:
+        """Apply a new configured interval right away (options flow)."""
+        self.base_interval = scan_interval
+        self._last_stale = False
+        self.update_interval = timedelta(seconds=scan_interval)
+
+    @property
+    def cycle_deadline(self) -> float:
+        """Effective deadline for one poll cycle in seconds."""
+        return self.poll_deadline or self.base_interval * POLL_DEADLINE_FACTOR
+
+    @property
+    def data_age(self) -> float | None:
+        """Seconds since the last successful poll."""
+        return None if self.last_good is None else time.monotonic() - self.last_good
+
+    def _set_data_stale(self, stale: bool) -> None:
+        if stale != self.data_stale:
+            self.data_stale = stale
+            async_dispatcher_send(
+                self.hass, SIGNAL_DATA_STALE.format(self.entry.entry_id)
+            )
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        try:
+            data = await self.client.async_get_data(deadline=self.cycle_deadline)
+        except FelicityApiError as err:
+            self.failed_polls += 1
+            age = self.data_age
+            if self.data is None or age is None or age >= self.stale_grace:
+                if self.data_stale:
+                    # Window expired: give up, back to the normal cadence.
+                    self._set_data_stale(False)
+                    self.update_interval = timedelta(seconds=self.base_interval)
+                raise UpdateFailed(str(err)) from err
+            # Keep serving the last good snapshot (the same object, so no
+            # entity writes) and retry soon.
+            _LOGGER.debug(
+                "%s: poll failed (%s), serving data from %.0fs ago", self.name, err, age
+            )
+            self._set_data_stale(True)
+            self.update_interval = timedelta(
+                seconds=min(STALE_RETRY_INTERVAL, self.base_interval)
+            )
+            return self.data
+
+        self.last_good = time.monotonic()
+        if self.data_stale:
+            self._set_data_stale(False)
+            self.update_interval = timedelta(seconds=self.base_interval)
+        stale = self.client.frame_stale
+        self._adapt_interval(stale)
+        if not stale or self.profile is None:
+            self._decode(data)
+            self.energy.add_sample(self.decoded, time.monotonic())
+        return data
+
+    def _decode(self, data: dict[str, Any], *, settings_only: bool = False) -> None:
+        """Decode one snapshot through the model profile (once, for all entities).
+
+        `settings_only` is for a settings readback merged into the runtime
+        frame already decoded: it is not fed to the PV layout detector again
+        and fires no transitions.
+        """
+        profile = select_profile(data.get("_basic"))
+        if profile is not self.profile:
+            _LOGGER.debug("%s: using model profile %s", self.name, profile.name)
+            self.profile = profile
+        if profile.pv_layout is not None:
+            self.pv_layout = profile.pv_layout
+        elif not settings_only:
+            if self._pv_detector.update(data):
+                self._persist_pv_layout()
+            self.pv_layout = self._pv_detector.layout
+        previous, previous_flags = self.decoded, self.active_flags
+        self.decoded = profile.decode(data, self.pv_layout)
+        if settings_only:
+            return
+        layout, values = flatten_cells(data)
+        if layout != self.cell_layout:
+            self.cell_layout = layout
+            self.cell_index = {path: i for i, path in enumerate(layout)}
+            self.cell_values = values
+        elif values != self.cell_values:
+            self.cell_values = values
+        words = read_flag_words(data)
+        if words != self.flag_words:
+            self.flag_words = words
+            self.active_flags = active_flags(words)
+        if previous:
+            self._fire_transitions(previous, previous_flags, data.get("date"))
+
+    def _fire_transitions(
+        self,
+        previous: dict[str, Any],
+        previous_flags: tuple[str, ...],
+        date: Any,
+    ) -> None:
+        """Fire one event per real change of a mode/warning/fault field or flag bit."""
+        base = {
+            "entry_id": self.entry.entry_id,
+            "host": self.client.host,
+            "date": date,
+        }
+        for field in TRANSITION_FIELDS:
+            old, new = previous.get(field), self.decoded.get(field)
+            if old == new or old is None or new is None:
+                continue
+            transition = "changed"
+            if field in ("warning_code", "fault_code"):
+                if not old:
+                    transition = "raised"
+                elif not new:
+                    transition = "cleared"
+            self.hass.bus.async_fire(
+                EVENT_TRANSITION,
+                {**base, "field": field, "old": old, "new": new, "transition": transition},
+            )
+
+        if previous_flags is self.active_flags:
+            return
+        old_set, new_set = set(previous_flags), set(self.active_flags)
+        for flag in sorted(old_set ^ new_set):
+            raised = flag in new_set
+            self.hass.bus.async_fire(
+                EVENT_TRANSITION,
+                {
+                    **base,
+                    "field": flag,
+                    "old": not raised,
+                    "new": raised,
+                    "transition": "raised" if raised else "cleared",
+                },
+            )
+
+    def _persist_pv_layout(self) -> None:
+        layout = self._pv_detector.locked
+        _LOGGER.debug("%s: PV layout locked to %s", self.name, layout)
+        self.hass.config_entries.async_update_entry(
+            self.entry,
+            data={
+                **self.entry.data,
+                CONF_PV_LAYOUT: layout,
+                CONF_PV_LAYOUT_FIRMWARE: self._pv_detector.firmware,
+            },
+        )
+
+    def _adapt_interval(self, stale: bool) -> None:
+        """Back off while the dongle repeats frames, creep back once it keeps up.
+
+        Each stale frame adds a step (up to a cap); two fresh frames in a row
+        remove one, so the interval settles near the dongle's refresh period.
+        """
+        current = (
+            self.update_interval.total_seconds()
+            if self.update_interval
+            else float(self.base_interval)
+        )
+        new = current
+        if stale:
+            self.stale_frames += 1
+            new = min(
+                current + STALE_INTERVAL_STEP,
+                self.base_interval * STALE_INTERVAL_MAX_FACTOR,
+            )
+        elif not self._last_stale:
+            new = max(current - STALE_INTERVAL_STEP, self.base_interval)
+        self._last_stale = stale
+
+        if new != current:
+            _LOGGER.debug(
+                "%s: stale frames=%s, update interval %ss -> %ss",
+                self.name,
+                self.stale_frames,
+                current,
+                new,
+            )
+            self.update_interval = timedelta(seconds=new)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_EXPORT_TOKEN, DOMAIN
+from .coordinator import FelicityCoordinator
+
+TO_REDACT = {CONF_EXPORT_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: FelicityCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    client = coordinator.client
+    profiler = coordinator.profiler
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": (
+                coordinator.update_interval.total_seconds()
+                if coordinator.update_interval
+                else None
+            ),
+            "stale_frames": coordinator.stale_frames,
+            "data_stale": coordinator.data_stale,
+            "data_age": coordinator.data_age,
+            "failed_polls": coordinator.failed_polls,
+            "cycle_deadline": coordinator.cycle_deadline,
+            "profile": coordinator.profile.name if coordinator.profile else None,
+            "pv_layout": coordinator.pv_layout,
+        },
+        "client": {
+            "transport": client.transport.name,
+            "requests_total": client.requests_total,
+            "errors_total": client.errors_total,
+            "deferred_reads": client.deferred_reads,
+            "last_request_seconds": client.last_request_seconds,
+            "queue_pending": client.queue.pending,
+        },
+        "profiling": (
+            {"running": True, "completed": profiler.completed, "cycles": profiler.cycles}
+            if profiler is not None
+            else None
+        ),
+        "last_profile": coordinator.last_profile,
+        "loop_watchdog": (
+            coordinator.watchdog.as_dict() if coordinator.watchdog is not None else None
+        ),
+        "decoded": coordinator.decoded,
+    }
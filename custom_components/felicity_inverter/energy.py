@@ -0,0 +1,85 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    LOCAL_ENERGY_MAX_GAP,
+    LOCAL_ENERGY_SAVE_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Locally integrated energy: sensor key -> decoded power key (W or VA).
+# The device has Energy counters for eight groups only; these channels have none.
+LOCAL_ENERGY_CHANNELS: dict[str, str] = {
+    "energy_pv1_local": "pv1_power",
+    "energy_pv2_local": "pv2_power",
+    "energy_pv3_local": "pv3_power",
+    "energy_ac_out_apparent_local": "ac_out_apparent_power",
+}
+
+
+class EnergyIntegrator:
+    """Trapezoidal integration of decoded power channels into kWh (kVAh).
+
+    Fed with every fresh coordinator sample. A gap longer than
+    LOCAL_ENERGY_MAX_GAP (outage, restart) is not bridged: integration restarts
+    from the next sample. Accumulators are persisted at most once per
+    LOCAL_ENERGY_SAVE_DELAY.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.energy")
+        self.totals: dict[str, float] = {key: 0.0 for key in LOCAL_ENERGY_CHANNELS}
+        self._last: dict[str, tuple[float, float]] = {}
+        # Monotonic time a delayed save was last requested.
+        self._save_requested: float | None = None
+
+    async def async_load(self) -> None:
+        stored = await self._store.async_load()
+        if isinstance(stored, dict):
+            for key, value in (stored.get("totals") or {}).items():
+                if key in self.totals and isinstance(value, (int, float)):
+                    self.totals[key] = float(value)
+
+    async def async_save(self) -> None:
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"totals": self.totals}
+
+    def add_sample(self, decoded: dict[str, Any], ts: float) -> None:
+        """Integrate one sample taken at monotonic time `ts` (seconds)."""
+        for key, source in LOCAL_ENERGY_CHANNELS.items():
+            power = decoded.get(source)
+            if not isinstance(power, (int, float)):
+                # Missing value: do not integrate across it.
+                self._last.pop(key, None)
+                continue
+            # Counters only increase; reverse flow is not energy produced here.
+            power = max(float(power), 0.0)
+
+            last = self._last.get(key)
+            if last is not None:
+                last_ts, last_power = last
+                dt = ts - last_ts
+                if 0 < dt <= LOCAL_ENERGY_MAX_GAP:
+                    self.totals[key] += (last_power + power) / 2.0 * dt / 3_600_000.0
+            self._last[key] = (ts, power)
+
+        # Store.async_delay_save restarts its timer on every call, so calling it
+        # per poll (interval < delay) would never save: request once per window.
+        if (
+            self._save_requested is None
+            or ts - self._save_requested >= LOCAL_ENERGY_SAVE_DELAY
+        ):
+            self._save_requested = ts
+            self._store.async_delay_save(self._data_to_save, LOCAL_ENERGY_SAVE_DELAY)
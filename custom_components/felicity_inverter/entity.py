@@ -0,0 +1,70 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+
+
+class FelicityEntity(CoordinatorEntity):
+    """Common base: one device per inverter, keyed by its serial."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, entry: ConfigEntry, key: str) -> None:
+        super().__init__(coordinator)
+        self._entry = entry
+        self._attr_unique_id = f"{entry.entry_id}_{key}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state; report the time per platform to the watchdog if enabled."""
+        watchdog = self.coordinator.watchdog
+        if watchdog is None:
+            super()._handle_coordinator_update()
+            return
+        start = time.perf_counter()
+        super()._handle_coordinator_update()
+        watchdog.add(
+            f"platform:{self.platform.domain if self.platform else 'unknown'}",
+            time.perf_counter() - start,
+        )
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        """Return device info to group entities into one device."""
+        data = self.coordinator.data or {}
+        basic = data.get("_basic") or {}
+        # Same serial source for every entity, whenever it is added: the
+        # runtime frame or, if it has none (Modbus), the basic block.
+        serial = (
+            data.get("DevSN")
+            or basic.get("DevSN")
+            or data.get("wifiSN")
+            or basic.get("wifiSN")
+            or self._entry.entry_id
+        )
+        sw_version = basic.get("version")
+        host = self._entry.data.get(CONF_HOST)
+        serial_display = f"{serial} ({host})" if host else serial
+
+        inv_type = basic.get("Type") or data.get("Type")
+        inv_subtype = basic.get("SubType") or data.get("SubType")
+        model = "Felicity Inverter"
+        if inv_type is not None and inv_subtype is not None:
+            model = f"Felicity Inverter Type {inv_type} SubType {inv_subtype}"
+
+        return {
+            "identifiers": {(DOMAIN, str(serial))},
+            "name": self._entry.data.get("name", "Felicity Inverter"),
+            "manufacturer": "Felicity",
+            "model": model,
+            "sw_version": sw_version,
+            "serial_number": serial_display,
+        }
@@ -0,0 +1,335 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Batched time-series export of every fresh snapshot, bypassing the state machine.
+
+Points are InfluxDB line protocol. Sinks are picked by the export URL scheme:
+
+  * ``http(s)://host:8086/api/v2/write?org=...&bucket=...`` - InfluxDB write API
+    (token from the export token option)
+  * ``mqtt://felicity/export`` - one MQTT message per batch on that topic
+  * ``file:///config/felicity.lp`` - append to a local file; a stand-in sink for
+    trying the exporter (or a test harness) without a database
+
+Points wait in a bounded in-memory queue. When the sink is down, sending is
+retried with exponential backoff and points that no longer fit in memory are
+spilled to a file in the config directory, replayed once the sink is back. The
+spool is capped; on a long outage the oldest points are dropped first.
+"""
+
+import asyncio
+from collections import deque
+import logging
+import os
+import time
+from typing import Any, Protocol
+from urllib.parse import urlparse
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    DOMAIN,
+    EXPORT_BACKOFF_MAX,
+    EXPORT_BACKOFF_MIN,
+    EXPORT_BATCH_SIZE,
+    EXPORT_FLUSH_INTERVAL,
+    EXPORT_QUEUE_SIZE,
+    EXPORT_SPOOL_MAX_BYTES,
+)
+from .coordinator import FelicityCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+MEASUREMENT = "felicity"
+
+
+class ExportError(Exception):
+    """The sink did not accept a batch."""
+
+
+class ExportSink(Protocol):
+    async def async_write(self, lines: list[str]) -> None:
+        """Write one batch of line protocol lines or raise ExportError."""
+
+
+class InfluxHttpSink:
+    """InfluxDB (v2 write API, or v1 /write) over HTTP."""
+
+    def __init__(self, hass: HomeAssistant, url: str, token: str | None) -> None:
+        self._session = async_get_clientsession(hass)
+        self._url = url
+        self._headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if token:
+            self._headers["Authorization"] = f"Token {token}"
+
+    async def async_write(self, lines: list[str]) -> None:
+        try:
+            async with self._session.post(
+                self._url,
+                data="\n".join(lines).encode(),
+                headers=self._headers,
+                timeout=10,
+            ) as resp:
+                if resp.status >= 300:
+                    raise ExportError(f"HTTP {resp.status}: {await resp.text()}")
+        except ExportError:
+            raise
+        except Exception as err:
+            raise ExportError(str(err)) from err
+
+
+class MqttSink:
+    """Publish each batch as one message through Home Assistant's MQTT client."""
+
+    def __init__(self, hass: HomeAssistant, topic: str) -> None:
+        self._hass = hass
+        self._topic = topic
+
+    async def async_write(self, lines: list[str]) -> None:
+        try:
+            from homeassistant.components import mqtt
+
+            await mqtt.async_publish(self._hass, self._topic, "\n".join(lines))
+        except Exception as err:
+            raise ExportError(str(err)) from err
+
+
+class FileSink:
+    """Append batches to a local file (stand-in sink)."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        self._hass = hass
+        self._path = path
+
+    def _append(self, text: str) -> None:
+        with open(self._path, "a", encoding="utf-8") as fh:
+            fh.write(text)
+
+    async def async_write(self, lines: list[str]) -> None:
+        try:
+            await self._hass.async_add_executor_job(
+                self._append, "".join(f"{line}\n" for line in lines)
+            )
+        except OSError as err:
+            raise ExportError(str(err)) from err
+
+
+def create_sink(hass: HomeAssistant, url: str, token: str | None) -> ExportSink:
+    """Return the sink for an export URL (see module docstring)."""
+    parsed = urlparse(url)
+    if parsed.scheme in ("http", "https"):
+        return InfluxHttpSink(hass, url, token)
+    if parsed.scheme == "mqtt":
+        topic = f"{parsed.netloc}{parsed.path}".strip("/")
+        return MqttSink(hass, topic or f"{DOMAIN}/export")
+    if parsed.scheme == "file":
+        return FileSink(hass, parsed.path)
+    raise ValueError(f"Unsupported export URL {url!r}")
+
+
+def _escape_tag(value: Any) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(",", "\\,")
+        .replace(" ", "\\ ")
+        .replace("=", "\\=")
+    )
+
+
+def snapshot_to_line(coordinator: FelicityCoordinator, ts_ns: int) -> str | None:
+    """One line protocol point with every numeric channel of the snapshot."""
+    data = coordinator.data or {}
+    serial = data.get("DevSN") or data.get("wifiSN") or coordinator.entry.entry_id
+    # Always floats: a field that is sometimes int would conflict in InfluxDB.
+    fields = [
+        f"{key}={float(value)!r}"
+        for key, value in coordinator.decoded.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+    fields.extend(
+        f"{key}={float(value)!r}" for key, value in coordinator.energy.totals.items()
+    )
+    if not fields:
+        return None
+    tags = f"serial={_escape_tag(serial)},host={_escape_tag(coordinator.client.host)}"
+    return f"{MEASUREMENT},{tags} {','.join(fields)} {ts_ns}"
+
+
+class SnapshotExporter:
+    """Queue points from one coordinator and ship them in batches."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: FelicityCoordinator,
+        sink: ExportSink,
+    ) -> None:
+        self._hass = hass
+        self._coordinator = coordinator
+        self._sink = sink
+        self._queue: deque[str] = deque()
+        self._spool = hass.config.path(
+            f"{DOMAIN}_export_{coordinator.entry.entry_id}.spool"
+        )
+        # Unknown until the first flush checks the disk (not on the event loop).
+        self._spooled: bool | None = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._spool_lock = asyncio.Lock()
+        self._unsub_timer = None
+        self._unsub_listener = None
+        self._stopped = False
+        self.sent = 0
+        self.failures = 0
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub_listener = self._coordinator.async_add_listener(self._on_snapshot)
+        self._schedule()
+
+    async def async_stop(self) -> None:
+        """Stop, try one last flush and spill whatever is left."""
+        self._stopped = True
+        if self._unsub_listener is not None:
+            self._unsub_listener()
+            self._unsub_listener = None
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        # Waits for a flush in flight: its failed batch is back in the queue.
+        async with self._lock:
+            if time.monotonic() >= self._retry_at:
+                await self._async_flush_locked()
+            if self._queue:
+                await self._async_spill(list(self._queue))
+                self._queue.clear()
+
+    @callback
+    def _on_snapshot(self) -> None:
+        if not self._coordinator.last_update_success:
+            return
+        line = snapshot_to_line(self._coordinator, time.time_ns())
+        if line is None:
+            return
+        self._queue.append(line)
+        if len(self._queue) > EXPORT_QUEUE_SIZE:
+            # Sink is behind: move the oldest batch to disk.
+            overflow = [self._queue.popleft() for _ in range(EXPORT_BATCH_SIZE)]
+            self._hass.async_create_task(self._async_spill(overflow))
+        elif len(self._queue) >= EXPORT_BATCH_SIZE:
+            self._hass.async_create_task(self._async_flush())
+
+    @callback
+    def _schedule(self) -> None:
+        self._unsub_timer = async_call_later(
+            self._hass, EXPORT_FLUSH_INTERVAL, self._async_timer
+        )
+
+    async def _async_timer(self, _now) -> None:
+        await self._async_flush()
+        if not self._stopped:
+            self._schedule()
+
+    async def _async_flush(self) -> None:
+        if self._stopped or self._lock.locked() or time.monotonic() < self._retry_at:
+            return
+        async with self._lock:
+            await self._async_flush_locked()
+
+    async def _async_flush_locked(self) -> None:
+        if self._spooled is None:
+            self._spooled = await self._hass.async_add_executor_job(
+                os.path.exists, self._spool
+            )
+        if self._spooled:
+            async with self._spool_lock:
+                await self._async_replay_spool()
+        while self._queue and time.monotonic() >= self._retry_at:
+            count = min(EXPORT_BATCH_SIZE, len(self._queue))
+            batch = [self._queue.popleft() for _ in range(count)]
+            if not await self._async_send(batch):
+                # Put it back in front; the next snapshot spills if needed.
+                self._queue.extendleft(reversed(batch))
+                return
+
+    async def _async_send(self, batch: list[str]) -> bool:
+        try:
+            await self._sink.async_write(batch)
+        except ExportError as err:
+            self.failures += 1
+            self._backoff = min(
+                max(self._backoff * 2, EXPORT_BACKOFF_MIN), EXPORT_BACKOFF_MAX
+            )
+            self._retry_at = time.monotonic() + self._backoff
+            _LOGGER.warning(
+                "Export of %s points failed (%s); retrying in %ss",
+                len(batch),
+                err,
+                self._backoff,
+            )
+            return False
+        self.sent += len(batch)
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        return True
+
+    async def _async_spill(self, lines: list[str]) -> None:
+        def _write() -> None:
+            with open(self._spool, "a", encoding="utf-8") as fh:
+                fh.write("".join(f"{line}\n" for line in lines))
+            if os.path.getsize(self._spool) > EXPORT_SPOOL_MAX_BYTES:
+                self._trim_spool()
+
+        async with self._spool_lock:
+            await self._hass.async_add_executor_job(_write)
+            self._spooled = True
+        _LOGGER.debug("Spilled %s export points to %s", len(lines), self._spool)
+
+    async def _async_replay_spool(self) -> None:
+        def _read() -> list[str]:
+            try:
+                with open(self._spool, encoding="utf-8") as fh:
+                    return [line.rstrip("\n") for line in fh if line.strip()]
+            except FileNotFoundError:
+                return []
+
+        lines = await self._hass.async_add_executor_job(_read)
+        for start in range(0, len(lines), EXPORT_BATCH_SIZE):
+            if not await self._async_send(lines[start : start + EXPORT_BATCH_SIZE]):
+                # Keep the part that was not sent yet.
+                rest = lines[start:]
+
+                def _rewrite() -> None:
+                    with open(self._spool, "w", encoding="utf-8") as fh:
+                        fh.write("".join(f"{line}\n" for line in rest))
+
+                await self._hass.async_add_executor_job(_rewrite)
+                return
+
+        await self._hass.async_add_executor_job(self._remove_spool)
+        self._spooled = False
+
+    def _trim_spool(self) -> None:
+        """Drop the oldest spilled points until the spool is back under its cap."""
+        with open(self._spool, encoding="utf-8") as fh:
+            lines = fh.readlines()
+        size = sum(len(line.encode()) for line in lines)
+        start = 0
+        while start < len(lines) and size > EXPORT_SPOOL_MAX_BYTES:
+            size -= len(lines[start].encode())
+            start += 1
+        with open(self._spool, "w", encoding="utf-8") as fh:
+            fh.writelines(lines[start:])
+        _LOGGER.warning(
+            "Export spool %s is full; dropped the %s oldest points", self._spool, start
+        )
+
+    def _remove_spool(self) -> None:
+        try:
+            os.remove(self._spool)
+        except FileNotFoundError:
+            pass
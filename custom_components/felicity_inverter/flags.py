@@ -0,0 +1,89 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Bitfield decoding of the warning / BMS flag words.
+
+Each word is decoded through a per-byte lookup table (byte value -> set bit
+positions), so a 32-bit word costs four table lookups instead of 32 shifts.
+Results are cached per (word, value): flag words rarely change between polls.
+
+The vendor does not document what the individual bits mean, so bits are named
+generically (``wan2F_bit3``). FLAG_NAMES is the single place to give them real
+names once they are known for a model.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+# Flag word -> number of bits used by the device.
+FLAG_WORDS: dict[str, int] = {
+    "wan2F": 32,
+    "wan3F": 32,
+    "BMSFlg": 32,
+    "BFlgAll": 32,
+}
+
+# Flag word -> name of every bit (index = bit position).
+FLAG_NAMES: dict[str, tuple[str, ...]] = {
+    word: tuple(f"{word}_bit{bit}" for bit in range(bits))
+    for word, bits in FLAG_WORDS.items()
+}
+
+# Flag name -> (word, bit), to find the entity of an active flag.
+FLAG_BITS: dict[str, tuple[str, int]] = {
+    name: (word, bit)
+    for word, names in FLAG_NAMES.items()
+    for bit, name in enumerate(names)
+}
+
+
+def is_named(word: str, bit: int) -> bool:
+    """Whether a bit has a real name in FLAG_NAMES (not the generic one)."""
+    return FLAG_NAMES[word][bit] != f"{word}_bit{bit}"
+
+
+# byte value -> bit positions set in it.
+_BYTE_BITS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+)
+
+
+def flag_word(value: Any) -> int | None:
+    """Normalize a raw flag field (int, numeric string or [value, ...]) to an int."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value) & 0xFFFFFFFF
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=256)
+def decode_word(word: str, value: int) -> tuple[str, ...]:
+    """Names of the flags set in one word."""
+    names = FLAG_NAMES[word]
+    active: list[str] = []
+    offset = 0
+    while value and offset < len(names):
+        for bit in _BYTE_BITS[value & 0xFF]:
+            if offset + bit < len(names):
+                active.append(names[offset + bit])
+        value >>= 8
+        offset += 8
+    return tuple(active)
+
+
+def read_flag_words(data: dict[str, Any]) -> dict[str, int | None]:
+    """Current value of every flag word in a snapshot (None if not reported)."""
+    return {word: flag_word(data.get(word)) for word in FLAG_WORDS}
+
+
+def active_flags(words: dict[str, int | None]) -> tuple[str, ...]:
+    """Names of all flags set across the given words."""
+    active: tuple[str, ...] = ()
+    for word, value in words.items():
+        if value:
+            active += decode_word(word, value)
+    return active
@@ -0,0 +1,120 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from typing import Any, Iterator
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import FelicityCoordinator
+
+METRICS_URL = f"/api/{DOMAIN}/metrics"
+
+# key -> metric name, filled lazily; per entry_id the label string and the
+# (serial, host, title) it was built from, rebuilt when one of them changes.
+_METRIC_NAMES: dict[str, str] = {}
+_LABELS: dict[str, tuple[tuple[Any, str, str], str]] = {}
+
+
+def _metric_name(key: str) -> str:
+    name = _METRIC_NAMES.get(key)
+    if name is None:
+        name = _METRIC_NAMES[key] = f"felicity_{key}"
+    return name
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(coordinator: FelicityCoordinator) -> str:
+    data = coordinator.data or {}
+    serial = data.get("DevSN") or data.get("wifiSN") or ""
+    entry = coordinator.entry
+    source = (serial, coordinator.client.host, entry.title)
+    cached = _LABELS.get(entry.entry_id)
+    if cached is not None and cached[0] == source:
+        return cached[1]
+    labels = (
+        f'{{entry_id="{_escape(entry.entry_id)}",'
+        f'host="{_escape(source[1])}",'
+        f'serial="{_escape(serial)}",'
+        f'name="{_escape(entry.title)}"}}'
+    )
+    _LABELS[entry.entry_id] = (source, labels)
+    return labels
+
+
+def discard_labels(entry_id: str) -> None:
+    """Forget the cached labels of an unloaded entry."""
+    _LABELS.pop(entry_id, None)
+
+
+def _samples(coordinator: FelicityCoordinator) -> Iterator[tuple[str, Any]]:
+    """Yield (metric name, value) for one inverter."""
+    if coordinator.last_update_success:
+        for key, value in coordinator.decoded.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield _metric_name(key), value
+        for key, value in coordinator.energy.totals.items():
+            yield _metric_name(key), value
+
+    client = coordinator.client
+    yield "felicity_up", 1 if coordinator.last_update_success else 0
+    yield "felicity_stale_frames_total", coordinator.stale_frames
+    yield "felicity_data_stale", 1 if coordinator.data_stale else 0
+    yield "felicity_failed_polls_total", coordinator.failed_polls
+    if coordinator.data_age is not None:
+        yield "felicity_data_age_seconds", coordinator.data_age
+    if coordinator.update_interval is not None:
+        yield "felicity_update_interval_seconds", coordinator.update_interval.total_seconds()
+    yield "felicity_client_requests_total", client.requests_total
+    yield "felicity_client_errors_total", client.errors_total
+    yield "felicity_client_deferred_reads_total", client.deferred_reads
+    if client.last_request_seconds is not None:
+        yield "felicity_client_last_request_seconds", client.last_request_seconds
+    yield "felicity_client_queue_pending", client.queue.pending
+
+
+def render_metrics(coordinators: list[FelicityCoordinator]) -> str:
+    """Render all inverters in Prometheus text exposition format."""
+    series: dict[str, list[str]] = {}
+    for coordinator in coordinators:
+        labels = _labels(coordinator)
+        for name, value in _samples(coordinator):
+            lines = series.get(name)
+            if lines is None:
+                lines = series[name] = []
+            lines.append(f"{name}{labels} {value}\n")
+
+    out: list[str] = []
+    for name, lines in series.items():
+        kind = "counter" if name.endswith("_total") else "gauge"
+        out.append(f"# TYPE {name} {kind}\n")
+        out.extend(lines)
+    return "".join(out)
+
+
+class FelicityMetricsView(HomeAssistantView):
+    """Telemetry and client health of every inverter in one scrape."""
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+
+    async def get(self, request: web.Request) -> web.Response:
+        coordinators = [
+            data["coordinator"] for data in self._hass.data.get(DOMAIN, {}).values()
+        ]
+        return web.Response(
+            text=render_metrics(coordinators),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
@@ -0,0 +1,396 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Modbus TCP transport for inverters behind an RS485-to-TCP gateway.
+
+Each block (runtime, basic, settings) is fetched as a few contiguous holding
+register reads and decoded through a register map into the same shape the
+wifilocalMonitor JSON protocol returns (top-level keys, Temp/Batt/PV/... as
+row/column matrices, settings by their `set infor` names, raw units). Profiles,
+flags and entities therefore work unchanged on either transport.
+
+The register maps below follow the layout of the vendor's RS485 protocol as far
+as it is known and are NOT verified against hardware. Check them against your
+model's documentation before relying on them; a correction is an edit of the
+tables, nothing else. Until the settings map is verified, writes are refused
+(`ModbusTransport.supports_writes`): a wrong holding register address would
+silently overwrite an unrelated inverter parameter.
+"""
+
+import asyncio
+from dataclasses import dataclass
+import itertools
+import logging
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from .api import (
+    BLOCK_BASIC,
+    BLOCK_RUNTIME,
+    BLOCK_SETTINGS,
+    DEFAULT_CONNECT_TIMEOUT,
+    FelicityApiError,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+MODBUS_DEFAULT_PORT = 502
+MODBUS_DEFAULT_UNIT_ID = 1
+# RS485 behind the gateway is slow (125 registers take ~0.3 s at 9600 baud).
+MODBUS_RESPONSE_TIMEOUT = 3.0  # seconds
+
+# Protocol limit per read, and the largest hole read through instead of
+# starting another request (a round trip costs more than a few extra words).
+MAX_READ_REGISTERS = 125
+MAX_READ_GAP = 8
+
+_READ_HOLDING_REGISTERS = 0x03
+_WRITE_SINGLE_REGISTER = 0x06
+
+_KIND_WORDS = {"u16": 1, "s16": 1, "u32": 2, "s32": 2}
+
+
+@dataclass(frozen=True)
+class Register:
+    """One value: where it goes in the snapshot and where it lives on the device.
+
+    `path` is ("key",) or ("matrix", row, col). `kind` is u16, s16, u32, s32
+    (high word first) or strN, an ASCII string of N registers.
+    """
+
+    path: Tuple[Any, ...]
+    address: int
+    kind: str = "u16"
+
+    @property
+    def words(self) -> int:
+        if self.kind.startswith("str"):
+            return int(self.kind[3:])
+        return _KIND_WORDS[self.kind]
+
+    def read(self, words: Tuple[int, ...], offset: int) -> Any:
+        kind = self.kind
+        value = words[offset]
+        if kind == "u16":
+            return value
+        if kind == "s16":
+            return value - 0x10000 if value & 0x8000 else value
+        if kind in ("u32", "s32"):
+            value = (value << 16) | words[offset + 1]
+            if kind == "s32" and value & 0x80000000:
+                value -= 0x100000000
+            return value
+        raw = struct.pack(f">{self.words}H", *words[offset : offset + self.words])
+        return raw.decode("ascii", errors="ignore").strip("\x00 ")
+
+
+class RegisterMap:
+    """Compiled register map: read plan and decoder for one block."""
+
+    def __init__(self, registers: Tuple[Register, ...]) -> None:
+        self.registers = tuple(sorted(registers, key=lambda reg: reg.address))
+        self.ranges = self._plan(self.registers)
+
+        # Offset of every register in the concatenated reply of all ranges.
+        self._fields: List[Tuple[Register, int]] = []
+        base = 0
+        regs = iter(self.registers)
+        reg = next(regs, None)
+        for start, count in self.ranges:
+            while reg is not None and reg.address < start + count:
+                self._fields.append((reg, base + reg.address - start))
+                reg = next(regs, None)
+            base += count
+        self._struct = struct.Struct(f">{base}H")
+
+        # Matrix shapes, so decoded matrices have the JSON rows/columns.
+        self._shapes: Dict[str, Tuple[int, int]] = {}
+        for reg in self.registers:
+            if len(reg.path) == 3:
+                key, row, col = reg.path
+                rows, cols = self._shapes.get(key, (0, 0))
+                self._shapes[key] = (max(rows, row + 1), max(cols, col + 1))
+        self.by_name: Dict[str, Register] = {
+            reg.path[0]: reg for reg in self.registers if len(reg.path) == 1
+        }
+
+    @staticmethod
+    def _plan(registers: Tuple[Register, ...]) -> Tuple[Tuple[int, int], ...]:
+        ranges: List[Tuple[int, int]] = []
+        start = end = -1
+        for reg in registers:
+            reg_end = reg.address + reg.words
+            if (
+                start >= 0
+                and reg.address - end <= MAX_READ_GAP
+                and reg_end - start <= MAX_READ_REGISTERS
+            ):
+                end = max(end, reg_end)
+                continue
+            if start >= 0:
+                ranges.append((start, end - start))
+            start, end = reg.address, reg_end
+        if start >= 0:
+            ranges.append((start, end - start))
+        return tuple(ranges)
+
+    @property
+    def size(self) -> int:
+        """Registers read per block."""
+        return self._struct.size // 2
+
+    def decode(self, raw: bytes) -> Dict[str, Any]:
+        """Concatenated register data of all ranges -> snapshot dict."""
+        if len(raw) != self._struct.size:
+            raise FelicityApiError(
+                f"Expected {self._struct.size} bytes of registers, got {len(raw)}"
+            )
+        words = self._struct.unpack(raw)
+        data: Dict[str, Any] = {
+            key: [[None] * cols for _ in range(rows)]
+            for key, (rows, cols) in self._shapes.items()
+        }
+        for reg, offset in self._fields:
+            value = reg.read(words, offset)
+            if len(reg.path) == 1:
+                data[reg.path[0]] = value
+            else:
+                key, row, col = reg.path
+                data[key][row][col] = value
+        return data
+
+
+# Energy[group] -> [0, total, day, month, year] in Wh, like `real infor`.
+_ENERGY_BASE = 0x1140
+
+RUNTIME_REGISTERS: Tuple[Register, ...] = (
+    Register(("workM",), 0x1101),
+    Register(("wan2F",), 0x1102, "u32"),
+    Register(("wan3F",), 0x1104, "u32"),
+    Register(("fault",), 0x1106),
+    Register(("warn",), 0x1107),
+    Register(("Batt", 0, 0), 0x1108),
+    Register(("Batt", 0, 1), 0x1109, "s16"),
+    Register(("Batt", 0, 2), 0x110A, "s16"),
+    Register(("Batsoc", 0, 0), 0x110B),
+    Register(("ACout", 0, 0), 0x1111),
+    Register(("ACout", 1, 0), 0x1112),
+    Register(("ACout", 2, 0), 0x1113),
+    Register(("ACout", 3, 0), 0x1114, "s16"),
+    Register(("ACout", 3, 1), 0x1115),
+    Register(("ACout", 3, 2), 0x1116, "s16"),
+    Register(("ACin", 0, 0), 0x1117),
+    Register(("ACin", 1, 0), 0x1118),
+    Register(("ACin", 2, 0), 0x1119),
+    Register(("ACin", 3, 0), 0x111A, "s16"),
+    Register(("ACin", 3, 1), 0x111B),
+    Register(("lPerc",), 0x111C),
+    Register(("busVp",), 0x111D),
+    Register(("busVn",), 0x111E),
+    Register(("pFlow",), 0x111F),
+    *(
+        Register(("PV", row, col), 0x1120 + row * 3 + col)
+        for row in range(3)
+        for col in range(3)
+    ),
+    Register(("PV", 3, 0), 0x1129),
+    *(Register(("Temp", 0, col), 0x112A + col, "s16") for col in range(5)),
+    Register(("ParStu",), 0x112F),
+    Register(("BMSFlg",), 0x1130, "u32"),
+    Register(("BFlgAll",), 0x1132, "u32"),
+    *(
+        Register(("Energy", group, period), _ENERGY_BASE + group * 8 + period * 2 - 2, "u32")
+        for group in range(8)
+        for period in range(1, 5)
+    ),
+)
+
+BASIC_REGISTERS: Tuple[Register, ...] = (
+    Register(("Type",), 0xF800),
+    Register(("SubType",), 0xF801),
+    Register(("DevSN",), 0xF804, "str12"),
+    Register(("version",), 0xF810, "str4"),
+)
+
+# `set infor` names; the writable ones (api.WRITABLE_SETTINGS) must be u16/s16.
+SETTINGS_REGISTERS: Tuple[Register, ...] = tuple(
+    Register((name,), 0x2100 + index)
+    for index, name in enumerate(
+        (
+            "OperM",
+            "Aorvol",
+            "Aorfre",
+            "FGOV",
+            "FGUV",
+            "FGOFq",
+            "FGUF",
+            "FGOVT",
+            "FGUVT",
+            "FGOFqT",
+            "FGUFT",
+            "tenGOV",
+            "sGOV",
+            "sGUV",
+            "Stand",
+            "GCWT",
+            "GPSl",
+            "batTy",
+            "BNum",
+            "BChgV",
+            "BFChV",
+            "BMChC",
+            "BMDCu",
+            "BCVOG",
+            "BCVFG",
+            "BRVOG",
+            "BDDOG",
+            "BDDFG",
+            "BRDFG",
+            "ZEMode",
+            "ZeroEP",
+            "buzEn",
+        )
+    )
+)
+
+REGISTER_MAPS: Dict[str, RegisterMap] = {
+    BLOCK_RUNTIME: RegisterMap(RUNTIME_REGISTERS),
+    BLOCK_BASIC: RegisterMap(BASIC_REGISTERS),
+    BLOCK_SETTINGS: RegisterMap(SETTINGS_REGISTERS),
+}
+
+
+class ModbusTransport:
+    """Modbus TCP client for one unit; the connection is kept open between polls."""
+
+    name = "modbus"
+    # Set to True once SETTINGS_REGISTERS is confirmed on real hardware.
+    supports_writes = False
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        unit_id: int = MODBUS_DEFAULT_UNIT_ID,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        response_timeout: float = MODBUS_RESPONSE_TIMEOUT,
+        maps: Optional[Dict[str, RegisterMap]] = None,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._unit_id = unit_id
+        self._connect_timeout = connect_timeout
+        self._response_timeout = response_timeout
+        self._maps = maps or REGISTER_MAPS
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._tid = itertools.count(1)
+        # Runtime registers carry no serial; it is copied from the basic block.
+        self._serial: Optional[str] = None
+
+    def configure(self, *, connect_timeout: Optional[float] = None, **_json_only: Any) -> None:
+        """Change transport tuning; read framing options only apply to JSON."""
+        if connect_timeout is not None:
+            self._connect_timeout = connect_timeout
+
+    async def async_read(self, block: str) -> bytes:
+        """Read all register ranges of `block`; returns their data concatenated."""
+        parts: List[bytes] = []
+        for start, count in self._maps[block].ranges:
+            reply = await self.async_transfer(
+                struct.pack(">BHH", _READ_HOLDING_REGISTERS, start, count)
+            )
+            if len(reply) != 2 + count * 2 or reply[1] != count * 2:
+                raise FelicityApiError(
+                    f"Short Modbus reply for {count} registers at {start:#06x}"
+                )
+            parts.append(reply[2:])
+        return b"".join(parts)
+
+    async def async_write(self, payload: Dict[str, int]) -> None:
+        """Write settings register by register (already validated raw values)."""
+        if not self.supports_writes:
+            raise FelicityApiError(
+                "Settings writes over Modbus are disabled until the register map "
+                "is verified against hardware"
+            )
+        registers = self._maps[BLOCK_SETTINGS].by_name
+        for key, value in payload.items():
+            reg = registers.get(key)
+            if reg is None or reg.words != 1:
+                raise FelicityApiError(f"No Modbus register for setting {key}")
+            pdu = struct.pack(">BHH", _WRITE_SINGLE_REGISTER, reg.address, value & 0xFFFF)
+            reply = await self.async_transfer(pdu)
+            if reply != pdu:
+                raise FelicityApiError(f"Unexpected reply to writing {key}: {reply!r}")
+
+    def parse(self, block: str, raw: bytes) -> List[Any]:
+        data = self._maps[block].decode(raw)
+        if block == BLOCK_BASIC:
+            self._serial = data.get("DevSN") or None
+        elif block == BLOCK_RUNTIME and self._serial:
+            data["DevSN"] = self._serial
+        return [data]
+
+    async def async_transfer(self, pdu: bytes) -> bytes:
+        """Send one request PDU, return the response PDU."""
+        if self._writer is None or self._writer.is_closing():
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._host, self._port),
+                    timeout=self._connect_timeout,
+                )
+            except Exception as err:
+                raise FelicityApiError(
+                    f"Error connecting to {self._host}:{self._port}: {err}"
+                ) from err
+        try:
+            return await asyncio.wait_for(
+                self._async_request(pdu), timeout=self._response_timeout
+            )
+        except asyncio.CancelledError:
+            # A reply may still arrive; never read it as the next one's.
+            self._close()
+            raise
+        except FelicityApiError:
+            self._close()
+            raise
+        except Exception as err:
+            self._close()
+            raise FelicityApiError(
+                f"Error talking to {self._host}:{self._port}: {err}"
+            ) from err
+
+    async def _async_request(self, pdu: bytes) -> bytes:
+        tid = next(self._tid) & 0xFFFF
+        self._writer.write(struct.pack(">HHHB", tid, 0, len(pdu) + 1, self._unit_id) + pdu)
+        await self._writer.drain()
+
+        header = await self._reader.readexactly(7)
+        reply_tid, protocol, length, unit_id = struct.unpack(">HHHB", header)
+        body = await self._reader.readexactly(length - 1)
+        if reply_tid != tid or protocol != 0 or unit_id != self._unit_id:
+            raise FelicityApiError(
+                f"Mismatched Modbus reply (transaction {reply_tid}, unit {unit_id})"
+            )
+        if body[0] & 0x80:
+            raise FelicityApiError(
+                f"Modbus exception {body[1] if len(body) > 1 else '?'} "
+                f"for function {pdu[0]:#04x}"
+            )
+        return body
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def async_close(self) -> None:
+        writer = self._writer
+        self._close()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
@@ -0,0 +1,139 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass
+
+from homeassistant.components.number import (
+    NumberDeviceClass,
+    NumberEntity,
+    NumberEntityDescription,
+    NumberMode,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfPower,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .api import WRITABLE_SETTINGS
+from .const import DOMAIN
+from .entity import FelicityEntity
+
+
+@dataclass
+class FelicityNumberDescription(NumberEntityDescription):
+    """Writable setting; `setting` is the `dev set infor` key, `scale` raw -> native."""
+
+    setting: str = ""
+    scale: float = 1.0
+
+
+NUMBER_DESCRIPTIONS: tuple[FelicityNumberDescription, ...] = (
+    FelicityNumberDescription(
+        key="number_zero_export_power",
+        name="Zero Export Power",
+        setting="ZeroEP",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=NumberDeviceClass.POWER,
+        native_step=10,
+        mode=NumberMode.BOX,
+        icon="mdi:transmission-tower",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    FelicityNumberDescription(
+        key="number_battery_max_charge_current",
+        name="Battery Max Charge Current",
+        setting="BMChC",
+        scale=0.1,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        device_class=NumberDeviceClass.CURRENT,
+        native_step=1,
+        mode=NumberMode.BOX,
+        icon="mdi:battery-charging",
+        entity_category=EntityCategory.CONFIG,
+    ),
+    FelicityNumberDescription(
+        key="number_battery_charge_voltage",
+        name="Battery Charge Voltage",
+        setting="BChgV",
+        scale=0.1,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=NumberDeviceClass.VOLTAGE,
+        native_step=0.1,
+        mode=NumberMode.BOX,
+        icon="mdi:battery-charging",
+        entity_category=EntityCategory.CONFIG,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up writable Felicity settings as number entities."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+
+    transport = coordinator.client.transport
+    if not coordinator.writes_enabled or not transport.supports_writes:
+        # Opt-in (options flow), toggling it reloads the entry; never over Modbus.
+        return
+
+    remaining = list(NUMBER_DESCRIPTIONS)
+
+    @callback
+    def _async_add_supported() -> None:
+        # Only settings the device reports in `dev set infor` get an entity.
+        if not remaining:
+            return
+        settings = (coordinator.data or {}).get("_settings") or {}
+        entities: list[FelicityNumber] = []
+        for desc in list(remaining):
+            if desc.setting in settings:
+                entities.append(FelicityNumber(coordinator, entry, desc))
+                remaining.remove(desc)
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_supported()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_supported))
+
+
+class FelicityNumber(FelicityEntity, NumberEntity):
+    """A writable inverter setting; writes are coalesced by the coordinator."""
+
+    def __init__(
+        self,
+        coordinator,
+        entry: ConfigEntry,
+        description: FelicityNumberDescription,
+    ) -> None:
+        super().__init__(coordinator, entry, description.key)
+        self.entity_description = description
+        low, high = WRITABLE_SETTINGS[description.setting]
+        self._attr_native_min_value = low * description.scale
+        self._attr_native_max_value = high * description.scale
+
+    @property
+    def native_value(self) -> float | None:
+        settings = (self.coordinator.data or {}).get("_settings") or {}
+        raw = settings.get(self.entity_description.setting)
+        if not isinstance(raw, (int, float)):
+            return None
+        return round(raw * self.entity_description.scale, 1)
+
+    async def async_set_native_value(self, value: float) -> None:
+        raw = round(value / self.entity_description.scale)
+        try:
+            await self.coordinator.async_queue_setting(
+                self.entity_description.setting, raw
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
@@ -0,0 +1,216 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""On-demand timing of the update cycle, split into phases.
+
+While a profile runs, the timed methods are shadowed by wrappers set as
+*instance* attributes of the client and coordinator; `finish()` removes them
+again. Nothing in the regular code path checks for a profiler, so an inactive
+profiler costs nothing.
+
+Phases (self time, nested phases are subtracted from their parent):
+
+  io        one transport request (`async_transfer`, wall time)
+  parse     reply -> dicts (`parse`: JSON extraction or register decoding)
+  normalize JSON payload clean-up inside parse (`_normalize_payload`, JSON only)
+  decode    profile decoding, flags, transitions (`_decode`)
+  fanout    coordinator listeners, i.e. entity state writes (`async_update_listeners`)
+
+Results are kept as collapsed stacks (``root;phase;subphase microseconds``),
+the input format of flamegraph.pl / speedscope.
+"""
+
+from collections import defaultdict
+import functools
+import time
+from typing import Any, Callable
+
+# (owner attribute path on the coordinator or None for the coordinator itself,
+#  method name, phase); phases the owner has no method for are skipped.
+_PHASES: tuple[tuple[str | None, str, str], ...] = (
+    ("client.transport", "async_transfer", "io"),
+    ("client.transport", "parse", "parse"),
+    ("client.transport", "_normalize_payload", "normalize"),
+    (None, "_decode", "decode"),
+    (None, "async_update_listeners", "fanout"),
+)
+
+
+_CHAINS = "_felicity_shadow_chains"
+
+
+def shadow(
+    owner: Any, method: str, wrap: Callable[[Callable[..., Any]], Callable[..., Any]]
+) -> Callable[[], None]:
+    """Install `wrap(inner)` over `method` of `owner`; return the undo function.
+
+    The wrappers of one method form a chain kept on the owner and rebuilt on
+    every install and undo, so the profiler and the watchdog can be undone in
+    any order: undo drops only its own wrapper and relinks the others.
+    """
+    chains = owner.__dict__.setdefault(_CHAINS, {})
+    if method not in chains:
+        chains[method] = (owner.__dict__.get(method), [])
+    links = chains[method][1]
+    token = object()
+    links.append((token, wrap))
+    _relink(owner, method)
+
+    def _restore() -> None:
+        entry = chains.get(method)
+        if entry is None or entry[1] is not links:
+            return  # already undone
+        links[:] = [link for link in links if link[0] is not token]
+        _relink(owner, method)
+
+    return _restore
+
+
+def _relink(owner: Any, method: str) -> None:
+    chains = owner.__dict__[_CHAINS]
+    previous, links = chains[method]
+    owner.__dict__.pop(method, None)
+    if previous is not None:
+        setattr(owner, method, previous)
+    if not links:
+        del chains[method]
+        return
+    func = getattr(owner, method)
+    for _, wrap in links:
+        func = wrap(func)
+    setattr(owner, method, func)
+
+
+def resolve_owner(coordinator: Any, owner_attr: str | None) -> Any:
+    """Object a phase method lives on: `owner_attr` is a dotted attribute path."""
+    owner = coordinator
+    for name in (owner_attr.split(".") if owner_attr else ()):
+        owner = getattr(owner, name)
+    return owner
+
+
+class CycleProfiler:
+    """Time the next `cycles` update cycles of one coordinator."""
+
+    def __init__(
+        self,
+        coordinator: Any,
+        cycles: int,
+        on_done: Callable[[CycleProfiler], None],
+    ) -> None:
+        self._coordinator = coordinator
+        self._root = f"felicity_inverter;{coordinator.client.host}"
+        self.cycles = cycles
+        self.completed = 0
+        self._on_done = on_done
+        self._stack: list[str] = []
+        self._child_time: list[float] = []
+        self._installed: list[Callable[[], None]] = []
+        # stack path -> total self time (s); phase -> call durations (s)
+        self.self_time: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, list[float]] = defaultdict(list)
+        self.started = time.time()
+        self.finished: float | None = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self._installed)
+
+    def start(self) -> None:
+        for owner_attr, method, phase in _PHASES:
+            owner = resolve_owner(self._coordinator, owner_attr)
+            if not hasattr(owner, method):
+                continue
+            self._installed.append(
+                shadow(owner, method, functools.partial(self._wrap, phase=phase))
+            )
+
+        def _wrap_cycle(update: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(update)
+            async def _cycle(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await update(*args, **kwargs)
+                finally:
+                    self.completed += 1
+                    if self.completed >= self.cycles:
+                        # Let this cycle's fan-out run first.
+                        self._coordinator.hass.loop.call_soon(self.finish)
+
+            return _cycle
+
+        self._installed.append(
+            shadow(self._coordinator, "_async_update_data", _wrap_cycle)
+        )
+
+    def finish(self) -> None:
+        if not self._installed:
+            return
+        while self._installed:
+            self._installed.pop()()
+        self.finished = time.time()
+        self._on_done(self)
+
+    def _enter(self, phase: str) -> float:
+        self._stack.append(phase)
+        self._child_time.append(0.0)
+        return time.perf_counter()
+
+    def _exit(self, phase: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        path = ";".join((self._root, *self._stack))
+        children = self._child_time.pop()
+        self._stack.pop()
+        self.self_time[path] += max(elapsed - children, 0.0)
+        self.calls[phase].append(elapsed)
+        if self._child_time:
+            self._child_time[-1] += elapsed
+
+    def _wrap(self, func: Callable[..., Any], phase: str) -> Callable[..., Any]:
+        if phase == "io":
+            # Awaiting: other cycles may interleave, so io is timed flat.
+            @functools.wraps(func)
+            async def _timed_async(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self.self_time[f"{self._root};io"] += elapsed
+                    self.calls[phase].append(elapsed)
+
+            return _timed_async
+
+        @functools.wraps(func)
+        def _timed(*args: Any, **kwargs: Any) -> Any:
+            start = self._enter(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(phase, start)
+
+        return _timed
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, microseconds of self time per line."""
+        return "".join(
+            f"{path} {round(seconds * 1_000_000)}\n"
+            for path, seconds in sorted(self.self_time.items())
+        )
+
+    def summary(self) -> dict[str, Any]:
+        """Per-phase call counts and timings in milliseconds."""
+        phases: dict[str, Any] = {}
+        for phase, durations in self.calls.items():
+            total = sum(durations)
+            phases[phase] = {
+                "calls": len(durations),
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / len(durations), 3),
+                "max_ms": round(max(durations) * 1000, 3),
+            }
+        return {
+            "cycles": self.completed,
+            "started": self.started,
+            "finished": self.finished,
+            "phases": phases,
+        }
@@ -0,0 +1,532 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Model profiles: where each value lives in the payload and how it is scaled.
+
+A profile is plain data. MODEL_PROFILES entries are matched against the
+`basice infor` Type/SubType/version and override fields of DEFAULT_PROFILE.
+Profiles are compiled once (per Type/SubType/version) into FieldSpec tables,
+so decoding a snapshot is a straight table walk.
+
+To support a new model, add an entry such as::
+
+    {
+        "name": "Type 80 SubType 1",
+        "match": {"Type": 80, "SubType": 1, "version": "1.0"},
+        "pv_layout": PV_LAYOUT_AGGREGATED,
+        "fields": {"battery_voltage": {"path": ("Batt", 0, 0), "divisor": 100, "digits": 2}},
+        "cells": {("INV", 0, 0): {"name": "Inverter Voltage", "divisor": 10, "unit": "V"}},
+    }
+
+Matrix cells (Temp/Batt/INV/Batsoc) that no field maps become generic
+entities: "matrices" gives the per-matrix default label and scale, "cells"
+names and scales single cells. Named cells are enabled by default.
+"""
+
+from dataclasses import dataclass
+import logging
+import math
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+PV_LAYOUT_PER_MPPT = "per_mppt"
+PV_LAYOUT_AGGREGATED = "aggregated"
+
+# PV layout detection: only samples with at least this much PV power count,
+# and this many consistent ones lock the layout.
+PV_LAYOUT_MIN_POWER = 50  # W
+PV_LAYOUT_LOCK_SAMPLES = 5
+
+_ENERGY_GROUPS: tuple[tuple[str, int], ...] = (
+    ("pv", 0),
+    ("backup_load", 1),  # Reserved
+    ("grid_import", 2),  # consumption
+    ("grid_export", 3),  # feed-in
+    ("battery_charge", 4),
+    ("battery_discharge", 5),
+    ("home_load", 6),
+    ("total_load", 7),  # Backup + Home
+)
+ENERGY_GROUP_NAMES: tuple[str, ...] = tuple(name for name, _ in _ENERGY_GROUPS)
+# Energy[g] -> [0, total, day, month, year], values in Wh
+_ENERGY_PERIODS: tuple[tuple[str, int], ...] = (
+    ("total", 1),
+    ("today", 2),
+    ("month", 3),
+    ("year", 4),
+)
+
+_SETTINGS_FIELDS: dict[str, tuple[str, int | None, int | None]] = {
+    # key: (settings name, divisor, digits)
+    "set_operating_mode": ("OperM", None, None),
+    "set_ac_nominal_voltage": ("Aorvol", 10, 1),
+    "set_grid_over_voltage": ("FGOV", 10, 1),
+    "set_grid_under_voltage": ("FGUV", 10, 1),
+    "set_grid_over_frequency": ("FGOFq", 100, 2),
+    "set_grid_under_frequency": ("FGUF", 100, 2),
+    "set_stand": ("Stand", None, None),
+    "set_ac_nominal_frequency_raw": ("Aorfre", None, None),
+    "set_grid_over_voltage_time_raw": ("FGOVT", None, None),
+    "set_grid_under_voltage_time_raw": ("FGUVT", None, None),
+    "set_grid_over_frequency_time_raw": ("FGOFqT", None, None),
+    "set_grid_under_frequency_time_raw": ("FGUFT", None, None),
+    "set_grid_over_voltage_10min": ("tenGOV", 10, 1),
+    "set_secondary_grid_over_voltage": ("sGOV", 10, 1),
+    "set_secondary_grid_under_voltage": ("sGUV", 10, 1),
+    "set_generator_cooldown_time_raw": ("GCWT", None, None),
+    "set_generator_pv_start_delay_raw": ("GPSl", None, None),
+    "set_battery_cv_over_grid": ("BCVOG", 10, 1),
+    "set_battery_cv_float_grid": ("BCVFG", 10, 1),
+    "set_battery_rv_over_grid": ("BRVOG", 10, 1),
+    "set_battery_bddog_raw": ("BDDOG", None, None),
+    "set_battery_bddfg_raw": ("BDDFG", None, None),
+    "set_battery_brdfg_raw": ("BRDFG", None, None),
+    "set_battery_type": ("batTy", None, None),
+    "set_battery_count": ("BNum", None, None),
+    "set_battery_charge_voltage": ("BChgV", 10, 1),
+    "set_battery_float_voltage": ("BFChV", 10, 1),
+    "set_battery_max_charge_current": ("BMChC", 10, 1),
+    "set_battery_max_discharge_current": ("BMDCu", 10, 1),
+    "set_zero_export_mode": ("ZEMode", None, None),
+    "set_zero_export_power": ("ZeroEP", None, None),
+    "set_buzzer_enabled": ("buzEn", None, None),
+}
+
+
+# Matrices exposed cell by cell.
+MATRIX_NAMES: tuple[str, ...] = ("Temp", "Batt", "INV", "Batsoc")
+
+
+DEFAULT_PROFILE: dict[str, Any] = {
+    "name": "generic",
+    # None = detect from the payload; a model profile may pin it.
+    "pv_layout": None,
+    "fields": {
+        "battery_soc": {"path": ("Batsoc", 0, 0), "divisor": 100, "digits": 1},
+        "battery_voltage": {"path": ("Batt", 0, 0), "divisor": 1000, "digits": 2},
+        # Commonly appears scaled by 10 (e.g. 110 -> 11.0%)
+        "load_percent": {"path": ("lPerc",), "divisor": 10, "digits": 1},
+        "power_flow": {"path": ("pFlow",), "numeric": True},
+        "bus_voltage_p": {"path": ("busVp",), "divisor": 10, "digits": 1},
+        "bus_voltage_n": {"path": ("busVn",), "divisor": 10, "digits": 1},
+        "ac_in_voltage": {"path": ("ACin", 0, 0), "divisor": 10, "digits": 1},
+        "ac_in_current": {"path": ("ACin", 1, 0), "divisor": 10, "digits": 1},
+        "ac_in_frequency": {"path": ("ACin", 2, 0), "divisor": 100, "digits": 2},
+        # ACin[3] looks like [active W, apparent VA, ...]
+        "ac_in_power": {"path": ("ACin", 3, 0), "digits": 0},
+        "ac_in_apparent_power": {"path": ("ACin", 3, 1), "digits": 0},
+        "ac_out_voltage": {"path": ("ACout", 0, 0), "divisor": 10, "digits": 1},
+        "ac_out_current": {"path": ("ACout", 1, 0), "divisor": 10, "digits": 1},
+        "ac_out_frequency": {"path": ("ACout", 2, 0), "divisor": 100, "digits": 2},
+        "ac_out_power": {"path": ("ACout", 3, 0), "digits": 0},
+        "ac_out_apparent_power": {"path": ("ACout", 3, 1), "digits": 0},
+        "ac_out_reactive_power": {"path": ("ACout", 3, 2), "digits": 0},
+        "pv_total_power": {"path": ("PV", 3, 0), "digits": 0},
+        # Temp[0][1] is not a temperature on observed firmwares.
+        "temp_1": {"path": ("Temp", 0, 0), "divisor": 10, "digits": 1},
+        "temp_2": {"path": ("Temp", 0, 2), "divisor": 10, "digits": 1},
+        "temp_3": {"path": ("Temp", 0, 3), "divisor": 10, "digits": 1},
+        "temp_4": {"path": ("Temp", 0, 4), "divisor": 10, "digits": 1},
+        "work_mode": {"path": ("workM",)},
+        "warning_code": {"path": ("warn",)},
+        "fault_code": {"path": ("fault",)},
+        "firmware_version": {"path": ("_basic", "version")},
+        "last_update_raw": {"path": ("date",)},
+        "warning_flags_raw": {"path": ("wan2F",)},
+        "warning_flags2_raw": {"path": ("wan3F",)},
+        "parallel_status": {"path": ("ParStu",)},
+        **{
+            f"energy_{name}_{period}": {
+                "path": ("Energy", group, index),
+                # The vendor app *truncates* kWh values (e.g. 46.649 -> 46.64).
+                "divisor": 1000,
+                "digits": 2,
+                "truncate": True,
+            }
+            for name, group in _ENERGY_GROUPS
+            for period, index in _ENERGY_PERIODS
+        },
+        **{
+            key: {"path": ("_settings", name), "divisor": divisor, "digits": digits}
+            for key, (name, divisor, digits) in _SETTINGS_FIELDS.items()
+        },
+    },
+    # Defaults for cells no field maps; cell meanings are not documented, so
+    # only Temp gets a scale (x10 degC like the mapped temperatures).
+    "matrices": {
+        "Temp": {
+            "label": "Temperature",
+            "divisor": 10,
+            "digits": 1,
+            "unit": "°C",
+            "device_class": "temperature",
+        },
+        "Batt": {"label": "Battery"},
+        "INV": {"label": "Inverter"},
+        "Batsoc": {"label": "Battery SOC"},
+    },
+    "cells": {
+        # Not a temperature on observed firmwares (see temp_1..4).
+        ("Temp", 0, 1): {"divisor": None, "digits": None, "unit": None, "device_class": None},
+    },
+    "pv_fields": {
+        # PV[0]=[V1,I1,P1], PV[1]=[V2,I2,P2], PV[2]=[V3,I3,P3], PV[3]=[Ptotal]
+        PV_LAYOUT_PER_MPPT: {
+            "pv1_voltage": {"path": ("PV", 0, 0), "divisor": 10, "digits": 1},
+            "pv1_current": {"path": ("PV", 0, 1), "divisor": 10, "digits": 1},
+            # Some firmwares report PV total only and leave PV1 power at 0;
+            # use the total when PV2 is absent (all zero).
+            "pv1_power": {
+                "path": ("PV", 0, 2),
+                "digits": 0,
+                "fallback": ("PV", 3, 0),
+                "fallback_guard": ("PV", 1),
+            },
+            "pv2_voltage": {"path": ("PV", 1, 0), "divisor": 10, "digits": 1},
+            "pv2_current": {"path": ("PV", 1, 1), "divisor": 10, "digits": 1},
+            "pv2_power": {"path": ("PV", 1, 2), "digits": 0},
+            "pv3_voltage": {"path": ("PV", 2, 0), "divisor": 10, "digits": 1},
+            "pv3_current": {"path": ("PV", 2, 1), "divisor": 10, "digits": 1},
+            "pv3_power": {"path": ("PV", 2, 2), "digits": 0},
+        },
+        # PV[0]=[Vpv,..], PV[1]=[Ipv*10,..], PV[2]=[Ppv,..], PV[3]=[Ptotal]
+        PV_LAYOUT_AGGREGATED: {
+            "pv1_voltage": {"path": ("PV", 0, 0), "divisor": 10, "digits": 1},
+            "pv1_current": {"path": ("PV", 1, 0), "divisor": 10, "digits": 1},
+            # Some firmwares keep PV[2][0]=0 while the total has a value.
+            "pv1_power": {"path": ("PV", 2, 0), "digits": 0, "fallback": ("PV", 3, 0)},
+            "pv2_voltage": {"const": 0.0},
+            "pv2_current": {"const": 0.0},
+            "pv2_power": {"const": 0.0},
+            "pv3_voltage": {"const": 0.0},
+            "pv3_current": {"const": 0.0},
+            "pv3_power": {"const": 0.0},
+        },
+    },
+}
+
+# Model-specific overrides, first match wins. "match" keys are compared with
+# `basice infor`; "version" matches as a prefix.
+MODEL_PROFILES: list[dict[str, Any]] = []
+
+
+def get_path(data: Any, path: tuple[Any, ...]) -> Any:
+    """Safely read a nested key/index path, None when missing."""
+    cur: Any = data
+    try:
+        for p in path:
+            cur = cur[p]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return cur
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """How to read and scale one value.
+
+    Without divisor/digits/numeric the raw value is passed through as-is;
+    otherwise non-numeric raw values decode to None.
+    """
+
+    path: tuple[Any, ...] | None = None
+    divisor: float | None = None
+    digits: int | None = None
+    truncate: bool = False
+    numeric: bool = False
+    const: Any = None
+    # Used when the primary value is missing or 0 (and, if set, the
+    # fallback_guard row is all zero/missing).
+    fallback: tuple[Any, ...] | None = None
+    fallback_guard: tuple[Any, ...] | None = None
+
+    def read(self, data: dict) -> Any:
+        if self.path is None:
+            return self.const
+
+        raw = get_path(data, self.path)
+        if self.fallback is not None and (raw is None or raw == 0):
+            alt = get_path(data, self.fallback)
+            if raw is None or (
+                isinstance(alt, (int, float)) and self._guard_clear(data)
+            ):
+                raw = alt
+
+        if self.divisor is None and self.digits is None and not self.numeric:
+            return raw
+        if not isinstance(raw, (int, float)):
+            return None
+
+        value = raw / self.divisor if self.divisor else raw
+        if self.digits is None:
+            return value
+        if self.truncate:
+            factor = 10 ** self.digits
+            return math.trunc(value * factor) / factor
+        return round(value, self.digits)
+
+    def _guard_clear(self, data: dict) -> bool:
+        if self.fallback_guard is None:
+            return True
+        row = get_path(data, self.fallback_guard)
+        if not isinstance(row, list):
+            return True
+        return all(not isinstance(v, (int, float)) or v == 0 for v in row)
+
+
+@dataclass(frozen=True)
+class CellSpec:
+    """Name and scale of one matrix cell."""
+
+    key: str
+    name: str
+    divisor: float | None = None
+    digits: int | None = None
+    unit: str | None = None
+    device_class: str | None = None
+    # Cells named by a profile are enabled by default, generic ones are not.
+    named: bool = False
+
+    def scale(self, raw: Any) -> Any:
+        if not isinstance(raw, (int, float)):
+            return None
+        value = raw / self.divisor if self.divisor else raw
+        return round(value, self.digits) if self.digits is not None else value
+
+
+def flatten_cells(data: dict) -> tuple[tuple[tuple[str, int, int], ...], tuple[Any, ...]]:
+    """All cells of the exposed matrices: (layout of (matrix, row, col), values)."""
+    layout: list[tuple[str, int, int]] = []
+    values: list[Any] = []
+    for matrix in MATRIX_NAMES:
+        rows = data.get(matrix)
+        if not isinstance(rows, list):
+            continue
+        for r, row in enumerate(rows):
+            if not isinstance(row, list):
+                continue
+            for c, value in enumerate(row):
+                layout.append((matrix, r, c))
+                values.append(value)
+    return tuple(layout), tuple(values)
+
+
+class CompiledProfile:
+    """A profile resolved into FieldSpec tables."""
+
+    def __init__(
+        self,
+        name: str,
+        pv_layout: str | None,
+        fields,
+        pv_fields,
+        matrices: dict[str, dict[str, Any]] | None = None,
+        cells: dict[tuple[str, int, int], dict[str, Any]] | None = None,
+    ) -> None:
+        self.name = name
+        self.pv_layout = pv_layout
+        self.fields: dict[str, FieldSpec] = fields
+        self.pv_fields: dict[str, dict[str, FieldSpec]] = pv_fields
+        self._field_items = tuple(fields.items())
+        self._pv_items = {layout: tuple(f.items()) for layout, f in pv_fields.items()}
+        self._matrices = matrices or {}
+        self._cells = cells or {}
+        self._cell_specs: dict[tuple[str, int, int], CellSpec | None] = {}
+        # Cells already decoded into named fields are not exposed again.
+        self._mapped_paths = {
+            spec.path
+            for specs in (fields, *pv_fields.values())
+            for spec in specs.values()
+            if spec.path is not None and len(spec.path) == 3
+        }
+
+    def cell_spec(self, path: tuple[str, int, int]) -> CellSpec | None:
+        """Name/scale of a matrix cell; None if a regular field already maps it."""
+        if path in self._cell_specs:
+            return self._cell_specs[path]
+        spec: CellSpec | None = None
+        if path not in self._mapped_paths:
+            matrix, row, col = path
+            options = {**self._matrices.get(matrix, {}), **self._cells.get(path, {})}
+            label = options.pop("label", matrix)
+            name = options.pop("name", None)
+            spec = CellSpec(
+                key=f"cell_{matrix.lower()}_{row}_{col}",
+                name=name or f"{label} [{row}][{col}]",
+                named=name is not None,
+                **options,
+            )
+        self._cell_specs[path] = spec
+        return spec
+
+    def source_path(self, key: str) -> tuple[Any, ...] | None:
+        """Payload path a value is read from (per-MPPT layout for PV)."""
+        spec = self.fields.get(key) or self.pv_fields[PV_LAYOUT_PER_MPPT].get(key)
+        return spec.path if spec is not None else None
+
+    def decode(self, data: dict, pv_layout: str) -> dict[str, Any]:
+        """Decode every known value of one snapshot."""
+        decoded = {key: spec.read(data) for key, spec in self._field_items}
+        for key, spec in self._pv_items[pv_layout]:
+            decoded[key] = spec.read(data)
+        return decoded
+
+
+def _compile(profile: dict[str, Any]) -> CompiledProfile:
+    fields = dict(DEFAULT_PROFILE["fields"])
+    fields.update(profile.get("fields", {}))
+    pv_fields = {
+        layout: {**specs, **profile.get("pv_fields", {}).get(layout, {})}
+        for layout, specs in DEFAULT_PROFILE["pv_fields"].items()
+    }
+    matrices = {
+        matrix: {**spec, **profile.get("matrices", {}).get(matrix, {})}
+        for matrix, spec in DEFAULT_PROFILE["matrices"].items()
+    }
+    cells = {**DEFAULT_PROFILE["cells"], **profile.get("cells", {})}
+    return CompiledProfile(
+        profile.get("name", DEFAULT_PROFILE["name"]),
+        profile.get("pv_layout", DEFAULT_PROFILE["pv_layout"]),
+        {key: FieldSpec(**spec) for key, spec in fields.items()},
+        {
+            layout: {key: FieldSpec(**spec) for key, spec in specs.items()}
+            for layout, specs in pv_fields.items()
+        },
+        matrices,
+        cells,
+    )
+
+
+def _matches(match: dict[str, Any], basic: dict[str, Any]) -> bool:
+    for key, expected in match.items():
+        actual = basic.get(key)
+        if key == "version":
+            if actual is None or not str(actual).startswith(str(expected)):
+                return False
+        elif actual != expected:
+            return False
+    return True
+
+
+_COMPILED: dict[tuple[Any, Any, Any], CompiledProfile] = {}
+
+
+def select_profile(basic: dict[str, Any] | None) -> CompiledProfile:
+    """Return the compiled profile for this Type/SubType/version (cached)."""
+    basic = basic or {}
+    signature = (basic.get("Type"), basic.get("SubType"), basic.get("version"))
+    compiled = _COMPILED.get(signature)
+    if compiled is None:
+        profile = next(
+            (p for p in MODEL_PROFILES if _matches(p.get("match", {}), basic)),
+            DEFAULT_PROFILE,
+        )
+        compiled = _COMPILED[signature] = _compile(profile)
+        _LOGGER.debug("Using profile %s for %s", compiled.name, signature)
+    return compiled
+
+
+def classify_pv_layout(data: dict) -> str | None:
+    """Classify the PV layout of one snapshot, or None when it is not conclusive.
+
+    Observed layouts in `real infor`:
+      * Per-MPPT: PV[0]=[V1,I1,P1], PV[1]=[V2,I2,P2], PV[2]=[V3,I3,P3], PV[3]=[Ptotal]
+      * Aggregated: PV[0]=[Vpv,0,0], PV[1]=[Ipv*10,0,0], PV[2]=[Ppv,0,0], PV[3]=[Ptotal]
+
+    Near-zero production (dawn/dusk/night) fits both layouts, so only samples
+    with real PV voltage *and* power count as evidence.
+    """
+    v0 = get_path(data, ("PV", 0, 0))
+
+    # Voltage is usually tens/hundreds of volts => raw > 500 (>= 50.0V).
+    if not (isinstance(v0, (int, float)) and v0 > 500):
+        return None
+
+    # If PV[0][1] (current) or PV[0][2] (power) contains meaningful values,
+    # it is the per-MPPT layout.
+    i0 = get_path(data, ("PV", 0, 1))
+    p0 = get_path(data, ("PV", 0, 2))
+    if isinstance(i0, (int, float)) and i0 != 0:
+        return PV_LAYOUT_PER_MPPT
+    if isinstance(p0, (int, float)) and p0 != 0:
+        return PV_LAYOUT_PER_MPPT
+
+    v1 = get_path(data, ("PV", 1, 0))
+    p2 = get_path(data, ("PV", 2, 0))
+    pt = get_path(data, ("PV", 3, 0))
+    if not (
+        isinstance(v1, (int, float))
+        and isinstance(p2, (int, float))
+        and isinstance(pt, (int, float))
+    ):
+        return None
+    if pt < PV_LAYOUT_MIN_POWER:
+        return None
+
+    # Same criterion as before the detector existed: either heuristic is
+    # enough. PV[1][0] looks like current*10 (0..30A => raw 0..300), or
+    # PV[2][0] is close to PV[3][0] (both are power in watts). Requiring both
+    # would never classify aggregated units running above 30 A.
+    current_like = 0 < v1 < 300
+    power_like = 0 <= p2 < 20000 and abs(pt - p2) <= max(5.0, 0.05 * pt)
+    if current_like or power_like:
+        return PV_LAYOUT_AGGREGATED
+    return None
+
+
+class PvLayoutDetector:
+    """Lock the PV layout after N consistent, conclusive samples.
+
+    Until locked, the last conclusive classification is used (per-MPPT before
+    the first one), so inconclusive samples never flip the layout. A lock is
+    tied to the firmware version it was made on and dropped when it changes.
+    """
+
+    def __init__(
+        self,
+        layout: str | None = None,
+        firmware: str | None = None,
+        required: int = PV_LAYOUT_LOCK_SAMPLES,
+    ) -> None:
+        self.locked: str | None = layout
+        self.firmware = firmware
+        self._required = required
+        self._candidate: str | None = None
+        self._count = 0
+
+    @property
+    def layout(self) -> str:
+        return self.locked or self._candidate or PV_LAYOUT_PER_MPPT
+
+    def update(self, data: dict) -> bool:
+        """Feed one snapshot; return True if the layout just got locked."""
+        firmware = get_path(data, ("_basic", "version"))
+        if firmware is not None and str(firmware) != self.firmware:
+            if self.locked is not None:
+                _LOGGER.debug(
+                    "Firmware changed %s -> %s, re-detecting PV layout",
+                    self.firmware,
+                    firmware,
+                )
+            self.locked = None
+            self.firmware = str(firmware)
+            self._candidate = None
+            self._count = 0
+
+        if self.locked is not None:
+            return False
+
+        sample = classify_pv_layout(data)
+        if sample is None:
+            return False
+        if sample == self._candidate:
+            self._count += 1
+        else:
+            self._candidate = sample
+            self._count = 1
+
+        if self._count >= self._required:
+            self.locked = sample
+            return True
+        return False
@@ -0,0 +1,96 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass
+
+from homeassistant.components.select import SelectEntity, SelectEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .api import WRITABLE_SETTINGS
+from .const import DOMAIN
+from .entity import FelicityEntity
+
+
+@dataclass
+class FelicitySelectDescription(SelectEntityDescription):
+    """Writable enum setting; options are the raw device codes."""
+
+    setting: str = ""
+
+
+SELECT_DESCRIPTIONS: tuple[FelicitySelectDescription, ...] = (
+    FelicitySelectDescription(
+        key="select_zero_export_mode",
+        name="Zero Export Mode",
+        setting="ZEMode",
+        icon="mdi:transmission-tower",
+        entity_category=EntityCategory.CONFIG,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up writable Felicity enum settings as select entities."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+
+    transport = coordinator.client.transport
+    if not coordinator.writes_enabled or not transport.supports_writes:
+        # Opt-in (options flow), toggling it reloads the entry; never over Modbus.
+        return
+
+    remaining = list(SELECT_DESCRIPTIONS)
+
+    @callback
+    def _async_add_supported() -> None:
+        # Only settings the device reports in `dev set infor` get an entity.
+        if not remaining:
+            return
+        settings = (coordinator.data or {}).get("_settings") or {}
+        entities: list[FelicitySelect] = []
+        for desc in list(remaining):
+            if desc.setting in settings:
+                entities.append(FelicitySelect(coordinator, entry, desc))
+                remaining.remove(desc)
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_supported()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_supported))
+
+
+class FelicitySelect(FelicityEntity, SelectEntity):
+    """A writable enum setting; writes are coalesced by the coordinator."""
+
+    def __init__(
+        self,
+        coordinator,
+        entry: ConfigEntry,
+        description: FelicitySelectDescription,
+    ) -> None:
+        super().__init__(coordinator, entry, description.key)
+        self.entity_description = description
+        low, high = WRITABLE_SETTINGS[description.setting]
+        self._attr_options = [str(code) for code in range(low, high + 1)]
+
+    @property
+    def current_option(self) -> str | None:
+        settings = (self.coordinator.data or {}).get("_settings") or {}
+        raw = settings.get(self.entity_description.setting)
+        return str(raw) if raw is not None else None
+
+    async def async_select_option(self, option: str) -> None:
+        try:
+            await self.coordinator.async_queue_setting(
+                self.entity_description.setting, int(option)
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
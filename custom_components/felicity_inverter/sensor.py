@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-import math
+import time
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -14,7 +14,6 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    CONF_HOST,
     PERCENTAGE,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
@@ -22,12 +21,15 @@ from homeassistant.const import (
     UnitOfEnergy,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, LOCAL_ENERGY_WRITE_INTERVAL
+from .coordinator import FelicityCoordinator
+from .energy import LOCAL_ENERGY_CHANNELS
+from .entity import FelicityEntity
+from .profiles import PV_LAYOUT_PER_MPPT, CellSpec, get_path
 
 
 @dataclass
@@ -860,584 +862,263 @@ SENSOR_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
 )
 
 
+# --- Energy integrated locally from power channels (see energy.py) ---
+LOCAL_ENERGY_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
+    FelicitySensorDescription(
+        key="energy_pv1_local",
+        name="PV1 Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:solar-power",
+        suggested_display_precision=2,
+    ),
+    FelicitySensorDescription(
+        key="energy_pv2_local",
+        name="PV2 Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:solar-power",
+        suggested_display_precision=2,
+    ),
+    FelicitySensorDescription(
+        key="energy_pv3_local",
+        name="PV3 Energy",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:solar-power",
+        suggested_display_precision=2,
+    ),
+    FelicitySensorDescription(
+        key="energy_ac_out_apparent_local",
+        name="AC Out Apparent Energy",
+        native_unit_of_measurement="kVAh",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:home-lightning-bolt",
+        suggested_display_precision=2,
+    ),
+)
+
+FLAG_DESCRIPTIONS: tuple[FelicitySensorDescription, ...] = (
+    FelicitySensorDescription(
+        key="active_flags",
+        name="Active Flags",
+        icon="mdi:alert-circle-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+)
+
+# PV2/PV3 rows exist on single-MPPT units too (all zeros), so those sensors are
+# only created once the row carries a value in the per-MPPT layout.
+PV_STRING_ROWS: dict[str, int] = {
+    "pv2_voltage": 1,
+    "pv2_current": 1,
+    "pv2_power": 1,
+    "pv3_voltage": 2,
+    "pv3_current": 2,
+    "pv3_power": 2,
+}
+
+
+# Sensors that are not decoded through the model profile.
+EXTRA_SOURCES: dict[str, tuple[Any, ...]] = {
+    "settings_summary": ("_settings",),
+}
+
+
+def _is_supported(key: str, coordinator: FelicityCoordinator) -> bool:
+    """Return True if the device reports the data behind sensor `key`."""
+    data = coordinator.data or {}
+    if key in LOCAL_ENERGY_CHANNELS:
+        return _is_supported(LOCAL_ENERGY_CHANNELS[key], coordinator)
+    if key == "active_flags":
+        return any(value is not None for value in coordinator.flag_words.values())
+    if key in PV_STRING_ROWS:
+        row = get_path(data, ("PV", PV_STRING_ROWS[key]))
+        return (
+            isinstance(row, list)
+            and any(isinstance(v, (int, float)) and v != 0 for v in row)
+            and coordinator.pv_layout == PV_LAYOUT_PER_MPPT
+        )
+    path = EXTRA_SOURCES.get(key)
+    if path is None and coordinator.profile is not None:
+        path = coordinator.profile.source_path(key)
+    if path is None:
+        return True
+    return get_path(data, path) is not None
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up Felicity inverter sensors based on a config entry."""
+    """Set up Felicity inverter sensors based on a config entry.
+
+    Only sensors backed by fields the device actually reports are created;
+    the rest are added later if their fields show up in a payload.
+    """
     data = hass.data[DOMAIN][entry.entry_id]
     coordinator = data["coordinator"]
-
-    entities: list[FelicitySensor] = [
-        FelicitySensor(coordinator, entry, desc) for desc in SENSOR_DESCRIPTIONS
-    ]
-    async_add_entities(entities)
-
-
-class FelicitySensor(CoordinatorEntity, SensorEntity):
+    remaining = [*SENSOR_DESCRIPTIONS, *LOCAL_ENERGY_DESCRIPTIONS, *FLAG_DESCRIPTIONS]
+
+    @callback
+    def _async_add_supported() -> None:
+        if not remaining:
+            return
+        entities: list[FelicitySensor] = []
+        for desc in list(remaining):
+            if _is_supported(desc.key, coordinator):
+                if desc.key in LOCAL_ENERGY_CHANNELS:
+                    cls = FelicityLocalEnergySensor
+                elif desc.key == "active_flags":
+                    cls = FelicityActiveFlagsSensor
+                else:
+                    cls = FelicitySensor
+                entities.append(cls(coordinator, entry, desc))
+                remaining.remove(desc)
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_supported()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_supported))
+
+    # Matrix cells: one entity per cell that carried a non-zero value once.
+    created_cells: set[tuple[str, int, int]] = set()
+    seen_values: list[Any] = [None]
+
+    @callback
+    def _async_add_cells() -> None:
+        values = coordinator.cell_values
+        if values is seen_values[0] or coordinator.profile is None:
+            return
+        seen_values[0] = values
+        entities: list[FelicityCellSensor] = []
+        for path, value in zip(coordinator.cell_layout, values):
+            if path in created_cells or not isinstance(value, (int, float)) or not value:
+                continue
+            created_cells.add(path)
+            spec = coordinator.profile.cell_spec(path)
+            if spec is not None:
+                entities.append(FelicityCellSensor(coordinator, entry, path, spec))
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_cells()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_cells))
+
+
+class FelicitySensor(FelicityEntity, SensorEntity):
     """Representation of a Felicity inverter sensor."""
 
-    _attr_has_entity_name = True
-
     def __init__(
         self,
         coordinator,
         entry: ConfigEntry,
         description: FelicitySensorDescription,
     ) -> None:
-        super().__init__(coordinator)
+        super().__init__(coordinator, entry, description.key)
         self.entity_description = description
-        self._entry = entry
-        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
 
         # Cache for glitch-filtering inverter-reported *_today energy counters
         self._energy_today_last_kwh: float | None = None
         self._energy_today_last_ts: datetime | None = None
         self._energy_today_last_date: str | None = None
-
-    @property
-    def device_info(self) -> dict[str, Any]:
-        """Return device info to group entities into one device."""
-        data = self.coordinator.data or {}
-        serial = data.get("DevSN") or data.get("wifiSN") or self._entry.entry_id
-        basic = data.get("_basic") or {}
-        sw_version = basic.get("version")
-
-        host = self._entry.data.get(CONF_HOST)
-        serial_display = f"{serial} ({host})" if host else serial
-
-        model = "Felicity Inverter"
-        if basic.get("Type") is not None and basic.get("SubType") is not None:
-            model = f"Felicity Inverter Type {basic.get('Type')} SubType {basic.get('SubType')}"
-
-        return {
-            "identifiers": {(DOMAIN, serial)},
-            "name": self._entry.data.get("name", "Felicity Inverter"),
-            "manufacturer": "Felicity",
-            "model": model,
-            "sw_version": sw_version,
-            "serial_number": serial_display,
-        }
+        self._is_energy_today = description.key.startswith(
+            "energy_"
+        ) and description.key.endswith("_today")
+
+        # Settings sensors only need a state write when the client hands out a
+        # new settings object (it reuses the old one while the hash matches).
+        self._is_settings_sensor = (
+            description.key.startswith("set_") or description.key == "settings_summary"
+        )
+        self._last_settings: Any = None
+        self._last_available: bool | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Skip re-evaluating settings sensors while settings are unchanged."""
+        if self._is_settings_sensor:
+            settings = (self.coordinator.data or {}).get("_settings")
+            available = self.coordinator.last_update_success
+            if settings is self._last_settings and available == self._last_available:
+                return
+            self._last_settings = settings
+            self._last_available = available
+        super()._handle_coordinator_update()
 
     @property
     def native_value(self) -> Any:
         data: dict = self.coordinator.data or {}
         key = self.entity_description.key
 
-        def get_nested(
-            path: tuple[Any, ...],
-            default: Any = None,
-            *,
-            scale: float | None = None,
-            digits: int | None = None,
-        ):
-            """Safely read nested path from coordinator data.
-
-            Args:
-                path: tuple of keys/indexes
-                default: value when missing
-                scale: multiply numeric result by this factor
-                digits: round numeric result to this amount of digits
-            """
-            cur: Any = data
-            try:
-                for p in path:
-                    cur = cur[p]
-            except (KeyError, IndexError, TypeError):
-                return default
-
-            if scale is not None and isinstance(cur, (int, float)):
-                cur = cur * scale
-            if digits is not None and isinstance(cur, (int, float)):
-                cur = round(cur, digits)
-            return cur
-
-        def trunc_decimals(value: float, digits: int) -> float:
-            """Truncate (not round) a float to a fixed number of decimals.
-
-            The vendor app appears to *truncate* kWh values (e.g. 46.649 -> 46.64).
-            """
-            factor = 10 ** digits
-            return math.trunc(value * factor) / factor
-
-        if key == "battery_soc":
-            raw = get_nested(("Batsoc", 0, 0))
-            return round(raw / 100.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "battery_voltage":
-            raw = get_nested(("Batt", 0, 0))
-            return round(raw / 1000.0, 2) if isinstance(raw, (int, float)) else None
-
-        if key == "load_percent":
-            raw = data.get("lPerc")
-            # Commonly appears scaled by 10 (e.g. 110 -> 11.0%)
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "power_flow":
-            raw = data.get("pFlow")
-            return raw if isinstance(raw, (int, float)) else None
-
-        if key == "bus_voltage_p":
-            raw = data.get("busVp")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_in_voltage":
-            raw = get_nested(("ACin", 0, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_in_current":
-            raw = get_nested(("ACin", 1, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_in_frequency":
-            raw = get_nested(("ACin", 2, 0))
-            return round(raw / 100.0, 2) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_in_power":
-            # ACin[3][0] looks like active power in watts
-            raw = get_nested(("ACin", 3, 0))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_in_apparent_power":
-            # ACin[3][1] looks like apparent power in volt-amperes
-            raw = get_nested(("ACin", 3, 1))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_voltage":
-            raw = get_nested(("ACout", 0, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_current":
-            raw = get_nested(("ACout", 1, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_frequency":
-            raw = get_nested(("ACout", 2, 0))
-            return round(raw / 100.0, 2) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_power":
-            # ACout[3][0] looks like active power in watts
-            raw = get_nested(("ACout", 3, 0))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_apparent_power":
-            raw = get_nested(("ACout", 3, 1))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "ac_out_reactive_power":
-            raw = get_nested(("ACout", 3, 2))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        def _pv_is_aggregated() -> bool:
-            """Detect aggregated PV layout used by some firmwares.
-
-            Observed layouts in `real infor`:
-              * Per-MPPT: PV[0]=[V1,I1,P1], PV[1]=[V2,I2,P2], PV[2]=[V3,I3,P3], PV[3]=[Ptotal]
-              * Aggregated: PV[0]=[Vpv,0,0], PV[1]=[Ipv*10,0,0], PV[2]=[Ppv,0,0], PV[3]=[Ptotal]
-            """
-            v0 = get_nested(("PV", 0, 0))
-
-            # Voltage is usually tens/hundreds of volts => raw > 500 (>= 50.0V).
-            if not (isinstance(v0, (int, float)) and v0 > 500):
-                return False
-
-            # If PV[0][1] (current) or PV[0][2] (power) contains meaningful values,
-            # assume per-MPPT layout.
-            i0 = get_nested(("PV", 0, 1))
-            p0 = get_nested(("PV", 0, 2))
-            if isinstance(i0, (int, float)) and i0 != 0:
-                return False
-            if isinstance(p0, (int, float)) and p0 != 0:
-                return False
-
-            v1 = get_nested(("PV", 1, 0))
-            p2 = get_nested(("PV", 2, 0))
-            pt = get_nested(("PV", 3, 0))
-
-            # Heuristic: PV[1][0] looks like current*10 (0..30A => raw 0..300)
-            current_like = isinstance(v1, (int, float)) and 0 < v1 < 300
-
-            # Heuristic: PV[2][0] is close to PV[3][0] (both are power in watts)
-            power_like = (
-                isinstance(pt, (int, float))
-                and isinstance(p2, (int, float))
-                and pt >= 0
-                and p2 >= 0
-                and abs(pt - p2) <= max(5.0, 0.05 * max(pt, 1.0))
-                and p2 < 20000
-            )
-
-            return current_like or power_like
-
-
-        if key == "pv1_voltage":
-            raw = get_nested(("PV", 0, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "pv1_current":
-            raw_i = get_nested(("PV", 0, 1))
-            if _pv_is_aggregated():
-                raw_i = get_nested(("PV", 1, 0))
-            return round(raw_i / 10.0, 1) if isinstance(raw_i, (int, float)) else None
-
-        if key == "pv1_power":
-            # Some firmwares expose PV as an "aggregated" matrix:
-            #   PV[0] = [Vpv, V2, V3]
-            #   PV[1] = [Ipv*10, I2*10, I3*10]
-            #   PV[2] = [Ppv, P2, P3]
-            #   PV[3] = [Ptotal]
-            # In this layout PV1 power is PV[2][0] (not PV[0][2]).
-            if _pv_is_aggregated():
-                p1 = get_nested(("PV", 2, 0))
-                total = get_nested(("PV", 3, 0))
-                if isinstance(p1, (int, float)):
-                    # Some firmwares keep PV[2][0]=0 while total has value.
-                    if p1 == 0 and isinstance(total, (int, float)) and total != 0:
-                        return round(total, 0)
-                    return round(p1, 0)
-                return round(total, 0) if isinstance(total, (int, float)) else None
-
-            # Some firmwares report PV total power only, leaving PV1 power at 0.
-            # If PV2 is missing/zero, map PV1 Power to PV Total Power.
-            p1 = get_nested(("PV", 0, 2))
-            if isinstance(p1, (int, float)) and p1 != 0:
-                return round(p1, 0)
-
-            # PV2 considered absent when all three values are 0 (or missing)
-            pv2_v = get_nested(("PV", 1, 0), default=0)
-            pv2_c = get_nested(("PV", 1, 1), default=0)
-            pv2_p = get_nested(("PV", 1, 2), default=0)
-            total = get_nested(("PV", 3, 0))
-
-            if (
-                (not isinstance(pv2_v, (int, float)) or pv2_v == 0)
-                and (not isinstance(pv2_c, (int, float)) or pv2_c == 0)
-                and (not isinstance(pv2_p, (int, float)) or pv2_p == 0)
-                and isinstance(total, (int, float))
-            ):
-                return round(total, 0)
-
-            return round(p1, 0) if isinstance(p1, (int, float)) else (round(total, 0) if isinstance(total, (int, float)) else None)
-
-        if key == "pv2_voltage":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 1, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "pv2_current":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 1, 1))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "pv2_power":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 1, 2))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "pv3_voltage":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 2, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "pv3_current":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 2, 1))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "pv3_power":
-            if _pv_is_aggregated():
-                return 0.0
-            raw = get_nested(("PV", 2, 2))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        if key == "pv_total_power":
-            raw = get_nested(("PV", 3, 0))
-            return round(raw, 0) if isinstance(raw, (int, float)) else None
-
-        # --- Energy counters (Energy[0..7] -> [0,total,day,month,year]) ---
-        energy_map: dict[str, tuple[int, int]] = {
-            # PV
-            "energy_pv_total": (0, 1),
-            "energy_pv_today": (0, 2),
-            "energy_pv_month": (0, 3),
-            "energy_pv_year": (0, 4),
-            # Backup load (Reserved)
-            "energy_backup_load_total": (1, 1),
-            "energy_backup_load_today": (1, 2),
-            "energy_backup_load_month": (1, 3),
-            "energy_backup_load_year": (1, 4),
-            # Grid import (consumption)
-            "energy_grid_import_total": (2, 1),
-            "energy_grid_import_today": (2, 2),
-            "energy_grid_import_month": (2, 3),
-            "energy_grid_import_year": (2, 4),
-            # Grid export (feed-in)
-            "energy_grid_export_total": (3, 1),
-            "energy_grid_export_today": (3, 2),
-            "energy_grid_export_month": (3, 3),
-            "energy_grid_export_year": (3, 4),
-            # Battery charge
-            "energy_battery_charge_total": (4, 1),
-            "energy_battery_charge_today": (4, 2),
-            "energy_battery_charge_month": (4, 3),
-            "energy_battery_charge_year": (4, 4),
-            # Battery discharge
-            "energy_battery_discharge_total": (5, 1),
-            "energy_battery_discharge_today": (5, 2),
-            "energy_battery_discharge_month": (5, 3),
-            "energy_battery_discharge_year": (5, 4),
-            # Home load
-            "energy_home_load_total": (6, 1),
-            "energy_home_load_today": (6, 2),
-            "energy_home_load_month": (6, 3),
-            "energy_home_load_year": (6, 4),
-            # Total load (Backup + Home)
-            "energy_total_load_total": (7, 1),
-            "energy_total_load_today": (7, 2),
-            "energy_total_load_month": (7, 3),
-            "energy_total_load_year": (7, 4),
-        }
-        if key in energy_map:
-            g, i = energy_map[key]
-            raw = get_nested(("Energy", g, i))
-            if not isinstance(raw, (int, float)):
-                return None
-
-            kwh = trunc_decimals(raw / 1000.0, 2)
-
-            # The inverter sometimes outputs a short-lived glitch for *_today values
-            # (e.g., after a nightly reboot), where "today" momentarily includes
-            # yesterday's kWh. This causes large vertical spikes in HA History.
-            # We suppress implausible upward jumps based on the time delta between
-            # payload timestamps.
-            if key.endswith("_today"):
-                date_str = data.get("date")
-
-                # Avoid mutating caches multiple times for the same payload.
-                if (
-                    date_str
-                    and date_str == self._energy_today_last_date
-                    and self._energy_today_last_kwh is not None
-                ):
-                    return self._energy_today_last_kwh
-
-                ts = None
-                if isinstance(date_str, str) and len(date_str) >= 14:
-                    try:
-                        ts = datetime.strptime(date_str[:14], "%Y%m%d%H%M%S")
-                    except Exception:
-                        ts = None
-
-                if (
-                    self._energy_today_last_kwh is not None
-                    and self._energy_today_last_ts is not None
-                    and ts is not None
-                ):
-                    dt = (ts - self._energy_today_last_ts).total_seconds()
-                    if dt < 0:
-                        dt = 0
-
-                    # Conservative upper bound: 20 kW equivalent + 0.5 kWh margin.
-                    max_kw = 20.0
-                    allowed_jump = (max_kw * (dt / 3600.0)) + 0.5
-
-                    if (kwh - self._energy_today_last_kwh) > allowed_jump:
-                        # Keep previous value, but advance "seen" timestamp/date
-                        # so we don't repeatedly process the same payload.
-                        self._energy_today_last_ts = ts
-                        self._energy_today_last_date = date_str
-                        return self._energy_today_last_kwh
-
-                # Accept new value
-                if ts is not None:
-                    self._energy_today_last_ts = ts
-                self._energy_today_last_kwh = kwh
-                self._energy_today_last_date = date_str
-                return kwh
-
-            return kwh
-
-
-        if key == "temp_1":
-            raw = get_nested(("Temp", 0, 0))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "temp_2":
-            raw = get_nested(("Temp", 0, 2))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "temp_3":
-            raw = get_nested(("Temp", 0, 3))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "temp_4":
-            raw = get_nested(("Temp", 0, 4))
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "work_mode":
-            return data.get("workM")
-
-        if key == "warning_code":
-            return data.get("warn")
-
-        if key == "fault_code":
-            return data.get("fault")
-
-        if key == "firmware_version":
-            basic = data.get("_basic") or {}
-            return basic.get("version")
-
-        if key == "last_update_raw":
-            return data.get("date")
-
-        if key == "warning_flags_raw":
-            return data.get("wan2F")
-
-        if key == "warning_flags2_raw":
-            return data.get("wan3F")
-
-        if key == "parallel_status":
-            return data.get("ParStu")
-
-        if key == "bus_voltage_n":
-            raw = get_nested(("busVn",), scale=0.1, digits=1)
-            return raw
-
         if key == "telemetry_raw":
             # Keep state small; details in attributes.
             return data.get("date") or "ok"
 
-        # --- Settings (dev set infor) ---
-        settings = data.get("_settings") or {}
-
         if key == "settings_summary":
+            settings = data.get("_settings") or {}
             return len(settings) if isinstance(settings, dict) and settings else None
 
-        def sget(name: str):
+        # Everything else was decoded once for this snapshot by the profile.
+        value = self.coordinator.decoded.get(key)
+        if self._is_energy_today and value is not None:
+            return self._filter_energy_today(value, data.get("date"))
+        return value
+
+    def _filter_energy_today(self, kwh: float, date_str: Any) -> float:
+        """Suppress implausible upward jumps of inverter-reported *_today values.
+
+        The inverter sometimes outputs a short-lived glitch for *_today values
+        (e.g., after a nightly reboot), where "today" momentarily includes
+        yesterday's kWh. This causes large vertical spikes in HA History.
+        We suppress implausible upward jumps based on the time delta between
+        payload timestamps.
+        """
+        # Avoid mutating caches multiple times for the same payload.
+        if (
+            date_str
+            and date_str == self._energy_today_last_date
+            and self._energy_today_last_kwh is not None
+        ):
+            return self._energy_today_last_kwh
+
+        ts = None
+        if isinstance(date_str, str) and len(date_str) >= 14:
             try:
-                return settings.get(name)
+                ts = datetime.strptime(date_str[:14], "%Y%m%d%H%M%S")
             except Exception:
-                return None
-
-        if key == "set_operating_mode":
-            return sget("OperM")
-
-        if key == "set_ac_nominal_voltage":
-            raw = sget("Aorvol")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_grid_over_voltage":
-            raw = sget("FGOV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_grid_under_voltage":
-            raw = sget("FGUV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_grid_over_frequency":
-            raw = sget("FGOFq")
-            return round(raw / 100.0, 2) if isinstance(raw, (int, float)) else None
-
-        if key == "set_grid_under_frequency":
-            raw = sget("FGUF")
-            return round(raw / 100.0, 2) if isinstance(raw, (int, float)) else None
-
-        
-        if key == "set_stand":
-            return sget("Stand")
-
-        if key == "set_ac_nominal_frequency_raw":
-            return sget("Aorfre")
-
-        if key == "set_grid_over_voltage_time_raw":
-            return sget("FGOVT")
-
-        if key == "set_grid_under_voltage_time_raw":
-            return sget("FGUVT")
-
-        if key == "set_grid_over_frequency_time_raw":
-            return sget("FGOFqT")
-
-        if key == "set_grid_under_frequency_time_raw":
-            return sget("FGUFT")
-
-        if key == "set_grid_over_voltage_10min":
-            raw = sget("tenGOV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_secondary_grid_over_voltage":
-            raw = sget("sGOV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_secondary_grid_under_voltage":
-            raw = sget("sGUV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_generator_cooldown_time_raw":
-            return sget("GCWT")
-
-        if key == "set_generator_pv_start_delay_raw":
-            return sget("GPSl")
-
-        if key == "set_battery_cv_over_grid":
-            raw = sget("BCVOG")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_cv_float_grid":
-            raw = sget("BCVFG")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_rv_over_grid":
-            raw = sget("BRVOG")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_bddog_raw":
-            return sget("BDDOG")
-
-        if key == "set_battery_bddfg_raw":
-            return sget("BDDFG")
-
-        if key == "set_battery_brdfg_raw":
-            return sget("BRDFG")
-
-        if key == "set_battery_type":
-            return sget("batTy")
-
-        if key == "set_battery_count":
-            return sget("BNum")
-
-        if key == "set_battery_charge_voltage":
-            raw = sget("BChgV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_float_voltage":
-            raw = sget("BFChV")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_max_charge_current":
-            raw = sget("BMChC")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_battery_max_discharge_current":
-            raw = sget("BMDCu")
-            return round(raw / 10.0, 1) if isinstance(raw, (int, float)) else None
-
-        if key == "set_zero_export_mode":
-            return sget("ZEMode")
-
-        if key == "set_zero_export_power":
-            return sget("ZeroEP")
+                ts = None
 
-        if key == "set_buzzer_enabled":
-            return sget("buzEn")
+        if (
+            self._energy_today_last_kwh is not None
+            and self._energy_today_last_ts is not None
+            and ts is not None
+        ):
+            dt = (ts - self._energy_today_last_ts).total_seconds()
+            if dt < 0:
+                dt = 0
+
+            # Conservative upper bound: 20 kW equivalent + 0.5 kWh margin.
+            max_kw = 20.0
+            allowed_jump = (max_kw * (dt / 3600.0)) + 0.5
+
+            if (kwh - self._energy_today_last_kwh) > allowed_jump:
+                # Keep previous value, but advance "seen" timestamp/date
+                # so we don't repeatedly process the same payload.
+                self._energy_today_last_ts = ts
+                self._energy_today_last_date = date_str
+                return self._energy_today_last_kwh
 
-        return None
+        # Accept new value
+        if ts is not None:
+            self._energy_today_last_ts = ts
+        self._energy_today_last_kwh = kwh
+        self._energy_today_last_date = date_str
+        return kwh
 
     @property
     def extra_state_attributes(self) -> dict[str, Any] | None:
@@ -1478,13 +1159,134 @@ class FelicitySensor(CoordinatorEntity, SensorEntity):
                 "Batsoc": data.get("Batsoc"),
             }
         if key == "settings_summary":
-            settings = data.get("_settings") or {}
-            packs = data.get("_settings_packs") or []
-            return {
-                "pack_count": len(packs) if isinstance(packs, list) else None,
-                "ttlPack": settings.get("ttlPack") if isinstance(settings, dict) else None,
-                "last_index": settings.get("index") if isinstance(settings, dict) else None,
-                "settings": settings,
+            # Values are available through the set_* sensors and get_snapshot;
+            # raw packs only when debug capture is on.
+            attrs: dict[str, Any] = {
+                "pack_count": self.coordinator.client.settings_pack_count
             }
+            packs = data.get("_settings_packs")
+            if packs is not None:
+                attrs["packs"] = packs
+            return attrs
+
+        return None
+
+class FelicityLocalEnergySensor(FelicityEntity, SensorEntity):
+    """Energy integrated by the coordinator; state written on a throttled cadence."""
 
-        return None
\ No newline at end of file
+    def __init__(
+        self,
+        coordinator,
+        entry: ConfigEntry,
+        description: FelicitySensorDescription,
+    ) -> None:
+        super().__init__(coordinator, entry, description.key)
+        self.entity_description = description
+        self._last_write: float | None = None
+        self._last_available: bool | None = None
+
+    @property
+    def native_value(self) -> float:
+        return round(self.coordinator.energy.totals[self.entity_description.key], 3)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        now = time.monotonic()
+        available = self.coordinator.last_update_success
+        if (
+            self._last_write is not None
+            and available == self._last_available
+            and now - self._last_write < LOCAL_ENERGY_WRITE_INTERVAL
+        ):
+            return
+        self._last_write = now
+        self._last_available = available
+        super()._handle_coordinator_update()
+
+
+class FelicityActiveFlagsSensor(FelicityEntity, SensorEntity):
+    """Number of set warning/BMS flags, with their names as attribute."""
+
+    def __init__(
+        self,
+        coordinator,
+        entry: ConfigEntry,
+        description: FelicitySensorDescription,
+    ) -> None:
+        super().__init__(coordinator, entry, description.key)
+        self.entity_description = description
+        self._last_words: dict[str, int | None] | None = None
+        self._last_available: bool | None = None
+
+    @property
+    def native_value(self) -> int:
+        return len(self.coordinator.active_flags)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {
+            "flags": list(self.coordinator.active_flags),
+            **self.coordinator.flag_words,
+        }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when a flag word changed (the dict is replaced then)."""
+        words = self.coordinator.flag_words
+        available = self.coordinator.last_update_success
+        if words is self._last_words and available == self._last_available:
+            return
+        self._last_words = words
+        self._last_available = available
+        super()._handle_coordinator_update()
+
+
+class FelicityCellSensor(FelicityEntity, SensorEntity):
+    """One Temp/Batt/INV/Batsoc matrix cell, read from the coordinator's flat tuple."""
+
+    def __init__(
+        self,
+        coordinator,
+        entry: ConfigEntry,
+        path: tuple[str, int, int],
+        spec: CellSpec,
+    ) -> None:
+        super().__init__(coordinator, entry, spec.key)
+        self._path = path
+        self._spec = spec
+        self.entity_description = FelicitySensorDescription(
+            key=spec.key,
+            name=spec.name,
+            native_unit_of_measurement=spec.unit,
+            device_class=SensorDeviceClass(spec.device_class) if spec.device_class else None,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=None if spec.named else EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=spec.named,
+        )
+        self._last_values: tuple[Any, ...] | None = None
+        self._last_raw: Any = None
+        self._last_available: bool | None = None
+
+    def _raw(self) -> Any:
+        index = self.coordinator.cell_index.get(self._path)
+        return None if index is None else self.coordinator.cell_values[index]
+
+    @property
+    def native_value(self) -> Any:
+        return self._spec.scale(self._raw())
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Skip unless the cell tuple changed, and then unless this cell did."""
+        values = self.coordinator.cell_values
+        available = self.coordinator.last_update_success
+        if available == self._last_available:
+            if values is self._last_values:
+                return
+            self._last_values = values
+            if self._raw() == self._last_raw:
+                return
+        self._last_values = values
+        self._last_raw = self._raw()
+        self._last_available = available
+        super()._handle_coordinator_update()
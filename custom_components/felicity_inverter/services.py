@@ -0,0 +1,170 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .api import FelicityApiError, validate_setting
+from .const import (
+    ATTR_CYCLES,
+    ATTR_ENTRY_ID,
+    ATTR_GROUPS,
+    ATTR_SETTINGS,
+    DOMAIN,
+    SERVICE_GET_SNAPSHOT,
+    SERVICE_PROFILE,
+    SERVICE_SET_SETTINGS,
+    SNAPSHOT_GROUPS,
+)
+from .coordinator import FelicityCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+SET_SETTINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTRY_ID): cv.string,
+        vol.Required(ATTR_SETTINGS): vol.Schema({cv.string: vol.Coerce(float)}),
+    }
+)
+
+GET_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_GROUPS, default=list(SNAPSHOT_GROUPS)): vol.All(
+            cv.ensure_list, [vol.In(SNAPSHOT_GROUPS)]
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+def _get_coordinator(hass: HomeAssistant, entry_id: str) -> FelicityCoordinator:
+    data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if data is None:
+        raise ServiceValidationError(f"No loaded Felicity inverter with entry_id {entry_id}")
+    return data["coordinator"]
+
+
+async def _async_set_settings(call: ServiceCall) -> None:
+    """Write several raw settings in one transaction with a single readback."""
+    coordinator = _get_coordinator(call.hass, call.data[ATTR_ENTRY_ID])
+    settings: dict[str, Any] = call.data[ATTR_SETTINGS]
+
+    # Validate everything before anything is queued or sent.
+    try:
+        coordinator.check_writes_enabled()
+        for key, value in settings.items():
+            validate_setting(key, value)
+    except ValueError as err:
+        raise ServiceValidationError(str(err)) from err
+
+    for key, value in settings.items():
+        await coordinator.async_queue_setting(key, value)
+    try:
+        await coordinator.async_flush_settings()
+    except FelicityApiError as err:
+        raise HomeAssistantError(str(err)) from err
+
+
+def build_snapshot(
+    coordinator: FelicityCoordinator, groups: list[str] | tuple[str, ...]
+) -> dict[str, Any]:
+    """Current cached snapshot of one inverter, limited to the given groups."""
+    data = coordinator.data or {}
+    snapshot: dict[str, Any] = {
+        "host": coordinator.client.host,
+        "available": coordinator.last_update_success,
+        "frame_stale": coordinator.client.frame_stale,
+        "data_stale": coordinator.data_stale,
+        "data_age": coordinator.data_age,
+    }
+    if "runtime" in groups:
+        snapshot["runtime"] = {
+            key: value for key, value in data.items() if not key.startswith("_")
+        }
+    if "decoded" in groups:
+        snapshot["decoded"] = dict(coordinator.decoded)
+    if "energy" in groups:
+        snapshot["energy"] = {
+            **{
+                key: value
+                for key, value in coordinator.decoded.items()
+                if key.startswith("energy_")
+            },
+            **coordinator.energy.totals,
+        }
+    if "settings" in groups:
+        snapshot["settings"] = data.get("_settings") or {}
+    if "basic" in groups:
+        snapshot["basic"] = data.get("_basic") or {}
+    return snapshot
+
+
+async def _async_get_snapshot(call: ServiceCall) -> ServiceResponse:
+    """Return cached snapshots without polling the dongle."""
+    groups = call.data[ATTR_GROUPS]
+    if ATTR_ENTRY_ID in call.data:
+        entry_ids = [call.data[ATTR_ENTRY_ID]]
+    else:
+        entry_ids = list(call.hass.data.get(DOMAIN, {}))
+    return {
+        "inverters": {
+            entry_id: build_snapshot(_get_coordinator(call.hass, entry_id), groups)
+            for entry_id in entry_ids
+        }
+    }
+
+
+async def _async_profile(call: ServiceCall) -> None:
+    """Start profiling the next update cycles of one inverter."""
+    coordinator = _get_coordinator(call.hass, call.data[ATTR_ENTRY_ID])
+    try:
+        coordinator.start_profile(call.data[ATTR_CYCLES])
+    except RuntimeError as err:
+        raise ServiceValidationError(str(err)) from err
+    await coordinator.async_request_refresh()
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register integration services (once per HA instance)."""
+    if hass.services.has_service(DOMAIN, SERVICE_SET_SETTINGS):
+        return
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_SETTINGS,
+        _async_set_settings,
+        schema=SET_SETTINGS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SNAPSHOT,
+        _async_get_snapshot,
+        schema=GET_SNAPSHOT_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+    )
@@ -0,0 +1,184 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Hourly external statistics built from the device's lifetime energy counters.
+
+For every Energy group the device reports a `total` counter for, an external
+statistic ``felicity_inverter:<entry>_<group>`` (kWh, has_sum) is maintained:
+
+  * each completed hour gets one row whose state is the counter reading at the
+    end of that hour, so the dashboard uses the device's own accounting instead
+    of whatever `*_today` states happened to be recorded;
+  * the sum starts at zero with the first imported hour and grows by counter
+    deltas (Home Assistant takes a missing previous sum as 0, so a sum equal
+    to the lifetime counter would show it as one spike in the first hour);
+  * rows are imported in one batch per hour change with
+    `async_add_external_statistics`;
+  * on start the last imported row is read back, so a restart continues the
+    series; hours without readings (outage, HA down) get rows carrying the last
+    sum forward and the energy counted meanwhile lands in the first hour read
+    after the gap - the device total itself is never lost.
+
+A counter that drops by more than STATISTICS_RESET_THRESHOLD is treated as a
+reset (the sum keeps increasing); smaller drops are read glitches and ignored.
+"""
+
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, STATISTICS_MAX_GAP_HOURS, STATISTICS_RESET_THRESHOLD
+from .coordinator import FelicityCoordinator
+from .profiles import ENERGY_GROUP_NAMES
+
+_LOGGER = logging.getLogger(__name__)
+
+_HOUR = timedelta(hours=1)
+
+
+class _Series:
+    """Import state of one statistic."""
+
+    def __init__(self, statistic_id: str, name: str) -> None:
+        self.metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=name,
+            source=DOMAIN,
+            statistic_id=statistic_id,
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+        # Start of the last hour already in the database, its sum and state.
+        self.last_hour: datetime | None = None
+        self.last_sum: float | None = None
+        self.last_state: float | None = None
+        # Offset added to the device counter to get the sum (zero-based,
+        # monotonic); set from the first reading.
+        self.offset = 0.0
+        # Hour being collected and the latest sum and counter seen in it.
+        self.hour: datetime | None = None
+        self.sum: float | None = None
+        self.state: float | None = None
+        self.rows: list[StatisticData] = []
+
+    def add_reading(self, hour: datetime, total: float) -> None:
+        if self.sum is None:
+            if self.last_sum is None:
+                # New series: the first reading is the zero point.
+                self.offset = -total
+            elif self.last_state is not None:
+                # Resume: energy counted while not running is added; a drop
+                # is handled as a reset or glitch below.
+                self.offset = self.last_sum - self.last_state
+            else:
+                self.offset = self.last_sum - total
+        if self.hour is not None and hour > self.hour:
+            self._close_hour(hour)
+        if self.hour is None or hour > self.hour:
+            self.hour = hour
+
+        value = total + self.offset
+        floor = self.sum if self.sum is not None else self.last_sum
+        if floor is not None and value < floor:
+            if floor - value > STATISTICS_RESET_THRESHOLD:
+                self.offset += floor - value
+            value = floor
+        self.sum = value
+        self.state = total
+
+    def _close_hour(self, next_hour: datetime) -> None:
+        """Queue the collected hour, after carrying the last sum over unread hours."""
+        if self.sum is None or self.hour is None:
+            return
+        if self.last_hour is not None and self.last_sum is not None:
+            start = max(
+                self.last_hour + _HOUR, self.hour - STATISTICS_MAX_GAP_HOURS * _HOUR
+            )
+            while start < self.hour:
+                self._append(start, self.last_sum, self.last_state)
+                start += _HOUR
+        self._append(self.hour, self.sum, self.state)
+
+    def _append(self, start: datetime, value: float, state: float | None) -> None:
+        if self.last_hour is not None and start <= self.last_hour:
+            return
+        self.rows.append(StatisticData(start=start, state=state, sum=value))
+        self.last_hour = start
+        self.last_sum = value
+        self.last_state = state
+
+
+class EnergyStatistics:
+    """Feed external statistics of one inverter from fresh coordinator snapshots."""
+
+    def __init__(self, hass: HomeAssistant, coordinator: FelicityCoordinator) -> None:
+        self._hass = hass
+        self._coordinator = coordinator
+        entry = coordinator.entry
+        prefix = f"{DOMAIN}:{entry.entry_id.lower()}"
+        self._series: dict[str, _Series] = {
+            name: _Series(
+                f"{prefix}_{name}", f"{entry.title} {name.replace('_', ' ')}"
+            )
+            for name in ENERGY_GROUP_NAMES
+        }
+        self._unsub = None
+
+    async def async_start(self) -> None:
+        """Resume every series from its last imported row, then follow the coordinator."""
+        recorder = get_instance(self._hass)
+        for series in self._series.values():
+            statistic_id = series.metadata["statistic_id"]
+            last = await recorder.async_add_executor_job(
+                get_last_statistics,
+                self._hass,
+                1,
+                statistic_id,
+                True,
+                {"state", "sum"},
+            )
+            rows = last.get(statistic_id)
+            if rows:
+                start = rows[0]["start"]
+                if not isinstance(start, datetime):
+                    start = dt_util.utc_from_timestamp(start)
+                series.last_hour = start
+                series.last_sum = rows[0]["sum"]
+                series.last_state = rows[0].get("state")
+        self._unsub = self._coordinator.async_add_listener(self._on_snapshot)
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _on_snapshot(self) -> None:
+        if not self._coordinator.last_update_success:
+            return
+        decoded = self._coordinator.decoded
+        hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+        for name, series in self._series.items():
+            total = decoded.get(f"energy_{name}_total")
+            if not isinstance(total, (int, float)):
+                continue
+            series.add_reading(hour, float(total))
+            if series.rows:
+                rows, series.rows = series.rows, []
+                _LOGGER.debug(
+                    "%s: importing %s hourly rows for %s",
+                    self._coordinator.name,
+                    len(rows),
+                    series.metadata["statistic_id"],
+                )
+                async_add_external_statistics(self._hass, series.metadata, rows)
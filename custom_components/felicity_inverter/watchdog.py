@@ -0,0 +1,154 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Event-loop blocking watchdog for one coordinator.
+
+Measures the *synchronous* time each update cycle spends on the event loop,
+split into phases (parse, settings, decode) and entity writes per platform.
+When a cycle exceeds the configured budget a warning with the breakdown is
+logged; the worst cycles are kept for diagnostics.
+
+Like the profiler, phases are timed through instance-attribute wrappers that
+exist only while the watchdog is enabled. Entity writes are reported by
+FelicityEntity when `coordinator.watchdog` is set.
+"""
+
+from collections import defaultdict
+import functools
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable
+
+from .const import WATCHDOG_WORST_CYCLES
+from .profiler import resolve_owner, shadow
+
+_LOGGER = logging.getLogger(__name__)
+
+# (owner attribute path on the coordinator or None for the coordinator itself,
+#  method name, phase)
+_PHASES: tuple[tuple[str | None, str, str], ...] = (
+    ("client.transport", "parse", "parse"),
+    ("client", "_update_settings", "settings"),
+    (None, "_decode", "decode"),
+)
+
+
+class LoopWatchdog:
+    """Check every update cycle of one coordinator against a time budget."""
+
+    def __init__(self, coordinator: Any, budget: float) -> None:
+        self._coordinator = coordinator
+        self.budget = budget
+        self.cycles = 0
+        self.over_budget = 0
+        self._current: dict[str, float] = defaultdict(float)
+        self._depth = 0
+        self._pending_end = False
+        self._installed: list[Callable[[], None]] = []
+        # Min-heap of (total, seq, breakdown) holding the worst cycles.
+        self._worst: list[tuple[float, int, dict[str, Any]]] = []
+        self._seq = itertools.count()
+        self.phase_max: dict[str, float] = defaultdict(float)
+
+    def start(self) -> None:
+        for owner_attr, method, phase in _PHASES:
+            owner = resolve_owner(self._coordinator, owner_attr)
+            self._installed.append(
+                shadow(owner, method, functools.partial(self._wrap, phase=phase))
+            )
+
+        def _wrap_cycle(update: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(update)
+            async def _cycle(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await update(*args, **kwargs)
+                finally:
+                    if not self._pending_end:
+                        self._pending_end = True
+                        # Entity writes run right after this returns.
+                        self._coordinator.hass.loop.call_soon(self._end_cycle)
+
+            return _cycle
+
+        self._installed.append(
+            shadow(self._coordinator, "_async_update_data", _wrap_cycle)
+        )
+
+    def stop(self) -> None:
+        while self._installed:
+            self._installed.pop()()
+
+    def _wrap(self, func: Callable[..., Any], phase: str) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def _timed(*args: Any, **kwargs: Any) -> Any:
+            # Nested wrapped calls (settings -> parse) count for the outer phase.
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if not self._depth:
+                    self._current[phase] += time.perf_counter() - start
+
+        return _timed
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Account synchronous time to a phase of the current cycle."""
+        self._current[phase] += seconds
+
+    def _end_cycle(self) -> None:
+        self._pending_end = False
+        breakdown, self._current = self._current, defaultdict(float)
+        if not breakdown:
+            return
+        self.cycles += 1
+        total = sum(breakdown.values())
+        for phase, seconds in breakdown.items():
+            if seconds > self.phase_max[phase]:
+                self.phase_max[phase] = seconds
+
+        entry = {
+            "time": time.time(),
+            "total_ms": round(total * 1000, 3),
+            "phases_ms": {
+                phase: round(seconds * 1000, 3)
+                for phase, seconds in sorted(
+                    breakdown.items(), key=lambda item: item[1], reverse=True
+                )
+            },
+        }
+        item = (total, next(self._seq), entry)
+        if len(self._worst) < WATCHDOG_WORST_CYCLES:
+            heapq.heappush(self._worst, item)
+        elif total > self._worst[0][0]:
+            heapq.heapreplace(self._worst, item)
+
+        if total > self.budget:
+            self.over_budget += 1
+            _LOGGER.warning(
+                "%s: update cycle blocked the event loop for %.1f ms (budget %.1f ms): %s",
+                self._coordinator.name,
+                total * 1000,
+                self.budget * 1000,
+                ", ".join(f"{phase} {ms} ms" for phase, ms in entry["phases_ms"].items()),
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Counters and worst offenders for diagnostics."""
+        return {
+            "budget_ms": round(self.budget * 1000, 3),
+            "cycles": self.cycles,
+            "over_budget": self.over_budget,
+            "phase_max_ms": {
+                phase: round(seconds * 1000, 3)
+                for phase, seconds in sorted(
+                    self.phase_max.items(), key=lambda item: item[1], reverse=True
+                )
+            },
+            "worst_cycles": [
+                entry for _, _, entry in sorted(self._worst, reverse=True)
+            ],
+        }
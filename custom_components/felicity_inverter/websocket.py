@@ -0,0 +1,124 @@
+from __future__ import annotations
+# -*- coding: utf-8 -*-
+
+"""Websocket stream of decoded snapshots, pushed straight from the coordinators.
+
+    {"id": 1, "type": "felicity_inverter/subscribe",
+     "entry_ids": ["..."], "fields": ["pv_total_power", "battery_soc"]}
+
+Both filters are optional. The first event per inverter carries every selected
+field, later events only the fields whose value changed ({"entry_id", "delta"}).
+No entity state is written for this, so the recorder never sees it.
+
+When a subscribed entry is unloaded (removed, reloaded after an options
+change), a final {"entry_id", "unloaded": true} event is sent and the whole
+subscription ends; subscribe again once the entry is back.
+"""
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .coordinator import FelicityCoordinator
+
+WS_SUBSCRIBE = f"{DOMAIN}/subscribe"
+
+
+def _values(
+    coordinator: FelicityCoordinator, fields: set[str] | None
+) -> dict[str, Any]:
+    values = {**coordinator.decoded, **coordinator.energy.totals}
+    values["available"] = coordinator.last_update_success
+    if fields is not None:
+        values = {key: value for key, value in values.items() if key in fields}
+    return values
+
+
+@callback
+def async_register_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands (once per HA instance)."""
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_SUBSCRIBE,
+        vol.Optional("entry_ids"): [str],
+        vol.Optional("fields"): [str],
+    }
+)
+@callback
+def ws_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Subscribe to delta-encoded snapshots of the selected inverters."""
+    loaded = hass.data.get(DOMAIN, {})
+    entry_ids = msg.get("entry_ids") or list(loaded)
+    unknown = [entry_id for entry_id in entry_ids if entry_id not in loaded]
+    if unknown:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, f"Unknown entry_ids: {unknown}"
+        )
+        return
+
+    fields = set(msg["fields"]) if "fields" in msg else None
+    last: dict[str, dict[str, Any]] = {}
+    unsubs = []
+
+    def _make_listener(entry_id: str, coordinator: FelicityCoordinator):
+        @callback
+        def _push() -> None:
+            current = _values(coordinator, fields)
+            previous = last.get(entry_id, {})
+            delta = {
+                key: value
+                for key, value in current.items()
+                if key not in previous or previous[key] != value
+            }
+            # Fields that disappeared are sent as None.
+            delta.update((key, None) for key in previous if key not in current)
+            last[entry_id] = current
+            if delta:
+                connection.send_message(
+                    websocket_api.event_message(
+                        msg["id"], {"entry_id": entry_id, "delta": delta}
+                    )
+                )
+
+        return _push
+
+    @callback
+    def _unsubscribe() -> None:
+        while unsubs:
+            unsubs.pop()()
+
+    def _make_unload_hook(entry_id: str):
+        @callback
+        def _unloaded() -> None:
+            # Listeners of an unloaded coordinator never fire again.
+            if connection.subscriptions.get(msg["id"]) is not _unsubscribe:
+                return  # already ended by the client or the connection
+            connection.subscriptions.pop(msg["id"])()
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"], {"entry_id": entry_id, "unloaded": True}
+                )
+            )
+
+        return _unloaded
+
+    connection.subscriptions[msg["id"]] = _unsubscribe
+    connection.send_result(msg["id"])
+
+    for entry_id in entry_ids:
+        coordinator: FelicityCoordinator = loaded[entry_id]["coordinator"]
+        push = _make_listener(entry_id, coordinator)
+        unsubs.append(coordinator.async_add_listener(push))
+        coordinator.entry.async_on_unload(_make_unload_hook(entry_id))
+        push()
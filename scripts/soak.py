@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Soak / scaling harness: N simulated Felicity dongles polled from one event loop.
+
+Starts N fake dongles on 127.0.0.1 (one port each) that speak the 53970 text
+protocol (`get dev real infor`, `get dev basice infor`, `get dev set infor`),
+then polls all of them the way the integration does: FelicityClient ->
+model profile decode -> flag decoding, every `--interval` seconds, for
+`--duration` seconds per step. Steps are run for every N in `--inverters`, and
+one line per step is printed:
+
+  inverters  loop lag p50/p99/max   poll latency p50/p95/p99   CPU %   RSS growth   state writes/s
+
+State writes are counted as the decoded values that changed between fresh
+frames - exactly the entities that would write state (always_update=False and
+the per-entity change checks skip the rest), i.e. what the recorder has to
+store.
+
+With --memory-check, tracemalloc measures the memory retained per polled
+inverter (client, caches, decoded snapshot; fake dongles excluded) at the end of
+each step, and its growth over the second half of the step. The script exits
+with status 1 when the retained memory exceeds --memory-budget-kb per inverter:
+
+    python scripts/soak.py --inverters 20 --duration 30 --interval 1 --memory-check
+
+With --transport modbus the simulated units sit behind fake Modbus TCP gateways
+instead (same values, encoded through modbus.py's register maps, one persistent
+connection per poller), so both transports can be compared on identical data:
+
+    python scripts/soak.py --inverters 1,20 --duration 30 --interval 1 --transport modbus
+
+Limitation: this does not boot a Home Assistant core (HA is not a dependency
+of this repository). The integration's HA-free modules (api.py, modbus.py,
+profiles.py, flags.py) are loaded directly; entity, state machine and recorder
+costs are estimated from the write count here. tests/test_soak_hass.py
+measures them: it sets up N real config entries against these fake dongles in
+a test Home Assistant core (pytest-homeassistant-custom-component) and counts
+`state_changed` events and the recorder queue depth.
+
+    python scripts/soak.py --inverters 1,10,50,100 --duration 60 --interval 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import random
+import resource
+import statistics
+import struct
+import sys
+import time
+import tracemalloc
+import types
+from typing import Any
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "custom_components",
+    "felicity_inverter",
+)
+
+
+_PACKAGE = "felicity_soak"
+
+
+def _load(name: str) -> Any:
+    """Import one HA-free module of the integration without its package __init__."""
+    if _PACKAGE not in sys.modules:
+        # A bare package over the integration directory: relative imports
+        # between the HA-free modules work, __init__.py (HA) is never run.
+        package = types.ModuleType(_PACKAGE)
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules[_PACKAGE] = package
+    return importlib.import_module(f"{_PACKAGE}.{name}")
+
+
+# Steady-state memory one polled inverter may retain (client, settings cache,
+# last payload and decoded snapshot).
+MEMORY_BUDGET_KB = 64
+
+api = _load("api")
+modbus = _load("modbus")
+profiles = _load("profiles")
+flags = _load("flags")
+
+
+# ------------------------------------------------------------------ fake dongle
+
+
+class FakeDongle:
+    """One simulated dongle; the runtime frame refreshes every `refresh` seconds."""
+
+    SETTINGS_PACKS = (
+        {"ttlPack": 2, "index": 0, "ZeroEP": 100, "ZEMode": 1},
+        {"ttlPack": 2, "index": 1, "BMChC": 600, "BChgV": 564},
+    )
+
+    def __init__(self, index: int, refresh: float) -> None:
+        self.index = index
+        self.refresh = refresh
+        self.serial = f"SOAK{index:06d}"
+        self._rng = random.Random(index)
+        self._frame_at = 0.0
+        self._frame = b""
+        # Device clock: one second per new frame, so every new frame has a
+        # new `date` (the client treats an unchanged date as a repeated frame).
+        self._clock = int(time.time())
+        self.values: dict[str, Any] = {}
+        self._server: asyncio.base_events.Server | None = None
+        self.port = 0
+
+    async def start(self, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _refresh(self) -> bool:
+        """Roll new runtime values when due; True if they changed."""
+        now = time.monotonic()
+        if not self._frame or now - self._frame_at >= self.refresh:
+            self._frame_at = now
+            rng = self._rng
+            pv = rng.randint(0, 6000)
+            load = rng.randint(200, 4000)
+            grid = rng.randint(0, 3000)
+            self._clock += 1
+            frame = {
+                "DevSN": self.serial,
+                "date": time.strftime("%Y%m%d%H%M%S", time.localtime(self._clock)),
+                "workM": rng.choice((2, 3, 4)),
+                "warn": 0,
+                "fault": 0,
+                "wan2F": rng.choice((0, 0, 0, 4)),
+                "wan3F": 0,
+                "BMSFlg": 0,
+                "BFlgAll": 0,
+                "ParStu": 0,
+                "Batsoc": [[rng.randint(2000, 10000), 0, 0]],
+                "Batt": [[rng.randint(48000, 56000), rng.randint(-500, 500), 0]],
+                # Rows: voltage, current, frequency, [active, apparent, reactive].
+                "ACin": [
+                    [2300 + rng.randint(-50, 50), 0, 0],
+                    [grid * 10 // 230, 0, 0],
+                    [5000 + rng.randint(-5, 5), 0, 0],
+                    [grid, grid + rng.randint(0, 100), 0],
+                ],
+                "ACout": [
+                    [2300, 0, 0],
+                    [load * 10 // 230, 0, 0],
+                    [5000, 0, 0],
+                    [load, load + rng.randint(0, 200), rng.randint(-100, 100)],
+                ],
+                "PV": [[3500, 50, pv], [0, 0, 0], [0, 0, 0], [pv]],
+                "Temp": [[350, 0, 360, 370, 380]],
+                "busVp": 3900,
+                "busVn": 3900,
+                "lPerc": load // 60,
+                "pFlow": 1,
+                "Energy": [[0, 1000000 + i, 5000, 80000, 900000] for i in range(8)],
+            }
+            self.values = frame
+            self._frame = json.dumps(frame).encode()
+            return True
+        return False
+
+    def _real(self) -> bytes:
+        self._refresh()
+        return self._frame
+
+    def _basic_values(self) -> dict[str, Any]:
+        return {"DevSN": self.serial, "Type": 80, "SubType": 1, "version": "1.00"}
+
+    def _basic(self) -> bytes:
+        return json.dumps(self._basic_values()).encode()
+
+    def _settings(self) -> bytes:
+        return "".join(json.dumps(pack) for pack in self.SETTINGS_PACKS).encode()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            command = await reader.read(256)
+            if b"real infor" in command:
+                writer.write(self._real())
+            elif b"basice infor" in command:
+                writer.write(self._basic())
+            elif b"set infor" in command:
+                writer.write(self._settings())
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+class FakeModbusGateway(FakeDongle):
+    """The same simulated unit behind a Modbus TCP gateway.
+
+    Serves holding registers laid out by modbus.REGISTER_MAPS (unmapped
+    addresses read 0) and accepts single-register writes to the settings.
+    """
+
+    def __init__(self, index: int, refresh: float) -> None:
+        super().__init__(index, refresh)
+        self._registers: dict[int, int] = {}
+        self._runtime_starts = {
+            start for start, _ in modbus.REGISTER_MAPS[api.BLOCK_RUNTIME].ranges
+        }
+        self._encode(api.BLOCK_BASIC, self._basic_values())
+        settings: dict[str, Any] = {}
+        for pack in self.SETTINGS_PACKS:
+            settings.update(pack)
+        self._encode(api.BLOCK_SETTINGS, settings)
+
+    def _real(self) -> bytes:
+        if self._refresh():
+            self._encode(api.BLOCK_RUNTIME, self.values)
+        return self._frame
+
+    def _encode(self, block: str, values: dict[str, Any]) -> None:
+        for reg in modbus.REGISTER_MAPS[block].registers:
+            value = profiles.get_path(values, reg.path)
+            if reg.kind.startswith("str"):
+                raw = str(value or "").encode("ascii")[: reg.words * 2]
+                words = struct.unpack(f">{reg.words}H", raw.ljust(reg.words * 2, b"\0"))
+            else:
+                value = int(value or 0) & 0xFFFFFFFF
+                words = (value >> 16, value & 0xFFFF) if reg.words == 2 else (value & 0xFFFF,)
+            for offset, word in enumerate(words):
+                self._registers[reg.address + offset] = word
+
+    def _reply(self, pdu: bytes) -> bytes:
+        function = pdu[0]
+        if function == 0x03:
+            start, count = struct.unpack(">HH", pdu[1:5])
+            if start in self._runtime_starts:
+                self._real()
+            words = [self._registers.get(address, 0) for address in range(start, start + count)]
+            return bytes((function, count * 2)) + struct.pack(f">{count}H", *words)
+        if function == 0x06:
+            address, value = struct.unpack(">HH", pdu[1:5])
+            self._registers[address] = value
+            return pdu
+        return bytes((function | 0x80, 0x01))  # illegal function
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                tid, _, length, unit_id = struct.unpack(">HHHB", await reader.readexactly(7))
+                reply = self._reply(await reader.readexactly(length - 1))
+                writer.write(struct.pack(">HHHB", tid, 0, len(reply) + 1, unit_id) + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ------------------------------------------------------------------ pollers
+
+
+class Poller:
+    """Poll one dongle like the coordinator does and count value changes."""
+
+    def __init__(self, port: int, transport: str = "json") -> None:
+        self.client = api.FelicityClient(
+            "127.0.0.1",
+            port,
+            read_timeout=0.5,
+            queue=api.FelicityHostQueue(),
+            transport=(
+                modbus.ModbusTransport("127.0.0.1", port) if transport == "modbus" else None
+            ),
+        )
+        self.detector = profiles.PvLayoutDetector(None, None)
+        self.decoded: dict[str, Any] = {}
+        self.flag_words: dict[str, Any] = {}
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.writes = 0
+
+    async def poll_once(self) -> None:
+        start = time.perf_counter()
+        try:
+            data = await self.client.async_get_data()
+        except api.FelicityApiError:
+            self.errors += 1
+            return
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+        if self.client.frame_stale and self.decoded:
+            return
+        profile = profiles.select_profile(data.get("_basic"))
+        self.detector.update(data)
+        decoded = profile.decode(data, profile.pv_layout or self.detector.layout)
+        words = flags.read_flag_words(data)
+        if words != self.flag_words:
+            self.flag_words = words
+            flags.active_flags(words)
+            self.writes += 1
+        self.writes += sum(
+            1 for key, value in decoded.items() if self.decoded.get(key) != value
+        )
+        self.decoded = decoded
+
+    async def run(self, interval: float, stop_at: float) -> None:
+        # Spread the first polls over one interval, like entries set up over time.
+        await asyncio.sleep(random.uniform(0, interval))
+        while time.monotonic() < stop_at:
+            started = time.monotonic()
+            await self.poll_once()
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+async def _measure_lag(stop_at: float, samples: list[float], tick: float = 0.05) -> None:
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        await asyncio.sleep(tick)
+        samples.append(max(time.monotonic() - start - tick, 0.0))
+
+
+# ------------------------------------------------------------------ reporting
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss: peak, in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _pct(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def run_step(count: int, args: argparse.Namespace) -> dict[str, Any]:
+    fake = FakeModbusGateway if args.transport == "modbus" else FakeDongle
+    dongles = [fake(i, args.refresh) for i in range(count)]
+    for i, dongle in enumerate(dongles):
+        await dongle.start(args.base_port + i if args.base_port else 0)
+        # Dongle frames are allocated up front so they are not counted as pollers'.
+        dongle._real()
+    memory: dict[str, int] = {}
+    if args.memory_check:
+        # One throwaway poll fills module-level caches (compiled profile,
+        # lookup tables), which are shared and not a per-inverter cost.
+        warmup = Poller(dongles[0].port, args.transport)
+        await warmup.poll_once()
+        await warmup.client.async_close()
+        gc.collect()
+        tracemalloc.start()
+        memory["baseline"] = tracemalloc.get_traced_memory()[0]
+    pollers = [Poller(dongle.port, args.transport) for dongle in dongles]
+
+    rss_start = _rss_bytes()
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    stop_at = wall_start + args.duration
+    lag: list[float] = []
+
+    async def _memory_midpoint() -> None:
+        await asyncio.sleep(args.duration / 2)
+        gc.collect()
+        memory["midpoint"] = tracemalloc.get_traced_memory()[0]
+
+    await asyncio.gather(
+        _measure_lag(stop_at, lag),
+        *(poller.run(args.interval, stop_at) for poller in pollers),
+        *((_memory_midpoint(),) if args.memory_check else ()),
+    )
+
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+    rss_end = _rss_bytes()
+    if args.memory_check:
+        gc.collect()
+        memory["end"] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    for poller in pollers:
+        await poller.client.async_close()
+    for dongle in dongles:
+        await dongle.stop()
+
+    latencies = [lat for poller in pollers for lat in poller.latencies]
+    # Latency samples are harness bookkeeping, not integration state.
+    sample_bytes = sum(sys.getsizeof(poller.latencies) for poller in pollers)
+    row: dict[str, Any] = {
+        "inverters": count,
+        "polls": len(latencies),
+        "errors": sum(poller.errors for poller in pollers),
+        "loop_lag_ms": {
+            "p50": round(_pct(lag, 50) * 1000, 2),
+            "p99": round(_pct(lag, 99) * 1000, 2),
+            "max": round(max(lag, default=0.0) * 1000, 2),
+        },
+        "poll_latency_ms": {
+            "p50": round(_pct(latencies, 50) * 1000, 1),
+            "p95": round(_pct(latencies, 95) * 1000, 1),
+            "p99": round(_pct(latencies, 99) * 1000, 1),
+        },
+        # CPU of the whole process, fake dongles included (upper bound).
+        "cpu_percent": round(cpu / wall * 100, 1),
+        "rss_growth_mb": round((rss_end - rss_start) / 1_048_576, 2),
+        "state_writes_per_s": round(
+            sum(poller.writes for poller in pollers) / wall, 1
+        ),
+    }
+    if args.memory_check:
+        retained = memory["end"] - memory["baseline"] - sample_bytes
+        row["memory_per_inverter_kb"] = round(retained / count / 1024, 2)
+        row["memory_growth_per_inverter_kb"] = round(
+            (memory["end"] - memory.get("midpoint", memory["end"])) / count / 1024, 2
+        )
+    return row
+
+
+def _print_row(row: dict[str, Any]) -> None:
+    lag, lat = row["loop_lag_ms"], row["poll_latency_ms"]
+    print(
+        f"{row['inverters']:>9}  "
+        f"{lag['p50']:>7.2f} {lag['p99']:>7.2f} {lag['max']:>7.2f}  "
+        f"{lat['p50']:>7.1f} {lat['p95']:>7.1f} {lat['p99']:>7.1f}  "
+        f"{row['cpu_percent']:>6.1f}  {row['rss_growth_mb']:>8.2f}  "
+        f"{row['state_writes_per_s']:>8.1f}  {row['errors']:>6}"
+        + (
+            f"  {row['memory_per_inverter_kb']:>8.2f} {row['memory_growth_per_inverter_kb']:>8.2f}"
+            if "memory_per_inverter_kb" in row
+            else ""
+        ),
+        flush=True,
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    counts = [int(n) for n in args.inverters.split(",") if n.strip()]
+    rows = []
+    if not args.json:
+        print(
+            "inverters  lag p50     p99     max  lat p50     p95     p99    CPU%  "
+            "RSS+ MB  writes/s  errors"
+            + ("  KiB/inv  growth" if args.memory_check else "")
+        )
+    for count in counts:
+        row = await run_step(count, args)
+        rows.append(row)
+        if not args.json:
+            _print_row(row)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    if args.memory_check:
+        over = [
+            row
+            for row in rows
+            if row["memory_per_inverter_kb"] > args.memory_budget_kb
+        ]
+        for row in over:
+            print(
+                f"FAIL: {row['memory_per_inverter_kb']} KiB retained per inverter with "
+                f"{row['inverters']} inverters (budget {args.memory_budget_kb} KiB)",
+                file=sys.stderr,
+            )
+        if over:
+            return 1
+    return 0
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--inverters",
+        default="1,10,50",
+        help="comma separated inverter counts, one step each (default 1,10,50)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="seconds per step (default 30)"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=5, help="poll interval in seconds (default 5)"
+    )
+    parser.add_argument(
+        "--refresh",
+        type=float,
+        default=10,
+        help="seconds between runtime frame refreshes of a fake dongle (default 10)",
+    )
+    parser.add_argument(
+        "--base-port",
+        type=int,
+        default=0,
+        help="first port for fake dongles (default: any free port)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("json", "modbus"),
+        default="json",
+        help="wire protocol of the simulated units (default json)",
+    )
+    parser.add_argument(
+        "--memory-check",
+        action="store_true",
+        help="measure retained memory per inverter with tracemalloc",
+    )
+    parser.add_argument(
+        "--memory-budget-kb",
+        type=float,
+        default=MEMORY_BUDGET_KB,
+        help=f"steady-state budget per inverter (default {MEMORY_BUDGET_KB})",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(_parse_args())))
@@ -0,0 +1,15 @@
+"""Shared test setup.
+
+The repo root goes on sys.path so tests can import `custom_components` (those
+need Home Assistant). scripts/ goes on it too: `soak._load` imports the
+integration's HA-free modules (api, modbus, profiles, flags, profiler) without
+the package __init__, and soak.py has the fake dongles and gateways.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
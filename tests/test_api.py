@@ -0,0 +1,71 @@
+"""FelicityClient against fake dongles (scripts/soak.py)."""
+
+import asyncio
+import socket
+
+import soak
+
+api = soak._load("api")
+modbus = soak._load("modbus")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_concurrent_poll_shares_the_cycle_result() -> None:
+    async def _run() -> tuple[dict, dict]:
+        dongle = soak.FakeDongle(0, refresh=60)
+        await dongle.start(0)
+        client = api.FelicityClient("127.0.0.1", dongle.port, read_timeout=0.5)
+        try:
+            first, second = await asyncio.gather(
+                client.async_get_data(), client.async_get_data()
+            )
+        finally:
+            await client.async_close()
+            await dongle.stop()
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert first is second
+    assert first["DevSN"] == "SOAK000000"
+
+
+def test_concurrent_poll_shares_the_cycle_failure() -> None:
+    async def _run() -> list:
+        client = api.FelicityClient("127.0.0.1", _free_port(), read_timeout=0.5)
+        try:
+            return await asyncio.gather(
+                client.async_get_data(),
+                client.async_get_data(),
+                return_exceptions=True,
+            )
+        finally:
+            await client.async_close()
+
+    first, second = asyncio.run(_run())
+    assert isinstance(first, api.FelicityApiError)
+    assert second is first
+
+
+def test_first_modbus_snapshot_carries_the_serial() -> None:
+    async def _run() -> dict:
+        gateway = soak.FakeModbusGateway(3, refresh=60)
+        await gateway.start(0)
+        client = api.FelicityClient(
+            "127.0.0.1",
+            gateway.port,
+            transport=modbus.ModbusTransport("127.0.0.1", gateway.port),
+        )
+        try:
+            return await client.async_get_data()
+        finally:
+            await client.async_close()
+            await gateway.stop()
+
+    data = asyncio.run(_run())
+    assert data["DevSN"] == "SOAK000003"
+    assert data["_basic"]["DevSN"] == "SOAK000003"
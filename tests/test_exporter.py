@@ -0,0 +1,123 @@
+"""SnapshotExporter against a stub sink (needs Home Assistant's test harness)."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.felicity_inverter import exporter as exporter_mod  # noqa: E402
+from custom_components.felicity_inverter.exporter import (  # noqa: E402
+    ExportError,
+    SnapshotExporter,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class StubSink:
+    """Records every batch; raises ExportError while `down` is set."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.down = False
+
+    async def async_write(self, lines: list[str]) -> None:
+        if self.down:
+            raise ExportError("sink down")
+        self.batches.append(list(lines))
+
+    @property
+    def lines(self) -> list[str]:
+        return [line for batch in self.batches for line in batch]
+
+
+def _coordinator() -> SimpleNamespace:
+    return SimpleNamespace(
+        entry=SimpleNamespace(entry_id="entry1"),
+        client=SimpleNamespace(host="192.168.1.20"),
+        data={"DevSN": "SN0001"},
+        decoded={"pv_power": 1200, "battery_soc": 87.5},
+        energy=SimpleNamespace(totals={}),
+        last_update_success=True,
+        async_add_listener=lambda _cb: lambda: None,
+    )
+
+
+async def test_snapshots_are_sent_as_line_protocol(hass) -> None:
+    sink = StubSink()
+    exporter = SnapshotExporter(hass, _coordinator(), sink)
+    for _ in range(3):
+        exporter._on_snapshot()
+    await exporter.async_stop()
+
+    assert len(sink.lines) == 3
+    assert sink.lines[0].startswith("felicity,serial=SN0001,host=192.168.1.20 ")
+    assert "pv_power=1200.0" in sink.lines[0]
+    assert exporter.sent == 3
+
+
+async def test_outage_spills_to_disk_and_replays(hass) -> None:
+    coordinator = _coordinator()
+    sink = StubSink()
+    sink.down = True
+    exporter = SnapshotExporter(hass, coordinator, sink)
+    for _ in range(5):
+        exporter._on_snapshot()
+    await exporter.async_stop()
+    assert exporter.failures == 1
+    assert not sink.lines
+
+    # A new exporter (e.g. after a restart) finds the spool and replays it.
+    sink.down = False
+    exporter = SnapshotExporter(hass, coordinator, sink)
+    await exporter.async_stop()
+    assert len(sink.lines) == 5
+    assert not await hass.async_add_executor_job(
+        exporter_mod.os.path.exists, exporter._spool
+    )
+
+
+async def test_spool_cap_drops_oldest_points(hass, monkeypatch) -> None:
+    monkeypatch.setattr(exporter_mod, "EXPORT_SPOOL_MAX_BYTES", 100)
+    exporter = SnapshotExporter(hass, _coordinator(), StubSink())
+    await exporter._async_spill([f"point{i:02d} {'x' * 20}" for i in range(10)])
+
+    def _read() -> list[str]:
+        with open(exporter._spool, encoding="utf-8") as fh:
+            return fh.read().splitlines()
+
+    kept = await hass.async_add_executor_job(_read)
+    assert sum(len(line) + 1 for line in kept) <= 100
+    assert kept[-1].startswith("point09")
+    assert not any(line.startswith("point00") for line in kept)
+
+
+async def test_stop_waits_for_a_flush_in_flight(hass) -> None:
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    class SlowFailingSink(StubSink):
+        async def async_write(self, lines: list[str]) -> None:
+            started.set()
+            await release.wait()
+            raise ExportError("sink down")
+
+    exporter = SnapshotExporter(hass, _coordinator(), SlowFailingSink())
+    for _ in range(3):
+        exporter._on_snapshot()
+    flush = hass.async_create_task(exporter._async_flush())
+    await started.wait()
+    stop = hass.async_create_task(exporter.async_stop())
+    await asyncio.sleep(0)
+    release.set()
+    await flush
+    await stop
+
+    def _read() -> list[str]:
+        with open(exporter._spool, encoding="utf-8") as fh:
+            return fh.read().splitlines()
+
+    # The failed in-flight batch was spilled, not dropped.
+    assert len(await hass.async_add_executor_job(_read)) == 3
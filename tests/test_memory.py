@@ -0,0 +1,26 @@
+"""Per-inverter memory budget, measured with tracemalloc by the soak harness."""
+
+import asyncio
+
+import pytest
+
+import soak
+
+
+@pytest.mark.parametrize("transport", ["json", "modbus"])
+def test_retained_memory_per_inverter_within_budget(transport: str) -> None:
+    args = soak._parse_args(
+        [
+            "--duration", "4",
+            "--interval", "0.5",
+            "--refresh", "1",
+            "--transport", transport,
+            "--memory-check",
+        ]
+    )
+    row = asyncio.run(soak.run_step(5, args))
+
+    assert row["errors"] == 0
+    assert row["memory_per_inverter_kb"] <= soak.MEMORY_BUDGET_KB
+    # Steady state: no noticeable growth over the second half of the run.
+    assert row["memory_growth_per_inverter_kb"] <= soak.MEMORY_BUDGET_KB / 4
@@ -0,0 +1,87 @@
+"""Modbus transport against a local Modbus TCP gateway stand-in (scripts/soak.py)."""
+
+import asyncio
+
+import pytest
+
+import soak
+
+api = soak._load("api")
+modbus = soak._load("modbus")
+profiles = soak._load("profiles")
+
+
+async def _poll(unit: soak.FakeDongle, transport: str) -> dict:
+    await unit.start(0)
+    client = api.FelicityClient(
+        "127.0.0.1",
+        unit.port,
+        read_timeout=0.5,
+        transport=(
+            modbus.ModbusTransport("127.0.0.1", unit.port)
+            if transport == "modbus"
+            else None
+        ),
+    )
+    try:
+        return await client.async_get_data()
+    finally:
+        await client.async_close()
+        await unit.stop()
+
+
+@pytest.mark.parametrize("block", list(modbus.REGISTER_MAPS))
+def test_read_plan_covers_every_register(block: str) -> None:
+    register_map = modbus.REGISTER_MAPS[block]
+    for start, count in register_map.ranges:
+        assert 0 < count <= modbus.MAX_READ_REGISTERS
+    for reg in register_map.registers:
+        assert any(
+            start <= reg.address and reg.address + reg.words <= start + count
+            for start, count in register_map.ranges
+        ), reg
+
+
+def test_modbus_snapshot_matches_json() -> None:
+    # Same index, same seed: both fakes serve identical values.
+    json_data = asyncio.run(_poll(soak.FakeDongle(7, refresh=60), "json"))
+    modbus_data = asyncio.run(_poll(soak.FakeModbusGateway(7, refresh=60), "modbus"))
+
+    compared = 0
+    for reg in modbus.RUNTIME_REGISTERS:
+        expected = profiles.get_path(json_data, reg.path)
+        if expected is None:
+            continue  # not in the fake dongle's frame
+        assert profiles.get_path(modbus_data, reg.path) == expected, reg.path
+        compared += 1
+    assert compared > 40
+    assert modbus_data["DevSN"] == json_data["DevSN"]
+    assert modbus_data["_basic"] == json_data["_basic"]
+    for key, value in json_data["_settings"].items():
+        if key in modbus.REGISTER_MAPS[api.BLOCK_SETTINGS].by_name:
+            assert modbus_data["_settings"][key] == value, key
+
+
+def test_settings_writes_are_refused() -> None:
+    gateway = soak.FakeModbusGateway(0, refresh=60)
+    address = modbus.REGISTER_MAPS[api.BLOCK_SETTINGS].by_name["ZEMode"].address
+    before = gateway._registers[address]
+
+    async def _run() -> None:
+        await gateway.start(0)
+        client = api.FelicityClient(
+            "127.0.0.1",
+            gateway.port,
+            transport=modbus.ModbusTransport("127.0.0.1", gateway.port),
+        )
+        try:
+            with pytest.raises(api.FelicityApiError):
+                await client.async_write_settings({"ZEMode": 2})
+            with pytest.raises(api.FelicityApiError):
+                await client.transport.async_write({"ZEMode": 2})
+        finally:
+            await client.async_close()
+            await gateway.stop()
+
+    asyncio.run(_run())
+    assert gateway._registers[address] == before
@@ -0,0 +1,72 @@
+"""Undoing stacked method shadows in any order."""
+
+import functools
+
+import soak
+
+profiler = soak._load("profiler")
+
+
+class Owner:
+    def method(self, calls: list[str]) -> str:
+        calls.append("method")
+        return "result"
+
+
+def _tag(name: str, func):
+    @functools.wraps(func)
+    def _wrapper(calls: list[str]) -> str:
+        calls.append(name)
+        return func(calls)
+
+    return _wrapper
+
+
+def _call(owner: Owner) -> list[str]:
+    calls: list[str] = []
+    assert owner.method(calls) == "result"
+    return calls
+
+
+def test_lifo_undo() -> None:
+    owner = Owner()
+    undo_a = profiler.shadow(owner, "method", functools.partial(_tag, "a"))
+    undo_b = profiler.shadow(owner, "method", functools.partial(_tag, "b"))
+    assert _call(owner) == ["b", "a", "method"]
+    undo_b()
+    assert _call(owner) == ["a", "method"]
+    undo_a()
+    assert _call(owner) == ["method"]
+    assert "method" not in owner.__dict__
+
+
+def test_inner_undo_first_unlinks_only_that_wrapper() -> None:
+    # Watchdog (a) stopped while a profile (b) runs, then the profile ends.
+    owner = Owner()
+    undo_a = profiler.shadow(owner, "method", functools.partial(_tag, "a"))
+    undo_b = profiler.shadow(owner, "method", functools.partial(_tag, "b"))
+    undo_a()
+    assert _call(owner) == ["b", "method"]
+    undo_b()
+    assert _call(owner) == ["method"]
+    assert "method" not in owner.__dict__
+
+
+def test_undo_twice_and_reinstall() -> None:
+    owner = Owner()
+    undo_a = profiler.shadow(owner, "method", functools.partial(_tag, "a"))
+    undo_a()
+    undo_c = profiler.shadow(owner, "method", functools.partial(_tag, "c"))
+    undo_a()
+    assert _call(owner) == ["c", "method"]
+    undo_c()
+    assert _call(owner) == ["method"]
+
+
+def test_existing_instance_attribute_is_kept() -> None:
+    owner = Owner()
+    owner.method = _tag("own", Owner.method.__get__(owner))
+    undo = profiler.shadow(owner, "method", functools.partial(_tag, "a"))
+    assert _call(owner) == ["a", "own", "method"]
+    undo()
+    assert _call(owner) == ["own", "method"]
@@ -0,0 +1,112 @@
+"""Soak in a test Home Assistant core: N real config entries against fake dongles.
+
+Unlike scripts/soak.py, which estimates entity and recorder costs from a
+count of changed values, this sets up the integration for real (entities,
+state machine, recorder) and measures the `state_changed` events and the
+recorder queue depth per poll round. Scale with FELICITY_SOAK_INVERTERS and
+FELICITY_SOAK_ROUNDS; `pytest -s` prints the measurements.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.components.recorder import get_instance  # noqa: E402
+from homeassistant.const import (  # noqa: E402
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import callback  # noqa: E402
+from pytest_homeassistant_custom_component.common import MockConfigEntry  # noqa: E402
+
+import soak  # noqa: E402
+
+from custom_components.felicity_inverter.const import (  # noqa: E402
+    CONF_TRANSPORT,
+    CONF_UNIT_ID,
+    DOMAIN,
+    TRANSPORT_JSON,
+)
+
+INVERTERS = int(os.environ.get("FELICITY_SOAK_INVERTERS", "5"))
+ROUNDS = int(os.environ.get("FELICITY_SOAK_ROUNDS", "10"))
+# Recorder queue depth seen right after a poll round, before it drains.
+RECORDER_BACKLOG_LIMIT = 1000
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_state_writes_and_recorder_load(
+    recorder_mock, enable_custom_integrations, hass
+) -> None:
+    # refresh=0: every poll gets a new frame, the worst case for state writes.
+    dongles = [soak.FakeDongle(index, refresh=0) for index in range(INVERTERS)]
+    entries: list[MockConfigEntry] = []
+    for dongle in dongles:
+        await dongle.start(0)
+    try:
+        for dongle in dongles:
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                title=f"Soak {dongle.index}",
+                unique_id=f"127.0.0.1:{dongle.port}",
+                data={
+                    CONF_NAME: f"Soak {dongle.index}",
+                    CONF_HOST: "127.0.0.1",
+                    CONF_PORT: dongle.port,
+                    CONF_TRANSPORT: TRANSPORT_JSON,
+                    CONF_UNIT_ID: 1,
+                },
+            )
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            entries.append(entry)
+        await hass.async_block_till_done()
+        recorder = get_instance(hass)
+        await recorder.async_block_till_done()
+
+        entities = len(hass.states.async_all())
+        coordinators = [
+            hass.data[DOMAIN][entry.entry_id]["coordinator"] for entry in entries
+        ]
+        writes = 0
+
+        @callback
+        def _count(_event) -> None:
+            nonlocal writes
+            writes += 1
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _count)
+        backlog_max = 0
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await asyncio.gather(*(c.async_refresh() for c in coordinators))
+            backlog_max = max(backlog_max, recorder.backlog)
+            await hass.async_block_till_done()
+            await recorder.async_block_till_done()
+        elapsed = time.perf_counter() - started
+        unsub()
+
+        polls = ROUNDS * INVERTERS
+        print(
+            f"\n{INVERTERS} inverters, {entities} entities: "
+            f"{writes / polls:.1f} state writes per poll, "
+            f"recorder backlog max {backlog_max}, "
+            f"{elapsed / ROUNDS * 1000:.1f} ms per round"
+        )
+        assert all(c.last_update_success for c in coordinators)
+        assert writes > 0
+        # At most one write per entity and poll: unchanged states are skipped.
+        assert writes <= polls * entities / INVERTERS
+        assert backlog_max < RECORDER_BACKLOG_LIMIT
+    finally:
+        for entry in entries:
+            await hass.config_entries.async_unload(entry.entry_id)
+        for dongle in dongles:
+            await dongle.stop()
@@ -0,0 +1,56 @@
+"""Hourly energy statistics rows built from the device's lifetime counters."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.felicity_inverter.statistics import _Series  # noqa: E402
+
+HOUR = timedelta(hours=1)
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _changes(rows: list[dict]) -> list[float]:
+    """What the Energy dashboard shows: sum differences, missing previous = 0."""
+    previous = 0.0
+    changes = []
+    for row in rows:
+        changes.append(round(row["sum"] - previous, 3))
+        previous = row["sum"]
+    return changes
+
+
+def test_new_series_starts_at_zero() -> None:
+    series = _Series("felicity_inverter:test_pv", "test pv")
+    series.add_reading(T0, 12000.0)  # lifetime counter, kWh
+    series.add_reading(T0, 12001.5)  # same hour, later reading
+    series.add_reading(T0 + HOUR, 12002.0)
+    series.add_reading(T0 + 2 * HOUR, 12004.5)
+
+    rows = series.rows
+    assert [row["state"] for row in rows] == [12001.5, 12002.0]
+    # The first row counts only the hour's energy, not the lifetime counter;
+    # the second one the counter delta.
+    assert _changes(rows) == [1.5, 0.5]
+
+
+def test_resume_adds_energy_counted_while_stopped() -> None:
+    series = _Series("felicity_inverter:test_pv", "test pv")
+    series.last_hour, series.last_sum, series.last_state = T0, 5.0, 12005.0
+    series.add_reading(T0 + HOUR, 12007.0)
+    series.add_reading(T0 + 2 * HOUR, 12008.0)
+
+    assert [row["sum"] for row in series.rows] == [7.0]
+
+
+def test_counter_reset_keeps_sum_increasing() -> None:
+    series = _Series("felicity_inverter:test_pv", "test pv")
+    series.add_reading(T0, 100.0)
+    series.add_reading(T0 + HOUR, 110.0)
+    series.add_reading(T0 + 2 * HOUR, 0.0)  # counter reset
+    series.add_reading(T0 + 2 * HOUR, 3.0)
+    series.add_reading(T0 + 3 * HOUR, 3.0)
+
+    assert _changes(series.rows) == [0.0, 10.0, 3.0]